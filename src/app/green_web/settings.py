@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Collected static files are answered here, skipping the rest of the stack
+    # but still carrying SecurityMiddleware's headers.
+    'transactions.assets.StaticAssetMiddleware',
+    # Next, so its timings cover the rest of the middleware stack too.
+    'transactions.instrumentation.RequestTimingMiddleware',
+    'transactions.replicas.PrimaryPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,9 +85,43 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Optional read replica for reporting, export and summary reads, e.g. a
+# second SQLite file kept up to date with `manage.py sync_replica`.
+if os.environ.get('REPLICA_DATABASE_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['REPLICA_DATABASE_NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['transactions.replicas.ReplicaRouter']
+
+# Seconds a browser keeps reading from the primary after it writes.
+REPLICA_PIN_SECONDS = 15
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Reporting API payloads, keyed by project data version. Bounded so
+    # rarely used filter combinations are culled.
+    'reporting': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'reporting',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -120,6 +161,71 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / "transactions" / "static",
 ]
+# `manage.py collectstatic` writes hashed, bundled and precompressed files
+# here (see transactions.assets); they are served by StaticAssetMiddleware.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'transactions.assets.StaticAssetStorage'},
+}
+
+# Project access
+# Seconds to cache each user's project memberships (0 disables). Only enable
+# this with a cache shared by all workers, since invalidation is per cache.
+PROJECT_ACCESS_CACHE_TIMEOUT = 0
+
+# Request instrumentation
+# Fraction of requests timed in detail (SQL, templates, duplicate queries),
+# reported in a Server-Timing header and on the transactions.requests logger.
+# 0 turns sampling off; slow requests are still logged.
+REQUEST_TIMING_SAMPLE_RATE = 1.0 if DEBUG else 0.05
+REQUEST_TIMING_SLOW_MS = 500
+REQUEST_TIMING_DUPLICATE_THRESHOLD = 5
+
+# Background jobs (see transactions.jobs; run them with `manage.py run_jobs`)
+# Uploads bigger than this are imported by a worker instead of in the request.
+JOBS_INLINE_IMPORT_BYTES = 1024 * 1024
+# Jobs of one project that may run at the same time, across all workers.
+JOBS_PROJECT_CONCURRENCY = 1
+# A running job without a heartbeat for this long is requeued. Workers beat
+# every quarter of this while a job runs, so it only catches dead workers.
+JOBS_STALE_SECONDS = 300
+# Backoff before the first retry; doubled after every further failure.
+JOBS_RETRY_DELAY_SECONDS = 30
+# Finished jobs and their export files are deleted after this many days.
+JOBS_RETENTION_DAYS = 7
+JOBS_FILES_DIR = BASE_DIR / 'job_files'
+
+# Item and customer sketches (see transactions.sketches)
+# Answer top-N and distinct-customer questions with exact GROUP BY queries
+# instead of merging the approximate daily sketches.
+SKETCHES_EXACT = False
+
+# Batch ingestion API (see transactions.ingest)
+# Most transactions one POST may carry. Keep the request body of a full
+# batch under DATA_UPLOAD_MAX_MEMORY_SIZE (2.5 MB by default).
+INGEST_MAX_BATCH = 5000
+
+# Columnar snapshots (see transactions.snapshots; refresh them with
+# `manage.py export_snapshots`)
+# Directory holding one memory-mapped snapshot per project, for the engine.
+SNAPSHOTS_DIR = BASE_DIR / 'snapshots'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'transactions.requests': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
 
 # Login settings
 LOGIN_URL = 'login'
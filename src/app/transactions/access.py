@@ -0,0 +1,189 @@
+"""Project access resolution shared by every project view.
+
+The project, its owner and the caller's membership role are fetched in a
+single query and memoised on the request. When
+``PROJECT_ACCESS_CACHE_TIMEOUT`` is set, each user's membership map is also
+kept in Django's cache and dropped whenever a ``ProjectMember`` changes.
+"""
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404, JsonResponse
+from django.shortcuts import redirect
+
+from .models import Project, ProjectMember
+
+EDIT_ROLES = ('owner', 'admin', 'member')
+MANAGE_ROLES = ('owner', 'admin')
+
+
+class ProjectAccess:
+    """The caller's view of one project."""
+
+    def __init__(self, project, role):
+        self.project = project
+        self.role = role
+
+    @property
+    def is_owner(self):
+        return self.role == 'owner'
+
+    @property
+    def can_view(self):
+        return self.role is not None
+
+    @property
+    def can_edit(self):
+        return self.role in EDIT_ROLES
+
+    @property
+    def can_manage(self):
+        return self.role in MANAGE_ROLES
+
+
+def _cache_timeout():
+    return getattr(settings, 'PROJECT_ACCESS_CACHE_TIMEOUT', 0)
+
+
+def _memberships_key(user_id):
+    return f'project-memberships:{user_id}'
+
+
+def user_memberships(user):
+    """Return ``{project_id: role}`` for the projects ``user`` is a member of."""
+    timeout = _cache_timeout()
+    key = _memberships_key(user.pk)
+    memberships = cache.get(key) if timeout else None
+    if memberships is None:
+        memberships = dict(
+            ProjectMember.objects.filter(user=user).values_list('project_id', 'role')
+        )
+        if timeout:
+            cache.set(key, memberships, timeout)
+    return memberships
+
+
+def invalidate_memberships(user_id):
+    """Forget the cached membership map of a user."""
+    if _cache_timeout():
+        cache.delete(_memberships_key(user_id))
+
+
+@receiver([post_save, post_delete], sender=ProjectMember)
+def _membership_changed(sender, instance, **kwargs):
+    invalidate_memberships(instance.user_id)
+
+
+def accessible_projects(user):
+    """Projects ``user`` owns or is a member of, with their owners loaded.
+
+    The ids come from a ``UNION`` of two index lookups rather than an
+    ``OR`` over a membership join, which would need a ``DISTINCT``.
+    """
+    ids = Project.objects.filter(owner=user).order_by().values('id').union(
+        ProjectMember.objects.filter(user=user).order_by().values('project_id')
+    )
+    return Project.objects.select_related('owner').filter(id__in=ids)
+
+
+def _project_query(user, project_id):
+    projects = Project.objects.select_related('owner').filter(id=project_id)
+    if _cache_timeout():
+        return projects
+    memberships = ProjectMember.objects.filter(project=OuterRef('pk'), user=user)
+    role = memberships.values('role')[:1]
+    return projects.annotate(member_role=Subquery(role))
+
+
+def _access(user, project, member_role):
+    if project is None:
+        return None
+    if project.owner_id == user.pk:
+        return ProjectAccess(project, 'owner')
+    return ProjectAccess(project, member_role)
+
+
+def _fetch(user, project_id):
+    project = _project_query(user, project_id).first()
+    if _cache_timeout():
+        member_role = user_memberships(user).get(project_id) if project else None
+    else:
+        member_role = project.member_role if project else None
+    return _access(user, project, member_role)
+
+
+async def _afetch(user, project_id):
+    project = await _project_query(user, project_id).afirst()
+    if _cache_timeout():
+        memberships = await sync_to_async(user_memberships)(user) if project else {}
+        member_role = memberships.get(project_id)
+    else:
+        member_role = project.member_role if project else None
+    return _access(user, project, member_role)
+
+
+def get_project_access(request, project_id):
+    """Resolve (once per request) the caller's access to a project.
+
+    Returns ``None`` when the project does not exist.
+    """
+    memo = request.__dict__.setdefault('_project_access', {})
+    if project_id not in memo:
+        memo[project_id] = _fetch(request.user, project_id)
+    return memo[project_id]
+
+
+async def aget_project_access(request, project_id):
+    """Async :func:`get_project_access`, sharing the same per-request memo."""
+    memo = request.__dict__.setdefault('_project_access', {})
+    if project_id not in memo:
+        memo[project_id] = await _afetch(await request.auser(), project_id)
+    return memo[project_id]
+
+
+def project_access_required(denied='not_found'):
+    """Decorate a ``(request, project_id, ...)`` view with the access check.
+
+    The view is called as ``view(request, access, ...)``. Callers without
+    access get a 404 (``denied='not_found'``), a JSON 403 (``'json'``) or a
+    redirect to the project list (``'redirect'``). Async views are resolved
+    with the async ORM.
+    """
+    def refuse(request, access):
+        if access is None:
+            raise Http404("Project not found")
+        if not access.can_view:
+            if denied == 'json':
+                return JsonResponse({'error': 'Permission denied'}, status=403)
+            if denied == 'redirect':
+                messages.error(request, "You do not have access to this project.")
+                return redirect('projects')
+            raise Http404("Project not found")
+        return None
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, project_id, *args, **kwargs):
+                access = await aget_project_access(request, project_id)
+                response = refuse(request, access)
+                if response is not None:
+                    return response
+                return await view(request, access, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, project_id, *args, **kwargs):
+            access = get_project_access(request, project_id)
+            response = refuse(request, access)
+            if response is not None:
+                return response
+            return view(request, access, *args, **kwargs)
+        return wrapper
+    return decorator
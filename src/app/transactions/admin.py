@@ -1,6 +1,18 @@
 from django.contrib import admin
 
-from .models import Project, Transaction, UserProfile
+from . import search, services
+from .models import (
+    EmissionFactor,
+    EmissionFactorVersion,
+    IngestToken,
+    Job,
+    Project,
+    ProjectDailyRollup,
+    ProjectForecast,
+    Transaction,
+    TransactionAnomaly,
+    UserProfile,
+)
 
 
 @admin.register(UserProfile)
@@ -18,6 +30,96 @@ class ProjectAdmin(admin.ModelAdmin):
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('item_name', 'amount', 'category', 'customer_name', 'project', 'date')
+    list_display = (
+        'item_name', 'amount', 'category', 'emissions', 'customer_name', 'project',
+        'date',
+    )
+    readonly_fields = ('emissions', 'factor_version')
     list_filter = ('date', 'category', 'project')
     search_fields = ('item_name', 'customer_name')
+
+    def get_search_results(self, request, queryset, search_term):
+        # The full-text index replaces icontains scans over search_fields.
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(search.matching(search_term, queryset.db)), False
+
+    def save_model(self, request, obj, form, change):
+        services.save_transaction(obj)
+
+    def delete_model(self, request, obj):
+        services.delete_transactions([obj])
+
+    def delete_queryset(self, request, queryset):
+        services.delete_transactions(queryset)
+
+
+@admin.register(TransactionAnomaly)
+class TransactionAnomalyAdmin(admin.ModelAdmin):
+    list_display = ('transaction', 'kind', 'score', 'expected', 'project', 'created_at',
+                    'dismissed')
+    list_filter = ('kind', 'dismissed', 'project')
+    list_editable = ('dismissed',)
+    readonly_fields = ('project', 'transaction', 'kind', 'score', 'expected',
+                       'created_at')
+
+
+@admin.register(ProjectDailyRollup)
+class ProjectDailyRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        'project', 'day', 'category', 'count', 'total', 'min_amount', 'max_amount',
+    )
+    list_filter = ('category', 'project')
+    date_hierarchy = 'day'
+
+
+@admin.register(ProjectForecast)
+class ProjectForecastAdmin(admin.ModelAdmin):
+    list_display = ('project', 'trained_through', 'data_version', 'updated_at')
+    readonly_fields = (
+        'project', 'data_version', 'trained_through', 'history_count', 'history_total',
+        'factor_versions', 'state', 'updated_at',
+    )
+
+
+@admin.register(EmissionFactor)
+class EmissionFactorAdmin(admin.ModelAdmin):
+    list_display = ('category', 'valid_from', 'valid_to', 'kg_co2e_per_unit')
+    list_filter = ('category',)
+
+
+@admin.register(EmissionFactorVersion)
+class EmissionFactorVersionAdmin(admin.ModelAdmin):
+    list_display = ('category', 'version')
+    readonly_fields = ('category', 'version')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'kind', 'project', 'status', 'attempts', 'progress_done',
+        'progress_total', 'created_at',
+    )
+    list_filter = ('status', 'kind')
+    readonly_fields = (
+        'kind', 'project', 'created_by', 'params', 'attempts', 'progress_done',
+        'progress_total', 'message', 'result', 'error', 'worker', 'heartbeat_at',
+        'created_at', 'started_at', 'finished_at',
+    )
+    fields = ('status', 'max_attempts', 'run_after', *readonly_fields)
+
+
+@admin.register(IngestToken)
+class IngestTokenAdmin(admin.ModelAdmin):
+    list_display = ('name', 'prefix', 'project', 'created_at', 'last_used_at',
+                    'revoked')
+    list_filter = ('revoked',)
+    list_editable = ('revoked',)
+    readonly_fields = ('project', 'name', 'prefix', 'created_by', 'created_at',
+                       'last_used_at')
+    fields = (*readonly_fields, 'revoked')
+
+    def has_add_permission(self, request):
+        # The secret is only shown once, so tokens come from
+        # `manage.py create_ingest_token`.
+        return False
@@ -0,0 +1,108 @@
+"""Streaming anomaly detection on newly recorded transactions.
+
+``observe`` runs inside the write transaction of ``record_transactions``:
+it loads the detector state of each touched project and category, scores
+every row in O(1), and saves the states and any flags with the rows, so a
+restart picks up exactly where the last write left off. Edits and
+deletions do not rewind the state; it tracks the stream of new sales.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from engine.anomalies import AnomalyDetector, SeriesState
+
+from .models import AnomalyState, Transaction, TransactionAnomaly
+from .rollups import rollup_day
+
+detector = AnomalyDetector()
+_EPOCH = date(1970, 1, 1)
+
+
+def epoch_day(value):
+    """Days between 1970-01-01 and the rollup day of a transaction timestamp."""
+    return (rollup_day(value) - _EPOCH).days
+
+
+def _load(keys):
+    project_ids = {project_id for project_id, _ in keys}
+    locked = AnomalyState.objects.select_for_update().filter(project_id__in=project_ids)
+    states = {
+        (state.project_id, state.category): state
+        for state in locked
+        if (state.project_id, state.category) in keys
+    }
+    for project_id, category in keys - states.keys():
+        states[project_id, category] = AnomalyState(project_id=project_id,
+                                                    category=category)
+    return states
+
+
+def observe(rows, flag=True):
+    """Fold saved ``rows`` into their detector states; return the flags raised.
+
+    Each row gets a ``detected_anomalies`` list of the flags raised for it. With
+    ``flag=False`` the states are updated without recording flags, e.g.
+    when replaying history.
+    """
+    states = _load({(row.project_id, row.category) for row in rows})
+    series = {
+        key: SeriesState.from_dict(state.state) if state.state else SeriesState()
+        for key, state in states.items()
+    }
+    flags = []
+    for row in rows:
+        state = series[row.project_id, row.category]
+        found = detector.observe(state, epoch_day(row.date), float(row.amount))
+        row.detected_anomalies = [
+            TransactionAnomaly(
+                project_id=row.project_id, transaction=row, kind=anomaly.kind,
+                score=round(anomaly.score, 2),
+                expected=Decimal(f'{anomaly.expected:.2f}'),
+            )
+            for anomaly in found
+        ] if flag else []
+        flags.extend(row.detected_anomalies)
+
+    now = timezone.now()
+    for key, state in states.items():
+        state.state = series[key].to_dict()
+        state.updated_at = now
+    AnomalyState.objects.bulk_create([s for s in states.values() if s._state.adding])
+    AnomalyState.objects.bulk_update(
+        [s for s in states.values() if not s._state.adding], ['state', 'updated_at']
+    )
+    TransactionAnomaly.objects.bulk_create(flags)
+    return flags
+
+
+def replay_project(project_id, batch_size=5000):
+    """Rebuild a project's detector states from its history, without flagging."""
+    AnomalyState.objects.filter(project_id=project_id).delete()
+    rows = (
+        Transaction.objects.filter(project_id=project_id)
+        .only('id', 'project_id', 'category', 'amount', 'date')
+        .order_by('date', 'id')
+    )
+    replayed = 0
+    batch = list(rows[:batch_size])
+    while batch:
+        with transaction.atomic():
+            observe(batch, flag=False)
+        replayed += len(batch)
+        last = batch[-1]
+        after = Q(date__gt=last.date) | Q(date=last.date, id__gt=last.id)
+        batch = list(rows.filter(after)[:batch_size])
+    return replayed
+
+
+def open_anomalies(project, limit=5):
+    """The newest flags of a project that nobody has dismissed."""
+    return list(
+        TransactionAnomaly.objects.filter(project=project, dismissed=False)
+        .select_related('transaction')
+        .order_by('-created_at', '-id')[:limit]
+    )
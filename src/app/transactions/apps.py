@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class TransactionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'transactions'
+
+    def ready(self):
+        # Connect the membership cache, emission factor version, search index
+        # and query timing signals.
+        from . import access, emissions, instrumentation, search  # noqa: F401
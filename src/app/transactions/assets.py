@@ -0,0 +1,243 @@
+"""Production static files: bundles, hashed names, precompressed variants.
+
+``collectstatic`` with ``StaticAssetStorage`` concatenates and minifies
+the stylesheets of each page into one ``css/bundle-<name>.css`` file,
+gives every file a content-hashed name with Django's manifest storage, and
+writes ``.gz`` (and, with the optional ``brotli`` package, ``.br``)
+variants next to each compressible file.
+
+``StaticAssetMiddleware`` then serves ``STATIC_ROOT`` from the app itself:
+it picks the best variant the client accepts, answers conditional
+requests with 304, and marks hashed files as immutable so browsers never
+revalidate them. In development (``DEBUG``), pages link the unbundled
+source files and ``runserver`` serves them as before.
+"""
+import gzip
+import json
+import mimetypes
+import posixpath
+import re
+from email.utils import formatdate
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import HttpResponse, HttpResponseNotModified
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip variants are still built.
+    brotli = None
+
+# Stylesheets of each page, in cascade order.
+CSS_BUNDLES = {
+    'base': ['css/base.css', 'css/confirm-modal.css'],
+    'auth': ['css/base.css', 'css/confirm-modal.css', 'css/login.css'],
+    'projects': ['css/base.css', 'css/confirm-modal.css', 'css/projects.css'],
+    'account': ['css/base.css', 'css/confirm-modal.css', 'css/home.css'],
+    'settings': ['css/base.css', 'css/confirm-modal.css', 'css/home.css',
+                 'css/settings.css'],
+    'project': ['css/base.css', 'css/confirm-modal.css', 'css/home.css',
+                'css/tabs.css'],
+}
+COMPRESSIBLE_SUFFIXES = {
+    '.css', '.js', '.json', '.map', '.svg', '.txt', '.html', '.xml',
+}
+# Variants that save less than this fraction of the file are not kept.
+MIN_SAVING = 0.05
+# Preferred first when the client accepts both.
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Unhashed names can change in place, so they are only cached briefly.
+MUTABLE_CACHE_CONTROL = 'public, max-age=60'
+
+_UTF8_TYPES = {'application/javascript', 'application/json', 'image/svg+xml'}
+_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_STRING = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+_SPACE = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def bundle_name(name):
+    return f'css/bundle-{name}.css'
+
+
+def minify_css(css):
+    """Drop comments and redundant whitespace, leaving quoted strings intact.
+
+    Spaces before ``:`` and around ``+``/``-`` are kept, since they matter in
+    selectors (``a :hover``) and ``calc()``.
+    """
+    parts = _STRING.split(_COMMENT.sub('', css))
+    for i in range(0, len(parts), 2):
+        text = _SPACE.sub(' ', parts[i])
+        text = _PUNCTUATION.sub(r'\1', text)
+        parts[i] = re.sub(r':\s+', ':', text).replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def compress_variants(path):
+    """Write the worthwhile compressed variants of ``path``; return their paths."""
+    data = path.read_bytes()
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    written = []
+    for suffix, compressed in variants.items():
+        target = path.with_name(path.name + suffix)
+        if len(compressed) <= len(data) * (1 - MIN_SAVING):
+            target.write_bytes(compressed)
+            written.append(target)
+        else:
+            target.unlink(missing_ok=True)
+    return written
+
+
+class StaticAssetStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also builds the CSS bundles and compressed variants."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name, sources in CSS_BUNDLES.items():
+                bundle = bundle_name(name)
+                css = '\n'.join(
+                    minify_css(self.open(source).read().decode()) for source in sources
+                )
+                if self.exists(bundle):
+                    self.delete(bundle)
+                self._save(bundle, ContentFile(css.encode()))
+                paths[bundle] = (self, bundle)
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            path = Path(self.path(name))
+            if path.suffix in COMPRESSIBLE_SUFFIXES and path.is_file():
+                compress_variants(path)
+
+
+def accepted_encodings(header):
+    """Content codings a client accepts, from its ``Accept-Encoding`` header."""
+    qualities = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.partition('=')
+        if name.strip() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+    wildcard = qualities.get('*', 0.0) > 0
+    default = 1.0 if wildcard else 0.0
+    return {coding for coding, _ in ENCODINGS if qualities.get(coding, default) > 0}
+
+
+class _StaticFile:
+    def __init__(self, path):
+        self.path = path
+        content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in _UTF8_TYPES:
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        self.variants = {}
+        for encoding, suffix in [*ENCODINGS, ('identity', '')]:
+            variant = path.with_name(path.name + suffix)
+            if variant.is_file():
+                stat = variant.stat()
+                etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}-{encoding}"'
+                self.variants[encoding] = (variant, stat.st_size, etag)
+        self.last_modified = formatdate(path.stat().st_mtime, usegmt=True)
+
+    def choose(self, accepted):
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self.variants:
+                return encoding
+        return 'identity'
+
+
+class StaticAssetMiddleware:
+    """Serve ``STATIC_ROOT`` with content negotiation and long-lived caching.
+
+    The files are indexed once at startup, so restart after ``collectstatic``.
+    Paths that are not collected files fall through to the rest of the stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        static_url = settings.STATIC_URL
+        self.prefix = '/' + static_url.lstrip('/') if '://' not in static_url else None
+        self.files, self.immutable = self._index(settings.STATIC_ROOT)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self._serve(request)
+        return self.get_response(request) if response is None else response
+
+    async def __acall__(self, request):
+        response = self._serve(request)
+        return await self.get_response(request) if response is None else response
+
+    @staticmethod
+    def _index(root):
+        if not root or not Path(root).is_dir():
+            return {}, set()
+        root = Path(root)
+        variant_suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        files = {
+            path.relative_to(root).as_posix(): _StaticFile(path)
+            for path in root.rglob('*')
+            if path.is_file() and not path.name.endswith(variant_suffixes)
+        }
+        try:
+            manifest_path = root / ManifestStaticFilesStorage.manifest_name
+            manifest = json.loads(manifest_path.read_text())
+            immutable = set(manifest.get('paths', {}).values())
+        except (OSError, ValueError):
+            immutable = set()
+        return files, immutable
+
+    def _serve(self, request):
+        if not self.prefix or request.method not in ('GET', 'HEAD') or not self.files:
+            return None
+        if not request.path_info.startswith(self.prefix):
+            return None
+        # Only names from the index are served, so '..' can never escape STATIC_ROOT.
+        name = posixpath.normpath(request.path_info[len(self.prefix):])
+        static_file = self.files.get(name)
+        if static_file is None:
+            return None
+
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        encoding = static_file.choose(accepted)
+        path, size, etag = static_file.variants[encoding]
+        if_none_match = request.headers.get('If-None-Match', '').split(',')
+        if etag in [tag.strip() for tag in if_none_match]:
+            response = HttpResponseNotModified()
+        else:
+            body = b'' if request.method == 'HEAD' else path.read_bytes()
+            response = HttpResponse(body)
+            response['Content-Type'] = static_file.content_type
+            response['Content-Length'] = size
+            response['Last-Modified'] = static_file.last_modified
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Cache-Control'] = (
+            IMMUTABLE_CACHE_CONTROL if name in self.immutable else MUTABLE_CACHE_CONTROL
+        )
+        if len(static_file.variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        return response
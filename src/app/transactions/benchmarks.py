@@ -0,0 +1,326 @@
+"""Latency and SQL query count benchmarks for every URL of the app.
+
+Each named URL in ``transactions.urls`` has a request recipe below. Every
+run happens inside a transaction that is rolled back, so write endpoints
+can be measured against the same dataset repeatedly.
+"""
+import gzip
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import forecasts, ingest, jobs, summaries, urls
+from .models import Job, Project, ProjectMember, Transaction, TransactionAnomaly
+
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.5
+# Latency changes smaller than this are treated as noise.
+MIN_LATENCY_DELTA_MS = 5.0
+
+
+class BenchmarkError(Exception):
+    """Raised when a URL cannot be benchmarked."""
+
+
+class BenchmarkRequest:
+    """One request to time: method, path, payload, headers and whether to log in."""
+
+    def __init__(self, path, method='get', data=None, anonymous=False,
+                 content_type=None, headers=None):
+        self.path = path
+        self.method = method
+        self.data = data or {}
+        self.anonymous = anonymous
+        self.content_type = content_type
+        self.headers = headers
+
+
+def _project_url(name, **extra):
+    return lambda ctx: BenchmarkRequest(
+        reverse(name, args=[ctx.project.id]), data=extra
+    )
+
+
+def _delete_transaction(ctx):
+    rows = Transaction.objects.filter(project=ctx.project)
+    row = rows.order_by('-date', '-id').first()
+    return BenchmarkRequest(
+        reverse('delete_transaction', args=[ctx.project.id, row.pk if row else 0]),
+        method='post',
+    )
+
+
+def _dismiss_anomaly(ctx):
+    rows = Transaction.objects.filter(project=ctx.project)
+    row = rows.order_by('-date', '-id').first()
+    anomaly = TransactionAnomaly.objects.create(
+        project=ctx.project, transaction=row, kind='amount', score=5.0,
+        expected=row.amount,
+    )
+    url = reverse('dismiss_anomaly', args=[ctx.project.id, anomaly.pk])
+    return BenchmarkRequest(url, method='post')
+
+
+def _delete_project(ctx):
+    # A throwaway project, so the timing does not depend on the dataset size.
+    scratch = Project.objects.create(
+        name=f'Benchmark scratch {time.time_ns()}', owner=ctx.user
+    )
+    return BenchmarkRequest(reverse('delete_project', args=[scratch.id]), method='post')
+
+
+def _forecast(ctx):
+    # Models are trained by a batch job; train one here to measure the read path.
+    forecasts.refresh_forecast(ctx.project.id)
+    url = reverse('project_forecast_api', args=[ctx.project.id])
+    return BenchmarkRequest(url, data={'days': 30})
+
+
+def _summary(ctx):
+    # The summary is stored after the first view; store it here to measure reads.
+    summaries.project_summary(Project.objects.get(pk=ctx.project.pk))
+    return BenchmarkRequest(reverse('project_summary', args=[ctx.project.id]))
+
+
+def _add_transaction(ctx):
+    url = reverse('add_transaction', args=[ctx.project.id])
+    return BenchmarkRequest(url, method='post', data={
+        'item_name': 'Latte', 'amount': '4.50', 'customer_name': '',
+        'category': 'beverage',
+        'date': timezone.localtime().strftime('%Y-%m-%dT%H:%M'),
+    })
+
+
+def _import_transactions(ctx):
+    upload = SimpleUploadedFile(
+        'benchmark.csv',
+        b'item_name,amount,category\nLatte,4.50,beverage\nBagel,3.90,food\n',
+    )
+    url = reverse('import_transactions', args=[ctx.project.id])
+    return BenchmarkRequest(url, method='post', data={'file': upload})
+
+
+def _ingest_transactions(ctx):
+    # A terminal batch of 100 sales, half of them with idempotency keys.
+    _, secret = ingest.create_token(ctx.project, 'Benchmark terminal')
+    now = timezone.now().isoformat()
+    rows = [
+        {'item_name': 'Latte', 'amount': '4.50', 'category': 'beverage', 'date': now,
+         **({'idempotency_key': f'benchmark-{time.time_ns()}-{i}'} if i % 2 else {})}
+        for i in range(100)
+    ]
+    return BenchmarkRequest(
+        reverse('ingest_transactions', args=[ctx.project.id]), method='post',
+        anonymous=True, data=json.dumps({'transactions': rows}),
+        content_type='application/json', headers={'Authorization': f'Bearer {secret}'},
+    )
+
+
+def _finished_export(ctx):
+    # A small finished export, so the status and download views are measured
+    # without running a full export first.
+    with gzip.open(jobs.job_file('benchmark-export.csv.gz'), 'wb') as out:
+        out.write(b'id,date,item_name,amount,customer_name,category\n')
+    return Job.objects.create(
+        kind='export', project=ctx.project, status=Job.SUCCEEDED,
+        finished_at=timezone.now(),
+        result={'file': 'benchmark-export.csv.gz', 'filename': 'benchmark.csv.gz',
+                'rows': 0},
+    )
+
+
+def _job_status(ctx):
+    job = _finished_export(ctx)
+    return BenchmarkRequest(reverse('job_status_api', args=[ctx.project.id, job.pk]))
+
+
+def _job_download(ctx):
+    job = _finished_export(ctx)
+    return BenchmarkRequest(reverse('job_download', args=[ctx.project.id, job.pk]))
+
+
+REQUESTS = {
+    'projects': lambda ctx: BenchmarkRequest(reverse('projects')),
+    'projects_api': lambda ctx: BenchmarkRequest(reverse('projects_api')),
+    'home': _project_url('home'),
+    'transaction_list_api': _project_url('transaction_list_api'),
+    'project_reporting': _project_url('project_reporting'),
+    'project_reporting_api': _project_url(
+        'project_reporting_api', days=365, granularity='week'
+    ),
+    'project_audience_api': _project_url('project_audience_api', days=365, top=10),
+    'project_forecast_api': _forecast,
+    'project_configuration': _project_url('project_configuration'),
+    'project_summary': _summary,
+    'project_summary_api': _project_url('project_summary_api'),
+    'project_team': _project_url('project_team'),
+    'add_transaction': _add_transaction,
+    'export_transactions': _project_url('export_transactions', format='csv'),
+    'import_transactions': _import_transactions,
+    'delete_transaction': _delete_transaction,
+    'dismiss_anomaly': _dismiss_anomaly,
+    'ingest_transactions': _ingest_transactions,
+    'start_job': lambda ctx: BenchmarkRequest(
+        reverse('start_job', args=[ctx.project.id]),
+        method='post',
+        data={'kind': 'rebuild_rollups'},
+    ),
+    'project_jobs_api': _project_url('project_jobs_api'),
+    'job_status_api': _job_status,
+    'job_download': _job_download,
+    'create_project': lambda ctx: BenchmarkRequest(
+        reverse('create_project'),
+        method='post',
+        data={'name': f'Benchmark {time.time_ns()}'},
+    ),
+    'delete_project': _delete_project,
+    'login': lambda ctx: BenchmarkRequest(reverse('login'), anonymous=True),
+    'register': lambda ctx: BenchmarkRequest(reverse('register'), anonymous=True),
+    'logout': lambda ctx: BenchmarkRequest(reverse('logout')),
+    'settings': lambda ctx: BenchmarkRequest(reverse('settings')),
+    'account': lambda ctx: BenchmarkRequest(reverse('account')),
+}
+
+
+class BenchmarkContext:
+    """The user and project the requests are made as and against."""
+
+    def __init__(self, project):
+        self.project = project
+        self.user = project.owner
+
+
+def url_names():
+    """Names of every URL pattern of the transactions app."""
+    return [pattern.name for pattern in urls.urlpatterns]
+
+
+def dataset_description(project):
+    """Summarise the data a benchmark ran against, for comparing baselines."""
+    return {
+        'projects': Project.objects.count(),
+        'transactions': Transaction.objects.count(),
+        'memberships': ProjectMember.objects.count(),
+        'project_transactions': Transaction.objects.filter(project=project).count(),
+    }
+
+
+def default_project():
+    """The project with the most transactions."""
+    busiest = (
+        Transaction.objects.values('project_id')
+        .annotate(rows=Count('id'))
+        .order_by('-rows')
+        .values_list('project_id', flat=True)
+    )
+    return Project.objects.filter(id__in=busiest[:1]).first() or Project.objects.first()
+
+
+def _measure(client, ctx, name):
+    """Make one rolled-back request; return status, milliseconds and query count."""
+    with transaction.atomic():
+        recipe = REQUESTS[name](ctx)
+        if not recipe.anonymous:
+            client.force_login(ctx.user)
+        for cache in caches.all():
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            extra = {}
+            if recipe.content_type:
+                extra['content_type'] = recipe.content_type
+            if recipe.headers:
+                extra['headers'] = recipe.headers
+            response = getattr(client, recipe.method)(recipe.path, recipe.data, **extra)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            elapsed = time.perf_counter() - start
+        transaction.set_rollback(True)
+    client.cookies.clear()
+    return response.status_code, elapsed * 1000, len(queries.captured_queries)
+
+
+def run_benchmarks(project, names=None, repeat=DEFAULT_REPEAT, host='localhost'):
+    """Time each URL ``repeat`` times; return ``{name: result}``.
+
+    Caches are cleared before every request, so results describe the
+    uncached cost of each view. Job files are written to a temporary
+    directory, since rolling back the database does not remove them.
+    """
+    ctx = BenchmarkContext(project)
+    client = Client(SERVER_NAME=host)
+    results = {}
+    with (
+        tempfile.TemporaryDirectory() as files,
+        override_settings(JOBS_FILES_DIR=Path(files)),
+    ):
+        for name in names or url_names():
+            if name not in REQUESTS:
+                raise BenchmarkError(f'No benchmark request defined for URL "{name}".')
+            timings = []
+            for _ in range(repeat):
+                status, elapsed_ms, query_count = _measure(client, ctx, name)
+                timings.append(elapsed_ms)
+            results[name] = {
+                'status': status,
+                'queries': query_count,
+                'median_ms': round(statistics.median(timings), 2),
+                'max_ms': round(max(timings), 2),
+            }
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """List the regressions of ``results`` against a stored ``baseline``.
+
+    A URL regresses when it issues more queries, changes status code or
+    gets more than ``tolerance`` (a fraction) slower.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['status'] != before['status']:
+            regressions.append(
+                f'{name}: status {before["status"]} -> {result["status"]}'
+            )
+        if result['queries'] > before['queries']:
+            regressions.append(
+                f'{name}: {before["queries"]} -> {result["queries"]} queries'
+            )
+        slower = result['median_ms'] - before['median_ms']
+        allowed = before['median_ms'] * (1 + tolerance)
+        if slower > MIN_LATENCY_DELTA_MS and result['median_ms'] > allowed:
+            regressions.append(
+                f'{name}: {before["median_ms"]}ms -> {result["median_ms"]}ms median'
+            )
+    return regressions
+
+
+def load_baseline(path):
+    """Read a baseline written by :func:`save_baseline`."""
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save_baseline(path, dataset, results):
+    """Store benchmark results together with the dataset they ran against."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as handle:
+        json.dump(
+            {'dataset': dataset, 'results': results}, handle, indent=2, sort_keys=True
+        )
+        handle.write('\n')
@@ -0,0 +1,147 @@
+"""Stored per-transaction emissions derived from versioned category factors.
+
+Each ``Transaction`` keeps its kg CO2e in ``emissions`` together with the
+``factor_version`` of its category's factors at the time it was priced.
+Changing a category's ``EmissionFactor`` rows bumps that category's
+``EmissionFactorVersion``, which marks every row priced with the old
+factors as stale for ``manage.py recompute_emissions``.
+"""
+import math
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from engine.emissions import EmissionFactor as Factor
+from engine.emissions import FactorTable, compute_emissions
+
+from .models import EmissionFactor, EmissionFactorVersion, Project, Transaction
+from .rollups import day_bounds, rollup_day
+
+DEFAULT_BATCH_SIZE = 2000
+
+
+class FactorSnapshot:
+    """The factor table and category versions current at one moment."""
+
+    def __init__(self, factors, versions):
+        self.table = FactorTable(
+            Factor(f.category, '', f.valid_from, f.valid_to, float(f.kg_co2e_per_unit))
+            for f in factors
+        )
+        self.versions = versions
+
+
+def factor_snapshot():
+    """Load the current emission factors and their category versions."""
+    versions = dict(EmissionFactorVersion.objects.values_list('category', 'version'))
+    return FactorSnapshot(EmissionFactor.objects.all(), versions)
+
+
+@receiver(pre_save, sender=EmissionFactor)
+def _remember_category(sender, instance, **kwargs):
+    # A factor moved to another category changes the prices of both.
+    stored = EmissionFactor.objects.filter(pk=instance.pk)
+    instance._stored_category = (
+        stored.values_list('category', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver([post_save, post_delete], sender=EmissionFactor)
+def _factor_changed(sender, instance, **kwargs):
+    categories = {instance.category, getattr(instance, '_stored_category', None)}
+    for category in categories - {None}:
+        updated = EmissionFactorVersion.objects.filter(category=category).update(
+            version=F('version') + 1
+        )
+        if not updated:
+            EmissionFactorVersion.objects.get_or_create(category=category)
+
+
+def apply_emissions(rows, snapshot=None):
+    """Price transactions in place, setting ``emissions`` and ``factor_version``.
+
+    Rows without a factor valid on their day get ``None`` emissions but are
+    still stamped with the version they were checked against.
+    """
+    rows = list(rows)
+    if not rows:
+        return rows
+    snapshot = snapshot or factor_snapshot()
+    kg = compute_emissions(
+        snapshot.table,
+        [row.category for row in rows],
+        [rollup_day(row.date) for row in rows],
+        [row.amount for row in rows],
+    )
+    for row, value in zip(rows, kg.tolist()):
+        row.emissions = None if math.isnan(value) else Decimal(f'{value:.3f}')
+        row.factor_version = snapshot.versions.get(row.category)
+    return rows
+
+
+def stale_filter(versions):
+    """Match transactions priced with anything but the current factor versions."""
+    stale = Q(pk__in=[])
+    for category, version in versions.items():
+        outdated = Q(factor_version__isnull=True) | ~Q(factor_version=version)
+        stale |= Q(category=category) & outdated
+    return stale
+
+
+def plan_recompute(versions, project_ids=None):
+    """Split the stale transactions into ``(project_id, first_day, next_day)`` units.
+
+    Each unit covers one project and calendar month, with ISO date strings
+    so units can be checkpointed as JSON and sent to worker processes.
+    """
+    rows = Transaction.objects.filter(stale_filter(versions))
+    if project_ids:
+        rows = rows.filter(project_id__in=project_ids)
+    months = (
+        rows.annotate(month=TruncMonth('date'))
+        .values('project_id', 'month')
+        .annotate(count=Count('id'))
+        .order_by('project_id', 'month')
+    )
+    units = []
+    for row in months:
+        month = row['month']
+        if isinstance(month, datetime):
+            month = month.date()
+        next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+        units.append((row['project_id'], month.isoformat(), next_month.isoformat()))
+    return units
+
+
+def recompute_unit(unit, batch_size=DEFAULT_BATCH_SIZE):
+    """Reprice the stale transactions of one unit; return how many changed."""
+    project_id, first_day, next_day = unit
+    snapshot = factor_snapshot()
+    start, _ = day_bounds(date.fromisoformat(first_day))
+    end, _ = day_bounds(date.fromisoformat(next_day))
+    rows = (
+        Transaction.objects
+        .filter(stale_filter(snapshot.versions), project_id=project_id,
+                date__gte=start, date__lt=end)
+        .only('id', 'date', 'amount', 'category', 'emissions', 'factor_version')
+        .order_by('id')
+    )
+
+    changed = 0
+    last_id = 0
+    while True:
+        batch = list(rows.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        apply_emissions(batch, snapshot)
+        with transaction.atomic():
+            Transaction.objects.bulk_update(batch, ['emissions', 'factor_version'])
+            Project.bump_data_version([project_id])
+        changed += len(batch)
+    return changed
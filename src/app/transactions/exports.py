@@ -0,0 +1,125 @@
+"""Streaming CSV/NDJSON export of a project's transactions.
+
+Rows are read through a chunked database iterator and encoded into
+roughly fixed-size blocks, optionally gzip-compressed as they go, so an
+export never holds more than one chunk in memory. Under ASGI, Django
+buffers a synchronous iterator whole before sending it, so ``async_blocks``
+hands the blocks over one at a time instead.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+EXPORT_FIELDS = ['id', 'date', 'item_name', 'amount', 'customer_name', 'category']
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+ITERATOR_CHUNK_SIZE = 2000
+BLOCK_SIZE = 64 * 1024
+
+
+class ExportError(ValueError):
+    """Raised when export parameters cannot be understood."""
+
+
+def parse_bound(value, end=False):
+    """Parse a ``start``/``end`` filter given as an ISO date or datetime.
+
+    A bare date used as an ``end`` bound covers that whole day.
+    """
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:
+        day = moment = None
+    if day:
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    elif moment is None:
+        raise ExportError(f'Invalid date "{value}".')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_transactions(queryset, start=None, end=None, categories=None):
+    """Apply the export filters and the index-friendly ``(date, id)`` order."""
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lt=end)
+    if categories:
+        queryset = queryset.filter(category__in=categories)
+    return queryset.order_by('date', 'id')
+
+
+def _rows(queryset):
+    return queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+
+
+def _csv_blocks(queryset):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row_id, date, item_name, amount, customer_name, category in _rows(queryset):
+        writer.writerow(
+            [row_id, date.isoformat(), item_name, amount, customer_name, category]
+        )
+        if buffer.tell() >= BLOCK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_blocks(queryset):
+    lines = []
+    size = 0
+    for row_id, date, item_name, amount, customer_name, category in _rows(queryset):
+        line = json.dumps({
+            'id': row_id,
+            'date': date.isoformat(),
+            'item_name': item_name,
+            'amount': str(amount),
+            'customer_name': customer_name,
+            'category': category,
+        }) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= BLOCK_SIZE:
+            yield ''.join(lines)
+            lines, size = [], 0
+    yield ''.join(lines)
+
+
+def _gzip(blocks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(queryset, fmt, compress=False):
+    """Yield the encoded export of ``queryset`` as bytes blocks."""
+    blocks = _csv_blocks(queryset) if fmt == 'csv' else _ndjson_blocks(queryset)
+    encoded = (block.encode() for block in blocks if block)
+    return _gzip(encoded) if compress else encoded
+
+
+async def async_blocks(blocks):
+    """Yield the blocks of a synchronous export stream from an async iterator."""
+    # Thread-sensitive, so every database read uses the same connection.
+    read = sync_to_async(next, thread_sensitive=True)
+    blocks = iter(blocks)
+    while (block := await read(blocks, None)) is not None:
+        yield block
@@ -0,0 +1,185 @@
+"""Daily amount and emissions forecasts per project.
+
+Models are trained by the ``refresh_forecasts`` command, never inside a
+request. Each project's model is stored in ``ProjectForecast`` together
+with the ``data_version`` it was checked against. A refresh folds in only
+the days completed since the last one, unless rollup totals show that
+earlier history changed, in which case the model is refitted from scratch.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from engine.emissions import to_days
+from engine.forecasting import (
+    MAX_HORIZON,
+    MIN_HORIZON,
+    ForecastError,
+    ForecastModel,
+)
+
+from .models import (
+    EmissionFactorVersion,
+    Project,
+    ProjectDailyRollup,
+    ProjectForecast,
+    Transaction,
+)
+from .reporting import CACHE_ALIAS
+from .rollups import day_bounds, rollup_day, rollup_timezone
+
+TARGETS = ('amount', 'emissions')
+DEFAULT_HORIZON = 30
+
+
+def last_complete_day():
+    """The latest rollup day that has fully passed."""
+    return rollup_day(timezone.now()) - timedelta(days=1)
+
+
+def daily_history(project_id, after=None, through=None):
+    """Per-day amount and emissions totals, aggregated in SQL.
+
+    Returns epoch days and a ``(days, 2)`` array in ``TARGETS`` order.
+    """
+    rows = Transaction.objects.filter(project_id=project_id)
+    if after is not None:
+        rows = rows.filter(date__gte=day_bounds(after)[1])
+    if through is not None:
+        rows = rows.filter(date__lt=day_bounds(through)[1])
+    daily = list(
+        rows.annotate(day=TruncDate('date', tzinfo=rollup_timezone()))
+        .values('day')
+        .annotate(amount=Sum('amount'), emissions=Sum('emissions'))
+        .order_by()
+        .values_list('day', 'amount', 'emissions')
+    )
+    days = to_days([day for day, _, _ in daily])
+    values = np.array(
+        [[float(amount or 0), float(emissions or 0)] for _, amount, emissions in daily],
+        dtype=np.float64,
+    ).reshape(len(daily), len(TARGETS))
+    return days, values
+
+
+def _history_marker(project_id, through):
+    rollups = ProjectDailyRollup.objects.filter(project_id=project_id, day__lte=through)
+    stats = rollups.aggregate(count=Sum('count'), total=Sum('total'))
+    return stats['count'] or 0, stats['total'] or Decimal('0')
+
+
+def _factor_versions():
+    return dict(EmissionFactorVersion.objects.values_list('category', 'version'))
+
+
+def refresh_forecast(project_id):
+    """Bring a project's stored model up to date.
+
+    Returns ``'fresh'``, ``'updated'`` (new days folded in), ``'fitted'``
+    (trained from scratch) or ``'empty'`` (no history to train on).
+    """
+    data_version = (Project.objects.filter(pk=project_id)
+                    .values_list('data_version', flat=True).get())
+    through = last_complete_day()
+    versions = _factor_versions()
+    stored = ProjectForecast.objects.filter(project_id=project_id).first()
+    if (stored and stored.data_version == data_version
+            and stored.trained_through >= through):
+        return 'fresh'
+
+    if stored and stored.factor_versions == versions and (
+        _history_marker(project_id, stored.trained_through)
+        == (stored.history_count, stored.history_total)
+    ):
+        model = ForecastModel.from_state(stored.state)
+        days, values = daily_history(project_id, after=stored.trained_through,
+                                     through=through)
+        outcome = 'updated'
+    else:
+        days, values = daily_history(project_id, through=through)
+        if not len(days):
+            ProjectForecast.objects.filter(project_id=project_id).delete()
+            return 'empty'
+        model = ForecastModel.empty(days.min(), len(TARGETS))
+        outcome = 'fitted'
+    model.update(days, values, through=int(to_days([through])[0]))
+
+    count, total = _history_marker(project_id, through)
+    _store(project_id, {
+        'data_version': data_version,
+        'trained_through': through,
+        'history_count': count,
+        'history_total': total,
+        'factor_versions': versions,
+        'state': model.to_state(),
+    })
+    return outcome
+
+
+def _store(project_id, fields):
+    # Single-statement writes: parallel refresh workers wait on SQLite's write
+    # lock instead of failing to upgrade a read transaction.
+    if ProjectForecast.objects.filter(project_id=project_id).update(**fields):
+        return
+    try:
+        with transaction.atomic():
+            ProjectForecast.objects.create(project_id=project_id, **fields)
+    except IntegrityError:
+        ProjectForecast.objects.filter(project_id=project_id).update(**fields)
+
+
+def horizon_param(value):
+    """Parse the ``days`` query parameter of the forecast API."""
+    try:
+        horizon = int(value or DEFAULT_HORIZON)
+    except (TypeError, ValueError):
+        raise ForecastError('Forecast days must be a whole number.')
+    if not MIN_HORIZON <= horizon <= MAX_HORIZON:
+        raise ForecastError(
+            f'Forecast days must be between {MIN_HORIZON} and {MAX_HORIZON}.'
+        )
+    return horizon
+
+
+def _payload(stored, horizon):
+    forecast = ForecastModel.from_state(stored.state).forecast(horizon)
+    payload = {
+        'days': [str(day) for day in forecast.days],
+        'trained_through': stored.trained_through.isoformat(),
+    }
+    for index, target in enumerate(TARGETS):
+        mean, lower, upper = forecast.column(index)
+        payload[target] = {
+            'mean': mean.round(2).tolist(),
+            'lower': lower.round(2).tolist(),
+            'upper': upper.round(2).tolist(),
+        }
+    return payload
+
+
+def project_forecast(project, horizon):
+    """The stored forecast of ``project`` for ``horizon`` days, or ``None``.
+
+    Payloads are cached per project under its data version; ``stale`` ones
+    (model checked against an older version) are served but not cached.
+    """
+    cache = caches[CACHE_ALIAS]
+    key = (f'forecast:{project.id}:{project.data_version}:'
+           f'{last_complete_day()}:{horizon}')
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+    stored = ProjectForecast.objects.filter(project=project).first()
+    if stored is None:
+        return None
+    stale = stored.data_version != project.data_version
+    payload = {**_payload(stored, horizon), 'stale': stale}
+    if not payload['stale']:
+        cache.set(key, payload)
+    return payload
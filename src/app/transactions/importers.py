@@ -0,0 +1,226 @@
+"""Streaming bulk import of transactions from CSV, JSON or NDJSON files.
+
+Rows are parsed lazily, validated against the ``Transaction`` field rules
+and written in fixed-size batches, so memory use depends on the batch size
+and not on the size of the file.
+"""
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from . import services
+from .models import Transaction
+
+IMPORT_FIELDS = ['item_name', 'amount', 'customer_name', 'category', 'date']
+DEFAULT_CHUNK_SIZE = 1000
+FORMATS = ('csv', 'json', 'ndjson')
+
+_JSON_READ_SIZE = 64 * 1024
+_JSON_MAX_ITEM_SIZE = 1024 * 1024
+
+
+class ImportFormatError(ValueError):
+    """Raised when an import file cannot be parsed at all."""
+
+
+class ImportResult:
+    """Outcome of an import: counts plus the first few row errors."""
+
+    def __init__(self, max_errors):
+        self.imported = 0
+        self.failed = 0
+        self.flagged = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+
+def detect_format(name):
+    """Guess the import format from a file name."""
+    suffix = name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+    if suffix in ('json', 'ndjson'):
+        return suffix
+    if suffix == 'jsonl':
+        return 'ndjson'
+    return 'csv'
+
+
+def iter_rows(stream, fmt):
+    """Yield ``(line, row_dict)`` pairs from a binary file object."""
+    if fmt not in FORMATS:
+        raise ImportFormatError(f'Unsupported import format "{fmt}".')
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        return _checked(_iter_csv(text))
+    if fmt == 'ndjson':
+        return _checked(_iter_ndjson(text))
+    return _checked(_iter_json_array(text))
+
+
+def _checked(rows):
+    """Re-raise decoding and CSV parser errors as ``ImportFormatError``."""
+    line = 0
+    try:
+        for line, row in rows:
+            yield line, row
+    except UnicodeDecodeError:
+        where = f' after line {line}' if line else ''
+        raise ImportFormatError(f'The file is not UTF-8 text{where}.') from None
+    except csv.Error as e:
+        where = f' after line {line}' if line else ''
+        raise ImportFormatError(f'Invalid CSV{where}: {e}.') from None
+
+
+def _iter_csv(text):
+    reader = csv.DictReader(text)
+    if reader.fieldnames is None:
+        return
+    missing = {'item_name', 'amount'} - set(reader.fieldnames)
+    if missing:
+        raise ImportFormatError(f'CSV header is missing: {", ".join(sorted(missing))}.')
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _iter_ndjson(text):
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            yield line, json.loads(raw)
+        except json.JSONDecodeError as e:
+            yield line, ValidationError(f'Invalid JSON: {e.msg}.')
+
+
+def _iter_json_array(text):
+    """Decode the objects of a top-level JSON array one at a time."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    index = 0
+    started = False
+    eof = False
+    while True:
+        # Skip whitespace and separators, refilling the buffer as needed.
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            buffer, position = text.read(_JSON_READ_SIZE), 0
+            eof = not buffer
+        if position >= len(buffer):
+            if started:
+                raise ImportFormatError('Unterminated JSON array.')
+            return
+        if not started:
+            if buffer[position] != '[':
+                raise ImportFormatError('JSON imports must be an array of objects.')
+            started = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            complete = False
+        if not complete:
+            # The item may continue in the next chunk of the file.
+            if eof or len(buffer) - position > _JSON_MAX_ITEM_SIZE:
+                raise ImportFormatError(f'Invalid JSON near item {index + 1}.')
+            chunk = text.read(_JSON_READ_SIZE)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        index += 1
+        yield index, value
+        position = end
+
+
+def build_transaction(project, row):
+    """Validate one parsed row and return an unsaved ``Transaction``."""
+    if isinstance(row, ValidationError):
+        raise row
+    if not isinstance(row, dict):
+        raise ValidationError('Expected an object with transaction fields.')
+    values = {}
+    errors = {}
+    for name in IMPORT_FIELDS:
+        field = Transaction._meta.get_field(name)
+        raw = row.get(name)
+        if isinstance(raw, str):
+            raw = raw.strip()
+        elif isinstance(raw, (dict, list, bool)):
+            errors[name] = ['Expected a text or number value.']
+            continue
+        if raw in (None, ''):
+            if field.has_default():
+                values[name] = field.get_default()
+                continue
+            if field.blank:
+                values[name] = ''
+                continue
+        try:
+            values[name] = field.clean(raw, None)
+        except ValidationError as e:
+            errors[name] = e.messages
+        except (TypeError, ValueError, OverflowError):
+            # Parsers of some fields fail outright on numbers, e.g. a date of 123.
+            message = field.error_messages.get('invalid', 'Enter a valid value.')
+            errors[name] = ValidationError(message, params={'value': raw}).messages
+    if errors:
+        raise ValidationError(errors)
+    if timezone.is_naive(values['date']):
+        values['date'] = timezone.make_aware(values['date'])
+    return Transaction(project=project, **values)
+
+
+def _error_message(error):
+    if hasattr(error, 'error_dict'):
+        return '; '.join(
+            f'{field}: {" ".join(messages)}'
+            for field, messages in error.message_dict.items()
+        )
+    return ' '.join(error.messages)
+
+
+def import_transactions(project, rows, chunk_size=DEFAULT_CHUNK_SIZE, max_errors=100,
+                        on_error=None):
+    """Validate and insert ``(line, row)`` pairs into ``project`` in batches.
+
+    Each batch is written in its own database transaction. Invalid rows are
+    counted and reported through ``on_error(line, message)`` without
+    stopping the import.
+    """
+    result = ImportResult(max_errors)
+    batch = []
+    for line, row in rows:
+        try:
+            batch.append(build_transaction(project, row))
+        except ValidationError as e:
+            message = _error_message(e)
+            result.add_error(line, message)
+            if on_error:
+                on_error(line, message)
+            continue
+        if len(batch) >= chunk_size:
+            _record(batch, result)
+            batch = []
+    if batch:
+        _record(batch, result)
+    return result
+
+
+def _record(batch, result):
+    services.record_transactions(batch)
+    result.imported += len(batch)
+    result.flagged += sum(bool(row.detected_anomalies) for row in batch)
@@ -0,0 +1,196 @@
+"""Batch ingestion of transactions from POS terminals over a JSON API.
+
+Terminals authenticate with a project's bearer token and post up to
+``INGEST_MAX_BATCH`` transactions per request. The whole batch is validated
+first and then written in one database transaction, or rejected as a whole,
+so a terminal never has to work out which half of a batch was stored.
+
+Rows may carry an ``idempotency_key``. A row whose key the project has
+seen before is not inserted again and reports the transaction stored the
+first time, so a terminal on a flaky network can resend a batch until it
+gets an answer.
+"""
+import hashlib
+import json
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import importers, services
+from .models import IdempotencyKey, IngestToken
+
+# last_used_at is written at most this often per token.
+TOKEN_TOUCH_SECONDS = 60
+MAX_REPORTED_ERRORS = 100
+
+_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+class IngestError(ValueError):
+    """Raised when a batch is rejected; ``errors`` lists the invalid rows."""
+
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        self.errors = list(errors)
+
+
+class IngestResult:
+    """Outcome of a batch: one ``(status, transaction id)`` pair per row."""
+
+    def __init__(self, rows, flagged=0):
+        self.rows = rows
+        self.flagged = flagged
+
+    @property
+    def created(self):
+        return sum(status == 'created' for status, _ in self.rows)
+
+    @property
+    def duplicates(self):
+        return len(self.rows) - self.created
+
+    def payload(self):
+        return {
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'flagged': self.flagged,
+            'results': [
+                {'index': index, 'status': status, 'id': pk}
+                for index, (status, pk) in enumerate(self.rows)
+            ],
+        }
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_token(project, name, user=None):
+    """Create an ingest token for ``project``; return it with the secret to hand out."""
+    secret = secrets.token_urlsafe(32)
+    token = IngestToken.objects.create(
+        project=project, name=name, token_hash=hash_token(secret), prefix=secret[:8],
+        created_by=user,
+    )
+    return token, secret
+
+
+def authenticate(header):
+    """The active token named by an ``Authorization: Bearer`` header, or ``None``."""
+    scheme, _, secret = header.partition(' ')
+    if scheme.lower() != 'bearer' or not secret.strip():
+        return None
+    token = (
+        IngestToken.objects.select_related('project')
+        .filter(token_hash=hash_token(secret.strip()), revoked=False)
+        .first()
+    )
+    if token is not None:
+        now = timezone.now()
+        # One conditional UPDATE, skipped by every request within the window.
+        IngestToken.objects.filter(pk=token.pk).exclude(
+            last_used_at__gt=now - timedelta(seconds=TOKEN_TOUCH_SECONDS)
+        ).update(last_used_at=now)
+    return token
+
+
+def parse_batch(body):
+    """Decode a request body into a list of row objects."""
+    try:
+        data = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise IngestError('Request body is not valid JSON.')
+    if isinstance(data, dict):
+        data = data.get('transactions')
+    if not isinstance(data, list) or not data:
+        raise IngestError('Expected a non-empty "transactions" array.')
+    if len(data) > settings.INGEST_MAX_BATCH:
+        raise IngestError(
+            f'At most {settings.INGEST_MAX_BATCH} transactions can be sent at once.'
+        )
+    return data
+
+
+def _idempotency_key(row):
+    key = row.get('idempotency_key') if isinstance(row, dict) else None
+    if key is None or key == '':
+        return None
+    if not isinstance(key, str) or len(key) > _KEY_LENGTH:
+        message = f'Must be a string of at most {_KEY_LENGTH} characters.'
+        raise ValidationError({'idempotency_key': [message]})
+    return key
+
+
+def _error_detail(error):
+    if hasattr(error, 'error_dict'):
+        return error.message_dict
+    return {'__all__': error.messages}
+
+
+def validate_batch(project, data):
+    """Return ``(key, unsaved Transaction)`` pairs, or raise listing bad rows."""
+    rows = []
+    errors = []
+    for index, raw in enumerate(data):
+        try:
+            key = _idempotency_key(raw)
+            rows.append((key, importers.build_transaction(project, raw)))
+        except ValidationError as e:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'index': index, 'errors': _error_detail(e)})
+            else:
+                break
+    if errors:
+        raise IngestError('Some transactions are invalid; none were saved.', errors)
+    return rows
+
+
+def ingest(project, data):
+    """Validate and store a batch of rows for ``project``; return the result."""
+    rows = validate_batch(project, data)
+    try:
+        return _write(project, rows)
+    except IntegrityError:
+        # A concurrent retry stored some of the same keys first; all of the
+        # batch was rolled back, so write it again against the stored keys.
+        for _, row in rows:
+            row.pk = None
+            row._state.adding = True
+        return _write(project, rows)
+
+
+def _write(project, rows):
+    keys = {key for key, _ in rows if key is not None}
+    with transaction.atomic():
+        stored = dict(
+            IdempotencyKey.objects.filter(project=project, key__in=keys)
+            .values_list('key', 'transaction_id')
+        ) if keys else {}
+        # The first row with a key is stored; repeats within the batch are
+        # duplicates of it.
+        first = {}
+        new = []
+        for key, row in rows:
+            if key is None or (key not in stored and key not in first):
+                new.append(row)
+                if key is not None:
+                    first[key] = row
+        services.record_transactions(new)
+        IdempotencyKey.objects.bulk_create(
+            IdempotencyKey(project=project, key=key, transaction=row)
+            for key, row in first.items()
+        )
+    results = []
+    for key, row in rows:
+        if key in stored:
+            results.append(('duplicate', stored[key]))
+        elif key is not None and first[key] is not row:
+            results.append(('duplicate', first[key].pk))
+        else:
+            results.append(('created', row.pk))
+    flagged = sum(bool(row.detected_anomalies) for row in new)
+    return IngestResult(results, flagged=flagged)
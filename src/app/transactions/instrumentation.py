@@ -0,0 +1,223 @@
+"""Per-request SQL, template and view timing.
+
+``RequestTimingMiddleware`` times SQL statements and top-level template
+renders of the sampled requests, and reports the split as a
+``Server-Timing`` header and a JSON log line on the ``transactions.requests``
+logger. Statements repeated within one request are flagged as likely N+1
+patterns. Unsampled requests only pay for two clock reads, used for the
+slow-request log, and a context variable lookup per query.
+
+Every connection carries one execution wrapper, installed when it
+connects, that records into the current request's ``RequestMetrics``. The
+metrics live in a context variable rather than on the connections of the
+thread that received the request: under ASGI the ORM runs in
+``sync_to_async`` worker threads with connections of their own, and the
+context is copied into those threads.
+"""
+import json
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import Template as DjangoTemplate
+
+logger = logging.getLogger('transactions.requests')
+slow_logger = logging.getLogger('transactions.requests.slow')
+
+_current = ContextVar('request_metrics', default=None)
+_SQL_PREVIEW = 300
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class RequestMetrics:
+    """Timings collected while serving one request."""
+
+    def __init__(self):
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.statements = Counter()
+        self.statement_ms = defaultdict(float)
+        self._rendering = False
+
+    @property
+    def queries(self):
+        return sum(self.statements.values())
+
+    def __call__(self, execute, sql, params, many, context):
+        # Django execute_wrapper hook: time the statement and count its shape.
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.sql_ms += elapsed
+            self.statements[sql] += 1
+            self.statement_ms[sql] += elapsed
+
+    def duplicates(self, threshold):
+        """Statements executed at least ``threshold`` times, most repeated first."""
+        return [
+            {'sql': sql[:_SQL_PREVIEW], 'count': count}
+            for sql, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def slowest(self, limit=5):
+        """The statements that took the most time in total."""
+        ranked = sorted(self.statement_ms.items(), key=lambda item: -item[1])[:limit]
+        return [
+            {
+                'sql': sql[:_SQL_PREVIEW],
+                'count': self.statements[sql],
+                'ms': round(ms, 2),
+            }
+            for sql, ms in ranked
+        ]
+
+
+def _timed_render(render):
+    def wrapper(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None or metrics._rendering:
+            return render(self, context, request)
+        # Only the outermost render is timed; included templates are part of it.
+        metrics._rendering = True
+        start = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            metrics.template_ms += (time.perf_counter() - start) * 1000
+            metrics._rendering = False
+    wrapper._request_timing = True
+    return wrapper
+
+
+if not getattr(DjangoTemplate.render, '_request_timing', False):
+    DjangoTemplate.render = _timed_render(DjangoTemplate.render)
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def instrument(connection):
+    """Install the query recorder on a connection, once."""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@receiver(connection_created)
+def _instrument_new_connection(sender, connection, **kwargs):
+    instrument(connection)
+
+
+class RequestTimingMiddleware:
+    """Record and report where the time of each sampled request went."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = _setting('REQUEST_TIMING_SAMPLE_RATE', 0.0)
+        self.slow_ms = _setting('REQUEST_TIMING_SLOW_MS', None)
+        self.duplicate_threshold = _setting('REQUEST_TIMING_DUPLICATE_THRESHOLD', 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        if not self._sampled():
+            response = self.get_response(request)
+            self._report_slow(request, response, start)
+            return response
+        metrics, token = self._begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, metrics, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        if not self._sampled():
+            response = await self.get_response(request)
+            self._report_slow(request, response, start)
+            return response
+        metrics, token = self._begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, metrics, start)
+        return response
+
+    def _sampled(self):
+        return self.sample_rate > 0 and (
+            self.sample_rate >= 1 or random.random() < self.sample_rate
+        )
+
+    @staticmethod
+    def _begin():
+        # Connections opened before this module was imported missed the signal.
+        for connection in connections.all(initialized_only=True):
+            instrument(connection)
+        metrics = RequestMetrics()
+        return metrics, _current.set(metrics)
+
+    def _report_slow(self, request, response, start):
+        total_ms = (time.perf_counter() - start) * 1000
+        if self.slow_ms is not None and total_ms >= self.slow_ms:
+            slow_logger.warning(json.dumps(self._record(request, response, total_ms)))
+
+    def _finish(self, request, response, metrics, start):
+        total_ms = (time.perf_counter() - start) * 1000
+        view_ms = max(total_ms - metrics.sql_ms - metrics.template_ms, 0.0)
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={metrics.sql_ms:.1f};desc="{metrics.queries} queries"',
+            f'template;dur={metrics.template_ms:.1f}',
+            f'view;dur={view_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+        record = self._record(request, response, total_ms)
+        record.update({
+            'view_ms': round(view_ms, 2),
+            'sql_ms': round(metrics.sql_ms, 2),
+            'sql_queries': metrics.queries,
+            'template_ms': round(metrics.template_ms, 2),
+        })
+        duplicates = metrics.duplicates(self.duplicate_threshold)
+        if duplicates:
+            record['duplicate_queries'] = duplicates
+        logger.log(logging.WARNING if duplicates else logging.INFO, json.dumps(record))
+        if self.slow_ms is not None and total_ms >= self.slow_ms:
+            record['slowest_queries'] = metrics.slowest()
+            slow_logger.warning(json.dumps(record))
+
+    @staticmethod
+    def _record(request, response, total_ms):
+        match = getattr(request, 'resolver_match', None)
+        return {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+        }
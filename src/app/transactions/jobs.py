@@ -0,0 +1,411 @@
+"""Database-backed background jobs.
+
+Slow project operations (large imports, export files, emission recomputes
+and rollup rebuilds) are queued as ``Job`` rows and run by the ``run_jobs``
+worker, so the request that starts them returns straight away. There is no
+broker: workers poll the table and claim each job with one conditional
+``UPDATE`` that also enforces ``JOBS_PROJECT_CONCURRENCY``, so any number
+of worker processes can share the database.
+
+Handlers report progress through ``Progress``. While a handler runs, a
+``Heartbeat`` thread with its own connection keeps the job's heartbeat
+fresh, so a single long step (a rollup rebuild in one transaction, say)
+does not look like a dead worker. A handler that raises is retried with
+exponential backoff until ``max_attempts`` is used up; ``JobError`` fails
+the job at once. Running jobs whose heartbeat stops, because their worker
+was killed, are put back on the queue.
+"""
+import gzip
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import Count, F
+from django.urls import reverse
+from django.utils import timezone
+
+from . import emissions, exports, importers, rollups
+from .models import Job, Transaction
+
+logger = logging.getLogger(__name__)
+
+handlers = {}
+
+# Seconds between progress writes of a running job.
+PROGRESS_INTERVAL = 1.0
+RECENT_JOBS = 10
+
+
+class JobError(Exception):
+    """Raised by a handler for failures that retrying cannot fix."""
+
+
+def handler(kind, max_attempts=3):
+    """Register ``func(job, progress)`` as the handler of a job kind."""
+    def register(func):
+        handlers[kind] = (func, max_attempts)
+        return func
+    return register
+
+
+def project_concurrency():
+    return getattr(settings, 'JOBS_PROJECT_CONCURRENCY', 1)
+
+
+def stale_after():
+    return timedelta(seconds=getattr(settings, 'JOBS_STALE_SECONDS', 300))
+
+
+def retry_delay(attempt):
+    """Backoff before retrying after the given (1-based) failed attempt."""
+    return timedelta(
+        seconds=getattr(settings, 'JOBS_RETRY_DELAY_SECONDS', 30) * 2 ** (attempt - 1)
+    )
+
+
+def files_dir():
+    path = Path(getattr(settings, 'JOBS_FILES_DIR', settings.BASE_DIR / 'job_files'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def job_file(name):
+    # Names are generated here, never taken from a request.
+    return files_dir() / Path(name).name
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue(kind, project=None, user=None, **params):
+    """Queue a job of a registered kind; ``params`` must be JSON-serialisable."""
+    if kind not in handlers:
+        raise ValueError(f'Unknown job kind "{kind}".')
+    return Job.objects.create(
+        kind=kind, project=project, created_by=user, params=params,
+        max_attempts=handlers[kind][1],
+    )
+
+
+def save_upload(upload):
+    """Copy an uploaded file where workers can read it; return its name."""
+    name = f'upload-{uuid.uuid4().hex}'
+    with open(job_file(name), 'wb') as handle:
+        for chunk in upload.chunks():
+            handle.write(chunk)
+    return name
+
+
+def _busy_projects():
+    return (
+        Job.objects.filter(status=Job.RUNNING, project__isnull=False)
+        .order_by()
+        .values('project_id')
+        .annotate(running=Count('id'))
+        .filter(running__gte=project_concurrency())
+        .values('project_id')
+    )
+
+
+def claim(worker, limit=1):
+    """Mark up to ``limit`` due jobs as running for ``worker``; return their ids.
+
+    Jobs are taken oldest first, skipping projects that already run
+    ``JOBS_PROJECT_CONCURRENCY`` jobs.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).exclude(
+        project_id__in=_busy_projects()
+    )
+    ids = due.order_by('run_after', 'id').values_list('id', flat=True)
+    candidates = list(ids[:limit * 4])
+    claimed = []
+    for job_id in candidates:
+        if len(claimed) >= limit:
+            break
+        # A single statement re-checks the status and the project's running
+        # jobs at write time, so concurrent workers cannot both win.
+        won = due.filter(pk=job_id).update(
+            status=Job.RUNNING, worker=worker, attempts=F('attempts') + 1,
+            started_at=now, heartbeat_at=now, finished_at=None,
+        )
+        if won:
+            claimed.append(job_id)
+    return claimed
+
+
+def requeue_stale():
+    """Requeue (or fail) running jobs whose worker stopped sending heartbeats."""
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=now - stale_after())
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, message='The worker stopped responding.'
+    )
+    requeued = stale.update(
+        status=Job.QUEUED, worker='', run_after=now,
+        message='The worker stopped responding; requeued.',
+    )
+    return requeued + failed
+
+
+class Progress:
+    """Throttled progress updates of a running job; each write is a heartbeat."""
+
+    def __init__(self, job, interval=PROGRESS_INTERVAL):
+        self.job = job
+        self.interval = interval
+        self._written = time.monotonic()
+
+    def update(self, done, total=None, message=None, force=False):
+        job = self.job
+        job.progress_done = done
+        if total is not None:
+            job.progress_total = total
+        if message is not None:
+            job.message = message[:255]
+        now = time.monotonic()
+        if force or now - self._written >= self.interval:
+            self._written = now
+            Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+                progress_done=job.progress_done, progress_total=job.progress_total,
+                message=job.message, heartbeat_at=timezone.now(),
+            )
+
+
+class Heartbeat(threading.Thread):
+    """Refresh a running job's heartbeat every ``interval`` seconds until stopped."""
+
+    def __init__(self, job, worker, interval):
+        super().__init__(name=f'job-{job.pk}-heartbeat', daemon=True)
+        self.job = job
+        self.worker = worker
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    Job.objects.filter(
+                        pk=self.job.pk, status=Job.RUNNING, worker=self.worker
+                    ).update(heartbeat_at=timezone.now())
+                except DatabaseError:
+                    # SQLite stays locked while the handler holds a write
+                    # transaction; requeue_stale cannot write then either.
+                    logger.warning(
+                        'Heartbeat of job %s failed; retrying.', self.job.pk,
+                        exc_info=True,
+                    )
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def run_job(job_id, worker):
+    """Run one claimed job and record its outcome; return the final status."""
+    job = Job.objects.select_related('project').get(pk=job_id)
+    heartbeat = Heartbeat(job, worker, stale_after().total_seconds() / 4)
+    heartbeat.start()
+    try:
+        if job.kind not in handlers:
+            raise JobError(f'No handler for job kind "{job.kind}".')
+        func, _ = handlers[job.kind]
+        job.message = ''
+        result = func(job, Progress(job))
+    except Exception as e:
+        return _failed(job, worker, e)
+    finally:
+        heartbeat.stop()
+    _record(
+        job, worker, status=Job.SUCCEEDED, result=result, message='', error='',
+        progress_done=job.progress_total or job.progress_done,
+    )
+    return Job.SUCCEEDED
+
+
+def _failed(job, worker, error):
+    retry = not isinstance(error, JobError) and job.attempts < job.max_attempts
+    if retry:
+        logger.warning(
+            'Job %s failed on attempt %s; retrying.', job.pk, job.attempts,
+            exc_info=error,
+        )
+        status = Job.QUEUED
+        fields = {
+            'run_after': timezone.now() + retry_delay(job.attempts),
+            'message': (
+                f'Attempt {job.attempts} of {job.max_attempts} failed; retrying.'
+            ),
+        }
+    else:
+        logger.error('Job %s failed.', job.pk, exc_info=error)
+        status = Job.FAILED
+        message = str(error)[:255] if isinstance(error, JobError) else 'The job failed.'
+        fields = {'message': message}
+    error_text = ''.join(traceback.format_exception(error))
+    _record(job, worker, status=status, error=error_text, **fields)
+    return status
+
+
+def _record(job, worker, status, **fields):
+    now = timezone.now()
+    if status != Job.QUEUED:
+        fields['finished_at'] = now
+    # Guarded by the worker, in case the job was requeued as stale meanwhile.
+    Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=worker).update(
+        status=status, heartbeat_at=now, **fields
+    )
+
+
+def run_pending(worker=None, max_jobs=None):
+    """Claim and run due jobs one at a time in this thread; return how many ran."""
+    worker = worker or worker_name()
+    ran = 0
+    while max_jobs is None or ran < max_jobs:
+        claimed = claim(worker)
+        if not claimed:
+            break
+        run_job(claimed[0], worker)
+        ran += 1
+    return ran
+
+
+def purge_finished(days=None):
+    """Delete finished jobs older than ``JOBS_RETENTION_DAYS`` and their files."""
+    days = days if days is not None else getattr(settings, 'JOBS_RETENTION_DAYS', 7)
+    old = Job.objects.filter(
+        status__in=[Job.SUCCEEDED, Job.FAILED],
+        finished_at__lt=timezone.now() - timedelta(days=days),
+    )
+    for job in old.only('id', 'result'):
+        if job.result and job.result.get('file'):
+            job_file(job.result['file']).unlink(missing_ok=True)
+    return old.delete()[0]
+
+
+def recent_jobs(project, limit=RECENT_JOBS):
+    return list(
+        Job.objects.filter(project=project).order_by('-created_at', '-id')[:limit]
+    )
+
+
+def job_payload(job):
+    """JSON-ready status of a job, as polled by the UI."""
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'kind_display': job.get_kind_display(),
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'finished': job.finished,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'progress': {
+            'done': job.progress_done,
+            'total': job.progress_total,
+            'percent': job.percent,
+        },
+        'message': job.message,
+        'result': job.result,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': (
+            reverse('job_status_api', args=[job.project_id, job.pk])
+            if job.project_id else None
+        ),
+        'download_url': (
+            reverse('job_download', args=[job.project_id, job.pk])
+            if job.kind == 'export' and job.status == Job.SUCCEEDED else None
+        ),
+    }
+
+
+# Batches are committed as they go, so retrying would import rows twice.
+@handler('import', max_attempts=1)
+def import_file(job, progress):
+    path = job_file(job.params['file'])
+    size = path.stat().st_size
+    try:
+        with open(path, 'rb') as handle:
+            def rows():
+                for line, row in importers.iter_rows(handle, job.params['format']):
+                    progress.update(handle.tell(), size)
+                    yield line, row
+            result = importers.import_transactions(job.project, rows())
+    except importers.ImportFormatError as e:
+        raise JobError(f'Import failed: {e}') from e
+    finally:
+        path.unlink(missing_ok=True)
+    progress.update(size, size)
+    return {
+        'imported': result.imported,
+        'failed': result.failed,
+        'flagged': result.flagged,
+        'errors': [[line, error] for line, error in result.errors[:5]],
+    }
+
+
+@handler('export')
+def export_file(job, progress):
+    params = job.params
+    fmt = params.get('format', 'csv')
+    try:
+        if fmt not in exports.FORMATS:
+            raise exports.ExportError(f'Unsupported export format "{fmt}".')
+        start = exports.parse_bound(params.get('start'))
+        end = exports.parse_bound(params.get('end'), end=True)
+    except exports.ExportError as e:
+        raise JobError(str(e)) from e
+    rows = exports.filter_transactions(
+        Transaction.objects.filter(project_id=job.project_id),
+        start, end, params.get('categories'),
+    )
+    total = rows.count()
+    name = f'export-{job.pk}.{fmt}.gz'
+    path = job_file(name)
+    done = 0
+    with gzip.open(f'{path}.tmp', 'wb') as out:
+        for block in exports.export_stream(rows, fmt):
+            out.write(block)
+            # One line per row (plus the CSV header).
+            done = min(done + block.count(b'\n'), total)
+            progress.update(done, total)
+    os.replace(f'{path}.tmp', path)
+    return {
+        'file': name,
+        'filename': f'project-{job.project_id}-transactions.{fmt}.gz',
+        'rows': total,
+        'bytes': path.stat().st_size,
+    }
+
+
+@handler('recompute_emissions')
+def recompute_emissions(job, progress):
+    units = emissions.plan_recompute(
+        emissions.factor_snapshot().versions, [job.project_id]
+    )
+    progress.update(0, len(units), force=True)
+    changed = 0
+    for done, unit in enumerate(units, start=1):
+        changed += emissions.recompute_unit(unit)
+        progress.update(done, len(units))
+    return {'repriced': changed}
+
+
+@handler('rebuild_rollups')
+def rebuild_rollups(job, progress):
+    progress.update(0, 1, force=True)
+    return {'rollups': rollups.rebuild_project_rollups(job.project_id)}
@@ -0,0 +1,224 @@
+"""Synthetic users, projects and transactions for load testing.
+
+Columns are drawn with NumPy in bulk and inserted with ``executemany``;
+rollups, sketches and anomaly detector states are rebuilt once per project
+afterwards instead of being updated row by row.
+"""
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from engine.emissions import compute_emissions
+
+from . import anomalies, emissions, rollups, sketches
+from .models import Project, ProjectMember, Transaction
+
+DEFAULT_BATCH_SIZE = 5000
+INSERT_FIELDS = [
+    'project', 'date', 'item_name', 'amount', 'customer_name', 'category',
+    'emissions', 'factor_version',
+]
+
+MENU = {
+    'beverage': [
+        ('Latte', 4.80), ('Cappuccino', 4.60), ('Flat White', 4.50),
+        ('Espresso', 3.20), ('Tea', 3.00), ('Iced Coffee', 5.20),
+    ],
+    'food': [
+        ('Bagel', 3.90), ('Croissant', 3.60), ('Muffin', 3.40),
+        ('Sandwich', 8.50), ('Salad', 9.50),
+    ],
+    'merchandise': [('Mug', 14.00), ('Coffee Beans 250g', 12.50), ('Tote Bag', 18.00)],
+    'other': [('Gift Card', 25.00), ('Catering', 60.00)],
+}
+CATEGORY_WEIGHTS = {'beverage': 0.58, 'food': 0.30, 'merchandise': 0.05, 'other': 0.07}
+# Monday..Sunday, and 06:00..20:00 with a morning and a lunch peak.
+WEEKDAY_WEIGHTS = [0.9, 0.9, 0.95, 1.0, 1.1, 1.4, 1.3]
+HOUR_WEIGHTS = [2, 6, 9, 8, 6, 5, 7, 8, 6, 4, 3, 3, 2, 1, 1]
+FIRST_HOUR = 6
+ROLE_WEIGHTS = {'admin': 0.1, 'member': 0.6, 'viewer': 0.3}
+FIRST_NAMES = [
+    'Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie',
+    'Avery', 'Quinn', 'Charlie', 'Robin', 'Drew', 'Skyler', 'Reese', 'Rowan',
+    'Hayden', 'Emerson', 'Parker', 'Sage',
+]
+
+
+def _weights(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values / values.sum()
+
+
+class LoadGenerator:
+    """Writes a synthetic dataset; all randomness comes from one seeded generator."""
+
+    def __init__(self, seed=0, days=365, batch_size=DEFAULT_BATCH_SIZE, now=None):
+        self.rng = np.random.default_rng(seed)
+        self.days = days
+        self.batch_size = batch_size
+        self.now = now or timezone.now()
+        self.categories = list(MENU)
+        self.prices = [
+            [price for _, price in MENU[category]] for category in self.categories
+        ]
+        self.customers = [
+            f'{name} {chr(65 + i % 26)}.' for i, name in enumerate(FIRST_NAMES * 26)
+        ]
+
+        # Recent days are busier (growth) and weekends busier than weekdays.
+        first_day = (self.now - timedelta(days=days)).date()
+        day_offsets = np.arange(days + 1)
+        weekdays = (first_day.weekday() + day_offsets) % 7
+        growth = np.linspace(0.6, 1.0, days + 1)
+        self.first_midnight = datetime.combine(
+            first_day, datetime.min.time(), tzinfo=dt_timezone.utc
+        )
+        self.day_weights = _weights(np.asarray(WEEKDAY_WEIGHTS)[weekdays] * growth)
+        self.hour_weights = _weights(HOUR_WEIGHTS)
+        self.category_weights = _weights([CATEGORY_WEIGHTS[c] for c in self.categories])
+
+    def create_users(self, count, prefix='load', password='loadtest'):
+        """Create ``count`` users sharing one pre-hashed password."""
+        taken = User.objects.filter(username__startswith=prefix).count()
+        hashed = make_password(password)
+        users = [
+            User(
+                username=f'{prefix}{taken + i}',
+                email=f'{prefix}{taken + i}@example.com',
+                password=hashed,
+            )
+            for i in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        return list(
+            User.objects.filter(username__in=[u.username for u in users]).order_by('id')
+        )
+
+    def create_projects(self, users, count):
+        """Create ``count`` projects owned by randomly chosen users."""
+        owners = self.rng.integers(0, len(users), count)
+        taken = Project.objects.filter(name__startswith='Load Project ').count()
+        projects = [
+            Project(
+                name=f'Load Project {taken + i}',
+                owner=users[owner],
+                description='Synthetic load data',
+            )
+            for i, owner in enumerate(owners)
+        ]
+        Project.objects.bulk_create(projects, batch_size=self.batch_size)
+        return list(
+            Project.objects.filter(name__in=[p.name for p in projects]).order_by('id')
+        )
+
+    def create_memberships(self, users, projects, per_project):
+        """Add up to ``per_project`` members (never the owner) to every project."""
+        roles = list(ROLE_WEIGHTS)
+        role_weights = _weights(list(ROLE_WEIGHTS.values()))
+        members = []
+        for project in projects:
+            picked = self.rng.choice(
+                len(users), min(per_project + 1, len(users)), replace=False
+            )
+            candidates = [users[i] for i in picked if users[i].id != project.owner_id]
+            candidates = candidates[:per_project]
+            picked_roles = self.rng.choice(len(roles), len(candidates), p=role_weights)
+            for user, role in zip(candidates, picked_roles):
+                members.append(
+                    ProjectMember(project=project, user=user, role=roles[role])
+                )
+        ProjectMember.objects.bulk_create(
+            members, batch_size=self.batch_size, ignore_conflicts=True
+        )
+        return len(members)
+
+    def split_transactions(self, projects, total):
+        """Spread ``total`` transactions over projects with a long-tailed size mix."""
+        shares = _weights(self.rng.lognormal(0.0, 1.0, len(projects)))
+        return dict(zip((p.id for p in projects), self.rng.multinomial(total, shares)))
+
+    def transaction_batch(self, project_id, size, snapshot):
+        """Draw ``size`` transactions for one project as ``INSERT_FIELDS`` tuples."""
+        rng = self.rng
+        days = rng.choice(len(self.day_weights), size, p=self.day_weights)
+        hours = FIRST_HOUR + rng.choice(
+            len(self.hour_weights), size, p=self.hour_weights
+        )
+        seconds = days * 86400 + hours * 3600 + rng.integers(0, 3600, size)
+        category_codes = rng.choice(len(self.categories), size, p=self.category_weights)
+        picks = rng.random(size)
+        prices = np.array([
+            self.prices[c][int(p * len(self.prices[c]))]
+            for c, p in zip(category_codes, picks)
+        ])
+        cents = np.round(
+            prices * rng.geometric(0.8, size) * rng.lognormal(0.0, 0.08, size) * 100
+        )
+        # Repeat customers follow a Zipf law; about a third of sales are anonymous.
+        customers = np.minimum(rng.zipf(1.6, size), len(self.customers)) - 1
+        customers[rng.random(size) < 0.35] = -1
+
+        dates = [
+            min(self.first_midnight + timedelta(seconds=offset), self.now)
+            for offset in seconds.tolist()
+        ]
+        categories = [self.categories[code] for code in category_codes.tolist()]
+        kg = compute_emissions(
+            snapshot.table,
+            categories,
+            [rollups.rollup_day(d) for d in dates],
+            cents / 100,
+        )
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+        return [
+            (
+                project_id,
+                adapt_datetime(date),
+                MENU[category][int(pick * len(MENU[category]))][0],
+                Decimal(cent).scaleb(-2),
+                self.customers[customer] if customer >= 0 else '',
+                category,
+                None if value != value else Decimal(f'{value:.3f}'),
+                snapshot.versions.get(category),
+            )
+            for date, category, pick, cent, customer, value in zip(
+                dates, categories, picks.tolist(), cents.astype(np.int64).tolist(),
+                customers.tolist(), kg.tolist(),
+            )
+        ]
+
+    def create_transactions(self, project_id, count, progress=None):
+        """Insert ``count`` transactions for a project and rebuild its derived data.
+
+        Rows go through ``executemany`` rather than ``bulk_create``: building
+        model instances costs more than the insert itself at this volume.
+        """
+        snapshot = emissions.factor_snapshot()
+        quote = connection.ops.quote_name
+        columns = [Transaction._meta.get_field(name).column for name in INSERT_FIELDS]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(Transaction._meta.db_table),
+            ', '.join(quote(column) for column in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        written = 0
+        while written < count:
+            batch = self.transaction_batch(
+                project_id, min(self.batch_size, count - written), snapshot
+            )
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+            written += len(batch)
+            if progress:
+                progress(len(batch))
+        if count:
+            rollups.rebuild_project_rollups(project_id)
+            sketches.rebuild_project_sketches(project_id)
+            anomalies.replay_project(project_id)
+        return written
@@ -0,0 +1,31 @@
+"""Helpers shared by the management commands.
+
+The leading underscore keeps Django from listing this module as a command.
+"""
+import django
+from django.core.management.base import CommandError
+from django.db import connections
+
+from transactions.models import Project
+
+
+def init_worker():
+    """``ProcessPoolExecutor`` initializer for commands that fork workers."""
+    # Forked workers must not share the parent's database connections.
+    django.setup()
+    connections.close_all()
+
+
+def resolve_project_ids(project_ids):
+    """Ids of the requested projects, or of every project, in id order.
+
+    Raises ``CommandError`` naming the requested ids that match no project.
+    """
+    projects = Project.objects.order_by('id')
+    if project_ids:
+        projects = projects.filter(id__in=project_ids)
+    ids = list(projects.values_list('id', flat=True))
+    if project_ids and len(ids) != len(set(project_ids)):
+        missing = sorted(set(project_ids) - set(ids))
+        raise CommandError(f'Unknown project ids: {missing}')
+    return ids
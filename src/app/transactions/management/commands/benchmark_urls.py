@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions import benchmarks
+from transactions.models import Project
+
+
+class Command(BaseCommand):
+    help = ('Measure latency and SQL query counts of every app URL and compare them '
+            'with a baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='URL names to run (default: all).')
+        parser.add_argument('--project', type=int,
+                            help='Project to benchmark (default: the busiest).')
+        parser.add_argument('--repeat', type=int, default=benchmarks.DEFAULT_REPEAT)
+        baseline = settings.BASE_DIR / 'benchmarks' / 'baseline.json'
+        parser.add_argument('--baseline', default=str(baseline))
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Store these results as the baseline.')
+        parser.add_argument('--tolerance', type=float,
+                            default=benchmarks.DEFAULT_TOLERANCE,
+                            help='Allowed median slowdown as a fraction (0.5 = 50%%).')
+        parser.add_argument('--host', default='localhost',
+                            help='Host name the requests are made to.')
+
+    def handle(self, *args, names, project, repeat, baseline, save_baseline,
+               tolerance, host, **options):
+        if project:
+            target = Project.objects.filter(id=project).first()
+        else:
+            target = benchmarks.default_project()
+        if target is None:
+            raise CommandError('No project to benchmark; run generate_load_data first.')
+
+        try:
+            results = benchmarks.run_benchmarks(
+                target, names or None, max(1, repeat), host
+            )
+        except benchmarks.BenchmarkError as e:
+            raise CommandError(str(e))
+        dataset = benchmarks.dataset_description(target)
+
+        self.stdout.write(
+            f'Project {target.id}: {dataset["project_transactions"]:,} of '
+            f'{dataset["transactions"]:,} transactions'
+        )
+        self.stdout.write(
+            f'{"url":<24}{"status":>7}{"queries":>9}{"median ms":>11}{"max ms":>10}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<24}{result["status"]:>7}{result["queries"]:>9}'
+                f'{result["median_ms"]:>11.1f}{result["max_ms"]:>10.1f}'
+            )
+
+        if save_baseline:
+            benchmarks.save_baseline(baseline, dataset, results)
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline}.'))
+            return
+
+        try:
+            stored = benchmarks.load_baseline(baseline)
+        except FileNotFoundError:
+            self.stdout.write(
+                self.style.WARNING(f'No baseline at {baseline}; use --save-baseline.')
+            )
+            return
+        if stored['dataset'] != dataset:
+            self.stdout.write(self.style.WARNING(
+                f'Baseline dataset differs ({stored["dataset"]}); '
+                'latency comparisons are approximate.'
+            ))
+        regressions = benchmarks.compare(results, stored['results'], tolerance)
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            raise CommandError(
+                f'{len(regressions)} regression(s) against the baseline.'
+            )
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
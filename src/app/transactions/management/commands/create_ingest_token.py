@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions import ingest
+from transactions.models import Project
+
+
+class Command(BaseCommand):
+    help = ('Create a bearer token a POS terminal uses to post transactions to a '
+            'project.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int,
+                            help='Project the token may write to.')
+        parser.add_argument('--name', default='POS terminal',
+                            help='Label to tell tokens apart.')
+
+    def handle(self, *args, project_id, name, **options):
+        project = Project.objects.filter(id=project_id).first()
+        if project is None:
+            raise CommandError(f'Unknown project id: {project_id}')
+        token, secret = ingest.create_token(project, name)
+        self.stdout.write(
+            f'Token "{token.name}" for {project.name}; it is not shown again:'
+        )
+        self.stdout.write(self.style.SUCCESS(secret))
@@ -0,0 +1,43 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from transactions.snapshots import export_project, snapshot_path
+
+from ._common import resolve_project_ids
+
+
+class Command(BaseCommand):
+    help = (
+        'Append the transactions of whole days to the columnar snapshots the '
+        'engine memory-maps. Snapshots are checked against the daily rollups '
+        'and rebuilt when earlier days changed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int,
+                            help='Projects to export (default: all).')
+        parser.add_argument(
+            '--until', type=date.fromisoformat,
+            help='Export the days before this date, YYYY-MM-DD (default: today).',
+        )
+        parser.add_argument(
+            '--root', help='Snapshot directory (default: settings.SNAPSHOTS_DIR).'
+        )
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Rewrite the snapshots from scratch.')
+
+    def handle(self, *args, project_ids, until, root, rebuild, **options):
+        ids = resolve_project_ids(project_ids)
+
+        total = 0
+        for project_id in ids:
+            rows, rebuilt = export_project(
+                project_id, until=until, rebuild=rebuild, root=root
+            )
+            total += rows
+            action = 'wrote' if rebuilt else 'appended'
+            path = snapshot_path(project_id, root)
+            self.stdout.write(f'Project {project_id}: {action} {rows:,} rows in {path}')
+        message = f'Exported {total:,} rows across {len(ids)} project(s).'
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.loadgen import DEFAULT_BATCH_SIZE, LoadGenerator
+
+
+class Command(BaseCommand):
+    help = ('Create synthetic users, projects, memberships and transactions for '
+            'load testing.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--projects', type=int, default=200)
+        parser.add_argument('--members', type=int, default=3,
+                            help='Members added to each project.')
+        parser.add_argument('--transactions', type=int, default=1_000_000,
+                            help='Total across all projects.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='History length transactions are spread over.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--password', default='loadtest',
+                            help='Password of every generated user.')
+
+    def handle(self, *args, users, projects, members, transactions, days, seed,
+               batch_size, password, **options):
+        if users < 1 or projects < 1:
+            raise CommandError('At least one user and one project are required.')
+        started = time.perf_counter()
+        generator = LoadGenerator(seed=seed, days=days, batch_size=batch_size)
+
+        created_users = generator.create_users(users, password=password)
+        created_projects = generator.create_projects(created_users, projects)
+        memberships = generator.create_memberships(
+            created_users, created_projects, members
+        )
+        self.stdout.write(
+            f'Created {len(created_users)} users, {len(created_projects)} projects, '
+            f'{memberships} memberships.'
+        )
+
+        written = 0
+        counts = generator.split_transactions(created_projects, transactions)
+        for project_id, count in counts.items():
+            written += generator.create_transactions(project_id, int(count))
+            self.stdout.write(
+                f'\r{written:,} / {transactions:,} transactions', ending=''
+            )
+            self.stdout.flush()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write('')
+        rate = written / max(elapsed, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written:,} transactions in {elapsed:.1f}s ({rate:,.0f} rows/s). '
+            f'Users log in with password "{password}".'
+        ))
@@ -0,0 +1,54 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.importers import (
+    DEFAULT_CHUNK_SIZE,
+    FORMATS,
+    ImportFormatError,
+    detect_format,
+    import_transactions,
+    iter_rows,
+)
+from transactions.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV, JSON or NDJSON file of transactions into a project.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int)
+        parser.add_argument('path', help='File to import, or "-" for standard input.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Defaults to the file extension (csv otherwise).')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Rows per insert transaction.')
+
+    def handle(self, *args, project_id, path, format, chunk_size, **options):
+        try:
+            project = Project.objects.get(id=project_id)
+        except Project.DoesNotExist:
+            raise CommandError(f'Project {project_id} does not exist.')
+
+        fmt = format or detect_format(path)
+        try:
+            stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as e:
+            raise CommandError(f'Cannot open {path}: {e.strerror}.')
+
+        def report(line, message):
+            self.stderr.write(f'{path}:{line}: {message}')
+
+        try:
+            with stream:
+                result = import_transactions(
+                    project, iter_rows(stream, fmt), chunk_size=max(1, chunk_size),
+                    on_error=report,
+                )
+        except ImportFormatError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.imported} transactions into "{project.name}", '
+            f'skipped {result.failed}.'
+        ))
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from transactions.rollups import rebuild_project_rollups, verify_project_rollups
+
+from ._common import resolve_project_ids
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild or verify the daily transaction rollups, in parallel across '
+        'projects.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int,
+                            help='Projects to process (default: all).')
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report drift, do not rewrite rollups.')
+        parser.add_argument(
+            '--workers', type=int,
+            help='Number of projects processed at once (default: 4; rebuilds on '
+                 'SQLite run one at a time, as it allows a single writer).',
+        )
+
+    def handle(self, *args, project_ids, verify, workers, **options):
+        ids = resolve_project_ids(project_ids)
+
+        if workers is None:
+            workers = 1 if connection.vendor == 'sqlite' and not verify else 4
+        task = verify_project_rollups if verify else rebuild_project_rollups
+        if workers > 1 and len(ids) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(lambda pid: self._run(task, pid), ids))
+        else:
+            results = [task(pid) for pid in ids]
+
+        drifted = 0
+        for project_id, result in zip(ids, results):
+            if verify:
+                if result:
+                    drifted += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'Project {project_id}: {len(result)} drifted rollups, '
+                        f'e.g. {result[:3]}'
+                    ))
+            else:
+                self.stdout.write(f'Project {project_id}: {result} rollups rebuilt')
+
+        if verify and drifted:
+            raise CommandError(
+                f'{drifted} project(s) have drifted rollups; rerun without --verify.'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(ids)} project(s).'))
+
+    @staticmethod
+    def _run(task, project_id):
+        # Each worker thread opens its own connection; release it when done.
+        try:
+            return task(project_id)
+        finally:
+            connection.close()
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions import search
+
+
+class Command(BaseCommand):
+    help = ('Re-index every transaction for full-text search and re-create the '
+            'index triggers.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default',
+                            help='Database alias to rebuild.')
+
+    def handle(self, *args, database, **options):
+        if not search.enabled(database):
+            raise CommandError(
+                'Full-text search needs SQLite; other databases use plain filters.'
+            )
+        started = time.perf_counter()
+        indexed = search.rebuild_index(database)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed:,} transactions in {time.perf_counter() - started:.1f}s.'
+        ))
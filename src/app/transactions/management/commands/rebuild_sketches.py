@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from transactions.sketches import rebuild_project_sketches
+
+from ._common import resolve_project_ids
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the daily item and customer sketches of projects from their '
+        'transactions. '
+        'Only needed for data written before sketches existed or outside the app.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int,
+                            help='Projects to rebuild (default: all).')
+
+    def handle(self, *args, project_ids, **options):
+        ids = resolve_project_ids(project_ids)
+
+        days = 0
+        for project_id in ids:
+            days += rebuild_project_sketches(project_id)
+            message = f'Project {project_id}: rebuilt, {days:,} day sketches so far'
+            self.stdout.write(message)
+        message = f'Rebuilt {days:,} day sketches across {len(ids)} project(s).'
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,108 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from transactions.emissions import (
+    DEFAULT_BATCH_SIZE,
+    factor_snapshot,
+    plan_recompute,
+    recompute_unit,
+)
+
+from ._common import init_worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Reprice transactions whose emission factor version is out of date, '
+        'in parallel.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int,
+                            help='Projects to process (default: all).')
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows per bulk_update.')
+        parser.add_argument(
+            '--checkpoint',
+            default=str(settings.BASE_DIR / 'recompute_emissions.checkpoint.json'),
+            help='File recording finished units so an interrupted run can resume.',
+        )
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore an existing checkpoint.')
+
+    def handle(self, *args, project_ids, workers, batch_size, checkpoint, restart,
+               **options):
+        versions = factor_snapshot().versions
+        state = None if restart else self._load(checkpoint)
+        if (state and state['versions'] == versions
+                and state['project_ids'] == sorted(project_ids)):
+            self.stdout.write(
+                f'Resuming: {len(state["done"])} of {len(state["units"])} '
+                f'units already done.'
+            )
+        else:
+            state = {
+                'versions': versions,
+                'project_ids': sorted(project_ids),
+                'units': [list(unit) for unit in plan_recompute(versions, project_ids)],
+                'done': [],
+            }
+            self._save(checkpoint, state)
+
+        done = {tuple(unit) for unit in state['done']}
+        pending = [tuple(unit) for unit in state['units'] if tuple(unit) not in done]
+        changed = 0
+        if workers > 1 and len(pending) > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=init_worker
+            ) as pool:
+                futures = {
+                    pool.submit(recompute_unit, unit, batch_size): unit
+                    for unit in pending
+                }
+                for future in as_completed(futures):
+                    changed += future.result()
+                    self._finish(checkpoint, state, futures[future])
+        else:
+            for unit in pending:
+                changed += recompute_unit(unit, batch_size)
+                self._finish(checkpoint, state, unit)
+
+        self._clear(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'Repriced {changed} transactions across {len(pending)} '
+            f'project-month unit(s).'
+        ))
+
+    def _finish(self, path, state, unit):
+        state['done'].append(list(unit))
+        self._save(path, state)
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _save(path, state):
+        # Write then rename, so an interrupted run never leaves half a file.
+        with open(f'{path}.tmp', 'w') as handle:
+            json.dump(state, handle)
+        os.replace(f'{path}.tmp', path)
+
+    @staticmethod
+    def _clear(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
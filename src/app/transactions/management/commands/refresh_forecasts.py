@@ -0,0 +1,44 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from transactions.forecasts import refresh_forecast
+
+from ._common import init_worker, resolve_project_ids
+
+
+class Command(BaseCommand):
+    help = ('Train or incrementally update the daily forecast of every project, '
+            'in parallel.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int,
+                            help='Projects to refresh (default: all).')
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes.')
+
+    def handle(self, *args, project_ids, workers, **options):
+        ids = resolve_project_ids(project_ids)
+
+        outcomes = Counter()
+        if workers > 1 and len(ids) > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=init_worker
+            ) as pool:
+                futures = [
+                    pool.submit(refresh_forecast, project_id) for project_id in ids
+                ]
+                for future in as_completed(futures):
+                    outcomes[future.result()] += 1
+        else:
+            for project_id in ids:
+                outcomes[refresh_forecast(project_id)] += 1
+
+        summary = ', '.join(
+            f'{count} {outcome}' for outcome, count in sorted(outcomes.items())
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed {len(ids)} project forecast(s): {summary or "none"}.'
+        ))
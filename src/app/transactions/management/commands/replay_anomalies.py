@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from transactions.anomalies import replay_project
+
+from ._common import resolve_project_ids
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the anomaly detector state of projects from their history, '
+        'without raising alerts. Only needed for data written before detection '
+        'existed or outside the app.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int,
+                            help='Projects to replay (default: all).')
+
+    def handle(self, *args, project_ids, **options):
+        ids = resolve_project_ids(project_ids)
+
+        total = 0
+        for project_id in ids:
+            total += replay_project(project_id)
+            self.stdout.write(
+                f'Project {project_id}: replayed, {total:,} transactions so far'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed {total:,} transactions across {len(ids)} project(s).'
+        ))
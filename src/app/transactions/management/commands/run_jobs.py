@@ -0,0 +1,76 @@
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from transactions import jobs
+
+from ._common import init_worker
+
+PURGE_INTERVAL = 60 * 60
+
+
+def _run(job_id, worker):
+    # Pool threads open their own connection; release it after each job.
+    try:
+        return jobs.run_job(job_id, worker)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs on a pool of threads or processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Jobs run at once.')
+        parser.add_argument('--processes', action='store_true',
+                            help='Use worker processes instead of threads.')
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='Seconds between queue checks when idle.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no due jobs are left.')
+
+    def handle(self, *args, workers, processes, poll, once, **options):
+        worker = jobs.worker_name()
+        if processes:
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers)
+        self.stdout.write(f'Worker {worker} running up to {workers} job(s) at once.')
+
+        running = {}
+        purged_at = 0.0
+        try:
+            while True:
+                if time.monotonic() - purged_at >= PURGE_INTERVAL:
+                    purged_at = time.monotonic()
+                    jobs.purge_finished()
+                jobs.requeue_stale()
+                free = workers - len(running)
+                if free:
+                    for job_id in jobs.claim(worker, free):
+                        running[pool.submit(_run, job_id, worker)] = job_id
+                if not running:
+                    if once:
+                        break
+                    time.sleep(poll)
+                    continue
+                done, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        self.stdout.write(f'Job {job_id}: {future.result()}')
+                    except Exception as e:
+                        self.stderr.write(f'Job {job_id}: worker error: {e}')
+        except KeyboardInterrupt:
+            self.stdout.write(f'Stopping; waiting for {len(running)} running job(s).')
+        finally:
+            pool.shutdown(wait=True)
+            connection.close()
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.replicas import REPLICA_ALIAS, ReplicaError, sync_replica
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database into the replica file, '
+        'for local read-replica testing.'
+    )
+
+    def handle(self, *args, **options):
+        try:
+            sync_replica()
+        except ReplicaError as e:
+            raise CommandError(str(e))
+        message = f'Synced the "{REPLICA_ALIAS}" database from the primary.'
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    # Later writes keep the rollups current; seed them from the existing ledger,
+    # cutting days in the default timezone like transactions.rollups does.
+    Transaction = apps.get_model('transactions', 'Transaction')
+    ProjectDailyRollup = apps.get_model('transactions', 'ProjectDailyRollup')
+    days = (
+        Transaction.objects
+        .annotate(day=TruncDate('date', tzinfo=timezone.get_default_timezone()))
+        .values_list('project_id', 'day', 'category')
+        .annotate(Count('id'), Sum('amount'), Min('amount'), Max('amount'))
+        .order_by()
+    )
+    ProjectDailyRollup.objects.bulk_create(
+        (
+            ProjectDailyRollup(
+                project_id=project_id, day=day, category=category, count=count,
+                total=total, min_amount=smallest, max_amount=largest,
+            )
+            for project_id, day, category, count, total, smallest, largest
+            in days.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_alter_transaction_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectDailyRollup',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('day', models.DateField()),
+                (
+                    'category',
+                    models.CharField(
+                        choices=[
+                            ('beverage', 'Beverage'),
+                            ('food', 'Food'),
+                            ('merchandise', 'Merchandise'),
+                            ('other', 'Other'),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ('count', models.PositiveIntegerField(default=0)),
+                (
+                    'total',
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ('min_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('max_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                (
+                    'project',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='daily_rollups',
+                        to='transactions.project',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['day', 'category'],
+                'unique_together': {('project', 'day', 'category')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
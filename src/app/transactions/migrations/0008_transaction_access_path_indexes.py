@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_projectdailyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='project',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='transactions',
+                to='transactions.project',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(
+                fields=['owner', 'created_at'], name='project_owner_created_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['project', 'date'], name='txn_project_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(
+                fields=['project', 'category', 'date'], name='txn_project_cat_date_idx'
+            ),
+        ),
+    ]
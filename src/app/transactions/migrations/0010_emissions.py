@@ -0,0 +1,125 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:52
+
+import datetime
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Mirrors the category rows of src/engine/data/emission_factors.csv.
+DEFAULT_FACTORS = [
+    ('beverage', datetime.date(2000, 1, 1), datetime.date(2025, 1, 1), Decimal('0.42')),
+    ('beverage', datetime.date(2025, 1, 1), None, Decimal('0.38')),
+    ('food', datetime.date(2000, 1, 1), datetime.date(2025, 1, 1), Decimal('0.61')),
+    ('food', datetime.date(2025, 1, 1), None, Decimal('0.55')),
+    ('merchandise', datetime.date(2000, 1, 1), None, Decimal('0.73')),
+    ('other', datetime.date(2000, 1, 1), None, Decimal('0.45')),
+]
+
+
+def seed_factors(apps, schema_editor):
+    EmissionFactor = apps.get_model('transactions', 'EmissionFactor')
+    EmissionFactorVersion = apps.get_model('transactions', 'EmissionFactorVersion')
+    EmissionFactor.objects.bulk_create(
+        EmissionFactor(
+            category=category, valid_from=start, valid_to=end, kg_co2e_per_unit=factor
+        )
+        for category, start, end, factor in DEFAULT_FACTORS
+    )
+    EmissionFactorVersion.objects.bulk_create(
+        EmissionFactorVersion(category=category)
+        for category in sorted({row[0] for row in DEFAULT_FACTORS})
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0009_project_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmissionFactorVersion',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'category',
+                    models.CharField(
+                        choices=[
+                            ('beverage', 'Beverage'),
+                            ('food', 'Food'),
+                            ('merchandise', 'Merchandise'),
+                            ('other', 'Other'),
+                        ],
+                        max_length=20,
+                        unique=True,
+                    ),
+                ),
+                ('version', models.PositiveIntegerField(default=1)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='emissions',
+            field=models.DecimalField(
+                blank=True, decimal_places=3, max_digits=14, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='factor_version',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='EmissionFactor',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'category',
+                    models.CharField(
+                        choices=[
+                            ('beverage', 'Beverage'),
+                            ('food', 'Food'),
+                            ('merchandise', 'Merchandise'),
+                            ('other', 'Other'),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ('valid_from', models.DateField()),
+                (
+                    'valid_to',
+                    models.DateField(
+                        blank=True,
+                        help_text='Exclusive; empty means open-ended.',
+                        null=True,
+                    ),
+                ),
+                (
+                    'kg_co2e_per_unit',
+                    models.DecimalField(decimal_places=4, max_digits=10),
+                ),
+            ],
+            options={
+                'ordering': ['category', 'valid_from'],
+                'unique_together': {('category', 'valid_from')},
+            },
+        ),
+        migrations.RunPython(seed_factors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0010_emissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectForecast',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('data_version', models.PositiveBigIntegerField()),
+                ('trained_through', models.DateField()),
+                ('history_count', models.PositiveIntegerField(default=0)),
+                (
+                    'history_total',
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ('factor_versions', models.JSONField(default=dict)),
+                ('state', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                (
+                    'project',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='forecast',
+                        to='transactions.project',
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0011_project_forecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnomalyState',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'category',
+                    models.CharField(
+                        choices=[
+                            ('beverage', 'Beverage'),
+                            ('food', 'Food'),
+                            ('merchandise', 'Merchandise'),
+                            ('other', 'Other'),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ('state', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                (
+                    'project',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='anomaly_states',
+                        to='transactions.project',
+                    ),
+                ),
+            ],
+            options={
+                'unique_together': {('project', 'category')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TransactionAnomaly',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'kind',
+                    models.CharField(
+                        choices=[
+                            ('amount', 'Unusual amount'),
+                            ('spike', 'Category spike'),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    'score',
+                    models.FloatField(
+                        help_text='Standard deviations away from the running mean.'
+                    ),
+                ),
+                ('expected', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dismissed', models.BooleanField(default=False)),
+                (
+                    'project',
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='anomalies',
+                        to='transactions.project',
+                    ),
+                ),
+                (
+                    'transaction',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='anomalies',
+                        to='transactions.transaction',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [
+                    models.Index(
+                        condition=models.Q(('dismissed', False)),
+                        fields=['project', 'created_at'],
+                        name='anomaly_project_open_idx',
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+from django.db import migrations
+
+# External content FTS5 index over Transaction; rowid is the transaction id.
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE transactions_transaction_fts USING fts5(
+    item_name, customer_name, project_id,
+    content='transactions_transaction', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+)
+"""
+
+TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS transactions_transaction_fts_insert
+    AFTER INSERT ON transactions_transaction BEGIN
+        INSERT INTO transactions_transaction_fts(
+            rowid, item_name, customer_name, project_id
+        ) VALUES (new.id, new.item_name, new.customer_name, new.project_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transactions_transaction_fts_delete
+    AFTER DELETE ON transactions_transaction BEGIN
+        INSERT INTO transactions_transaction_fts(
+            transactions_transaction_fts, rowid, item_name, customer_name, project_id
+        ) VALUES ('delete', old.id, old.item_name, old.customer_name, old.project_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transactions_transaction_fts_update
+    AFTER UPDATE OF item_name, customer_name, project_id
+    ON transactions_transaction BEGIN
+        INSERT INTO transactions_transaction_fts(
+            transactions_transaction_fts, rowid, item_name, customer_name, project_id
+        ) VALUES ('delete', old.id, old.item_name, old.customer_name, old.project_id);
+        INSERT INTO transactions_transaction_fts(
+            rowid, item_name, customer_name, project_id
+        ) VALUES (new.id, new.item_name, new.customer_name, new.project_id);
+    END
+    """,
+]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in [CREATE_INDEX, *TRIGGERS]:
+        schema_editor.execute(statement)
+    schema_editor.execute(
+        'INSERT INTO transactions_transaction_fts(transactions_transaction_fts) '
+        "VALUES ('rebuild')"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for action in ('insert', 'delete', 'update'):
+        schema_editor.execute(
+            f'DROP TRIGGER IF EXISTS transactions_transaction_fts_{action}'
+        )
+    schema_editor.execute('DROP TABLE IF EXISTS transactions_transaction_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0013_background_jobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,191 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_totals(apps, schema_editor):
+    # Later writes keep these tables current; seed them from the existing ledger.
+    Transaction = apps.get_model('transactions', 'Transaction')
+    ProjectNameTotal = apps.get_model('transactions', 'ProjectNameTotal')
+    ProjectAmountCount = apps.get_model('transactions', 'ProjectAmountCount')
+    rows = Transaction.objects.order_by()
+    names = [
+        ('item', 'item_name', rows),
+        ('customer', 'customer_name', rows.exclude(customer_name='')),
+    ]
+    for kind, field, matching in names:
+        totals = matching.values_list('project_id', field).annotate(
+            Count('id'), Sum('amount')
+        )
+        ProjectNameTotal.objects.bulk_create(
+            (
+                ProjectNameTotal(
+                    project_id=project_id, kind=kind, name=name, count=count,
+                    total=total,
+                )
+                for project_id, name, count, total in totals.iterator()
+            ),
+            batch_size=1000,
+        )
+    counts = rows.values_list('project_id', 'amount').annotate(Count('id'))
+    ProjectAmountCount.objects.bulk_create(
+        (
+            ProjectAmountCount(project_id=project_id, amount=amount, count=count)
+            for project_id, amount, count in counts.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0015_ingest_api'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSummary',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('data_version', models.PositiveBigIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                (
+                    'total',
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    'smallest',
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    'largest',
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    'median',
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                ('first_day', models.DateField(blank=True, null=True)),
+                ('last_day', models.DateField(blank=True, null=True)),
+                ('best_day', models.DateField(blank=True, null=True)),
+                (
+                    'best_day_total',
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=14, null=True
+                    ),
+                ),
+                ('category_mix', models.JSONField(default=list)),
+                ('top_items', models.JSONField(default=list)),
+                ('top_customers', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                (
+                    'project',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='summary',
+                        to='transactions.project',
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProjectAmountCount',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                (
+                    'project',
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='+',
+                        to='transactions.project',
+                    ),
+                ),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('project', 'amount'),
+                        name='amount_count_project_amount_uniq',
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectNameTotal',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'kind',
+                    models.CharField(
+                        choices=[('item', 'Item'), ('customer', 'Customer')],
+                        max_length=10,
+                    ),
+                ),
+                ('name', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                (
+                    'total',
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    'project',
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='+',
+                        to='transactions.project',
+                    ),
+                ),
+            ],
+            options={
+                'indexes': [
+                    models.Index(
+                        fields=['project', 'kind', 'total'], name='name_total_top_idx'
+                    )
+                ],
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('project', 'kind', 'name'),
+                        name='name_total_project_kind_name_uniq',
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0016_project_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectDailySketch',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('items', models.JSONField(default=dict)),
+                ('customers', models.JSONField(default=dict)),
+                ('customer_registers', models.BinaryField(default=bytes)),
+                (
+                    'project',
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='+',
+                        to='transactions.project',
+                    ),
+                ),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('project', 'day'), name='sketch_project_day_uniq'
+                    )
+                ],
+            },
+        ),
+    ]
@@ -21,14 +21,30 @@ class Project(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='projects')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped on every transaction write; keys caches of derived data.
+    data_version = models.PositiveBigIntegerField(default=0)
+    data_updated_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
         unique_together = ['owner', 'name']
+        indexes = [
+            models.Index(
+                fields=['owner', 'created_at'], name='project_owner_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.owner.username})"
 
+    @classmethod
+    def bump_data_version(cls, project_ids):
+        """Mark the transaction data of the given projects as changed."""
+        cls.objects.filter(pk__in=set(project_ids)).update(
+            data_version=models.F('data_version') + 1,
+            data_updated_at=timezone.now(),
+        )
+
 
 class Transaction(models.Model):
     """Model representing a coffee shop transaction."""
@@ -40,15 +56,29 @@ class Transaction(models.Model):
         ('other', 'Other'),
     ]
     
-    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='transactions')
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name='transactions', db_index=False
+    )
     date = models.DateTimeField(default=timezone.now)
     item_name = models.CharField(max_length=100)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     customer_name = models.CharField(max_length=100, blank=True)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='beverage')
+    # kg CO2e from the category's emission factors; see ``transactions.emissions``.
+    emissions = models.DecimalField(
+        max_digits=14, decimal_places=3, null=True, blank=True
+    )
+    factor_version = models.PositiveIntegerField(null=True, blank=True)
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            # Leading ``project`` columns replace the plain FK index.
+            models.Index(fields=['project', 'date'], name='txn_project_date_idx'),
+            models.Index(
+                fields=['project', 'category', 'date'], name='txn_project_cat_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.item_name} - ${self.amount} ({self.date.strftime('%Y-%m-%d %H:%M')})"
@@ -73,3 +103,364 @@ class ProjectMember(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.project.name} ({self.role})"
+
+
+class ProjectDailyRollup(models.Model):
+    """Pre-aggregated transaction totals per project, day and category."""
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name='daily_rollups'
+    )
+    day = models.DateField()
+    category = models.CharField(max_length=20, choices=Transaction.CATEGORY_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    min_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    max_amount = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        ordering = ['day', 'category']
+        unique_together = ['project', 'day', 'category']
+
+    def __str__(self):
+        return (
+            f"{self.project.name} {self.day} {self.category}: "
+            f"{self.count} (${self.total})"
+        )
+
+
+class ProjectDailySketch(models.Model):
+    """Mergeable item and customer sketches of one project day.
+
+    See ``transactions.sketches``.
+    """
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name='+', db_index=False
+    )
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    # Space-Saving counters: {name: [count, max overestimate]}.
+    items = models.JSONField(default=dict)
+    customers = models.JSONField(default=dict)
+    # zlib-compressed HyperLogLog registers of the named customers.
+    customer_registers = models.BinaryField(default=bytes)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['project', 'day'], name='sketch_project_day_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.project.name} {self.day} sketch ({self.count} transactions)"
+
+
+class ProjectNameTotal(models.Model):
+    """Running count and total of a project's sales per item or customer name."""
+
+    KIND_CHOICES = [
+        ('item', 'Item'),
+        ('customer', 'Customer'),
+    ]
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+',
+                                db_index=False)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    name = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'kind', 'name'],
+                                    name='name_total_project_kind_name_uniq'),
+        ]
+        indexes = [
+            # Top-N lists walk this index instead of sorting every name.
+            models.Index(fields=['project', 'kind', 'total'],
+                         name='name_total_top_idx'),
+        ]
+
+    def __str__(self):
+        return (f"{self.project.name} {self.kind} {self.name}: "
+                f"{self.count} (${self.total})")
+
+
+class ProjectAmountCount(models.Model):
+    """How many of a project's transactions have each amount, for exact medians."""
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+',
+                                db_index=False)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'amount'],
+                                    name='amount_count_project_amount_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.project.name} ${self.amount}: {self.count}"
+
+
+class ProjectSummary(models.Model):
+    """Summary figures of a project, recomputed when its ``data_version`` moves."""
+
+    project = models.OneToOneField(Project, on_delete=models.CASCADE,
+                                   related_name='summary')
+    # Project.data_version the figures were computed at.
+    data_version = models.PositiveBigIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    smallest = models.DecimalField(max_digits=10, decimal_places=2, null=True,
+                                   blank=True)
+    largest = models.DecimalField(max_digits=10, decimal_places=2, null=True,
+                                  blank=True)
+    median = models.DecimalField(max_digits=10, decimal_places=2, null=True,
+                                 blank=True)
+    first_day = models.DateField(null=True, blank=True)
+    last_day = models.DateField(null=True, blank=True)
+    best_day = models.DateField(null=True, blank=True)
+    best_day_total = models.DecimalField(max_digits=14, decimal_places=2, null=True,
+                                         blank=True)
+    category_mix = models.JSONField(default=list)
+    top_items = models.JSONField(default=list)
+    top_customers = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary of {self.project.name} at version {self.data_version}"
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+
+class EmissionFactor(models.Model):
+    """Spend-based emission factor of a category over a date range."""
+
+    category = models.CharField(max_length=20, choices=Transaction.CATEGORY_CHOICES)
+    valid_from = models.DateField()
+    valid_to = models.DateField(
+        null=True, blank=True, help_text='Exclusive; empty means open-ended.'
+    )
+    kg_co2e_per_unit = models.DecimalField(max_digits=10, decimal_places=4)
+
+    class Meta:
+        ordering = ['category', 'valid_from']
+        unique_together = ['category', 'valid_from']
+
+    def __str__(self):
+        return (
+            f"{self.category} from {self.valid_from}: {self.kg_co2e_per_unit} kg/unit"
+        )
+
+
+class EmissionFactorVersion(models.Model):
+    """Current version of a category's emission factors, bumped on every change."""
+
+    category = models.CharField(
+        max_length=20, choices=Transaction.CATEGORY_CHOICES, unique=True
+    )
+    version = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.category} v{self.version}"
+
+
+class ProjectForecast(models.Model):
+    """Trained daily forecast model of a project, kept by ``refresh_forecasts``."""
+
+    project = models.OneToOneField(Project, on_delete=models.CASCADE,
+                                   related_name='forecast')
+    # Project.data_version the model was last checked against.
+    data_version = models.PositiveBigIntegerField()
+    trained_through = models.DateField()
+    # Rollup totals up to trained_through, to tell appended days from edited history.
+    history_count = models.PositiveIntegerField(default=0)
+    history_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    factor_versions = models.JSONField(default=dict)
+    state = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Forecast for {self.project.name} through {self.trained_through}"
+
+
+class AnomalyState(models.Model):
+    """Running anomaly detector statistics of one project and category."""
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE,
+                                related_name='anomaly_states')
+    category = models.CharField(max_length=20, choices=Transaction.CATEGORY_CHOICES)
+    state = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['project', 'category']
+
+    def __str__(self):
+        return f"{self.project.name} {self.category} detector"
+
+
+class TransactionAnomaly(models.Model):
+    """A transaction the streaming detector flagged as unusual."""
+
+    KIND_CHOICES = [
+        ('amount', 'Unusual amount'),
+        ('spike', 'Category spike'),
+    ]
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE,
+                                related_name='anomalies', db_index=False)
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE,
+                                    related_name='anomalies')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    score = models.FloatField(
+        help_text='Standard deviations away from the running mean.'
+    )
+    expected = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    dismissed = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Only open alerts are listed, so only they are indexed.
+            models.Index(
+                fields=['project', 'created_at'], name='anomaly_project_open_idx',
+                condition=models.Q(dismissed=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} on transaction {self.transaction_id}"
+
+    @property
+    def description(self):
+        row = self.transaction
+        category = row.get_category_display().lower()
+        if self.kind == 'amount':
+            return (f"{row.item_name} for ${row.amount} is unusual for {category}; "
+                    f"typical is about ${self.expected}.")
+        return (f"Unusually many {category} sales on {row.date:%b %d}; "
+                f"about {self.expected:.0f} a day is typical.")
+
+
+class Job(models.Model):
+    """A unit of background work, claimed and run by the ``run_jobs`` worker."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    KIND_CHOICES = [
+        ('import', 'Import transactions'),
+        ('export', 'Export transactions'),
+        ('recompute_emissions', 'Recompute emissions'),
+        ('rebuild_rollups', 'Rebuild rollups'),
+    ]
+
+    kind = models.CharField(max_length=40, choices=KIND_CHOICES)
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True,
+        db_index=False,
+    )
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Not claimed before this time; pushed back after a failed attempt.
+    run_after = models.DateTimeField(default=timezone.now)
+    progress_done = models.PositiveBigIntegerField(default=0)
+    progress_total = models.PositiveBigIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'], name='job_status_run_after_idx'
+            ),
+            models.Index(
+                fields=['project', 'created_at'], name='job_project_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+    @property
+    def finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    @property
+    def percent(self):
+        if self.status == self.SUCCEEDED:
+            return 100
+        if not self.progress_total:
+            return None
+        return min(100, int(100 * self.progress_done / self.progress_total))
+
+
+class IngestToken(models.Model):
+    """Bearer token a POS terminal uses to post transactions to one project."""
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE,
+                                related_name='ingest_tokens')
+    name = models.CharField(max_length=100)
+    # SHA-256 of the token; the token itself is only shown once, when created.
+    token_hash = models.CharField(max_length=64, unique=True)
+    prefix = models.CharField(
+        max_length=8, help_text='First characters of the token, to tell tokens apart.'
+    )
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
+                                   blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    revoked = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.prefix}…) for {self.project.name}"
+
+
+class IdempotencyKey(models.Model):
+    """Client key of an ingested transaction, so retried posts are not stored twice."""
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+',
+                                db_index=False)
+    key = models.CharField(max_length=100)
+    transaction = models.OneToOneField(Transaction, on_delete=models.CASCADE,
+                                       related_name='idempotency_key')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'key'],
+                                    name='idempotency_project_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} -> transaction {self.transaction_id}"
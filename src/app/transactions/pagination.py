@@ -0,0 +1,60 @@
+"""Keyset (cursor) pagination over a project's transactions.
+
+Pages are ordered newest first on ``(date, id)``, which the
+``(project, date)`` index serves directly, so fetching any page costs the
+same no matter how deep into the history it is.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(row):
+    """Return an opaque cursor pointing just after ``row``."""
+    raw = f'{row.date.isoformat()}|{row.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the ``(date, id)`` position encoded in ``cursor``."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(date), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor('Invalid cursor.')
+
+
+def page_size(value):
+    """Parse a requested page size, clamped to ``MAX_PAGE_SIZE``."""
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(value), MAX_PAGE_SIZE))
+
+
+def transaction_page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return ``(rows, next_cursor)`` for the page after ``cursor``.
+
+    ``next_cursor`` is ``None`` on the last page.
+    """
+    queryset = queryset.order_by('-date', '-id')
+    if cursor:
+        date, pk = decode_cursor(cursor)
+        # The ``date__lte`` bound keeps the index range seek; the OR only
+        # breaks ties between rows sharing the cursor's timestamp.
+        queryset = queryset.filter(
+            Q(date__lte=date) & (Q(date__lt=date) | Q(id__lt=pk))
+        )
+    rows = list(queryset[:limit + 1])
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
@@ -0,0 +1,168 @@
+"""Optional read replica for reporting, export and summary traffic.
+
+``ReplicaRouter`` sends reads to the ``replica`` alias only inside views
+wrapped in :func:`replica_reads`; everything else, and every write, uses
+``default``. After a request writes, ``PrimaryPinningMiddleware`` sets a
+short-lived cookie so that the same browser keeps reading from the primary
+until the replica has had time to catch up ("read your own writes").
+Without a ``replica`` entry in ``DATABASES`` all of this is a no-op.
+"""
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'primary_pin'
+
+_use_replica = ContextVar('use_replica', default=False)
+_request = ContextVar('replica_request', default=None)
+
+
+class ReplicaError(Exception):
+    """Raised when the replica cannot be synced from the primary."""
+
+
+class _RequestState:
+    """Whether the current request must read from, or has written to, the primary."""
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replica_configured():
+    return REPLICA_ALIAS in connections.databases
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 15)
+
+
+def read_alias():
+    """The alias a read issued right now should go to."""
+    if not _use_replica.get() or not replica_configured():
+        return DEFAULT_DB_ALIAS
+    state = _request.get()
+    if state is not None and (state.pinned or state.wrote):
+        return DEFAULT_DB_ALIAS
+    # Inside a primary transaction the replica cannot see its uncommitted rows.
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return REPLICA_ALIAS
+
+
+def replica_reads(view):
+    """Let the ORM reads of ``view`` go to the replica."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            token = _use_replica.set(True)
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _use_replica.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Route opted-in reads to the replica and all writes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _request.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary and gets its schema from it.
+        return db != REPLICA_ALIAS
+
+
+class PrimaryPinningMiddleware:
+    """Keep a browser on the primary for ``REPLICA_PIN_SECONDS`` after it writes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_configured():
+            return self.get_response(request)
+        state, token = self._begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        if not replica_configured():
+            return await self.get_response(request)
+        state, token = self._begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self._finish(state, response)
+
+    @staticmethod
+    def _begin(request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        state = _RequestState(pinned=pinned_until > time.time())
+        return state, _request.set(state)
+
+    @staticmethod
+    def _finish(state, response):
+        if state.wrote:
+            seconds = pin_seconds()
+            response.set_cookie(
+                PIN_COOKIE, f'{time.time() + seconds:.0f}',
+                max_age=seconds, httponly=True, samesite='Lax',
+            )
+        return response
+
+
+def sync_replica(source=DEFAULT_DB_ALIAS, target=REPLICA_ALIAS):
+    """Copy the primary into a SQLite replica with the online backup API.
+
+    Stands in for real replication when developing against two SQLite files.
+    """
+    if target not in connections.databases:
+        raise ReplicaError(f'No "{target}" database is configured.')
+    for alias in (source, target):
+        if connections[alias].vendor != 'sqlite':
+            raise ReplicaError(
+                f'"{alias}" is not SQLite; use the database\'s own replication.'
+            )
+    primary, replica = connections[source], connections[target]
+    primary.ensure_connection()
+    replica.ensure_connection()
+    primary.connection.backup(replica.connection)
@@ -0,0 +1,367 @@
+"""Database-side aggregation helpers for project reporting."""
+import asyncio
+import hashlib
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.core.cache import caches
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import ProjectDailyRollup, Transaction
+from .rollups import covers_timezone
+
+GRANULARITIES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+GROUP_BY = ('category', 'item_name', 'customer_name')
+DEFAULT_TOP = 5
+MAX_TOP = 20
+# Longest ``days`` window, about ten years of daily buckets.
+MAX_REPORT_DAYS = 3660
+OTHER_KEY = '__other__'
+CACHE_ALIAS = 'reporting'
+
+
+class ReportingError(ValueError):
+    """Raised when reporting parameters cannot be understood."""
+
+
+def resolve_granularity(value):
+    """Validate a ``granularity`` query parameter, defaulting to ``day``."""
+    granularity = value or 'day'
+    if granularity not in GRANULARITIES:
+        raise ReportingError(f'Unsupported granularity "{granularity}".')
+    return granularity
+
+
+def resolve_timezone(name):
+    """Return the tzinfo for an IANA zone name, or the active timezone."""
+    if not name:
+        return timezone.get_current_timezone()
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ReportingError(f'Unknown timezone "{name}".')
+
+
+def reporting_params(query):
+    """Validate a reporting query string into normalised filters."""
+    try:
+        days = int(query.get('days', 30))
+    except ValueError:
+        raise ReportingError('"days" must be a whole number.')
+    if not 0 <= days <= MAX_REPORT_DAYS:
+        raise ReportingError(f'"days" must be between 0 and {MAX_REPORT_DAYS}.')
+    group_by = query.get('group_by') or None
+    if group_by is not None and group_by not in GROUP_BY:
+        raise ReportingError(f'Unsupported group_by "{group_by}".')
+    try:
+        top = int(query.get('top', DEFAULT_TOP))
+    except ValueError:
+        raise ReportingError('"top" must be a whole number.')
+    if not 1 <= top <= MAX_TOP:
+        raise ReportingError(f'"top" must be between 1 and {MAX_TOP}.')
+    return {
+        'days': days,
+        'category': query.get('category') or 'all',
+        'granularity': resolve_granularity(query.get('granularity')),
+        'tzinfo': resolve_timezone(query.get('tz')),
+        'group_by': group_by,
+        'top': top,
+    }
+
+
+def reporting_window(days, tzinfo, now=None):
+    """Return the first and last local day covered by a ``days`` window.
+
+    Windows are aligned to whole days so that rollups and transaction scans
+    agree, and a report only changes when the data or the date changes.
+    """
+    today = timezone.localtime(now or timezone.now(), tzinfo).date()
+    return today - timedelta(days=days), today
+
+
+def day_start(day, tzinfo):
+    """Return the aware datetime at which a local day starts."""
+    return datetime.combine(day, time.min, tzinfo=tzinfo)
+
+
+def truncate_date(day, granularity):
+    """Return the first local date of the bucket containing ``day``."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    """Return the first local date of the bucket after the one starting at ``day``."""
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def bucket_starts(first_day, last_day, granularity):
+    """List the start date of every bucket touching ``[first_day, last_day]``."""
+    current = truncate_date(first_day, granularity)
+    last = truncate_date(last_day, granularity)
+    buckets = []
+    while current <= last:
+        buckets.append(current)
+        current = next_bucket(current, granularity)
+    return buckets
+
+
+def _window_rows(project_id, params, first_day, last_day):
+    """Return the rows covering ``[first_day, last_day]`` and how to total them.
+
+    Whole days in the rollup timezone are answered from the daily rollups;
+    any other timezone, or a breakdown by item or customer, falls back to a
+    transaction scan.
+    """
+    tzinfo = params['tzinfo']
+    if covers_timezone(tzinfo) and params['group_by'] in (None, 'category'):
+        rows = ProjectDailyRollup.objects.filter(
+            project_id=project_id, day__gte=first_day, day__lte=last_day
+        )
+        totals = {'bucket_total': Sum('total'), 'bucket_count': Sum('count')}
+        bucket = GRANULARITIES[params['granularity']]('day')
+    else:
+        rows = Transaction.objects.filter(
+            project_id=project_id,
+            date__gte=day_start(first_day, tzinfo),
+            date__lt=day_start(last_day + timedelta(days=1), tzinfo),
+        )
+        totals = {'bucket_total': Sum('amount'), 'bucket_count': Count('id')}
+        bucket = GRANULARITIES[params['granularity']]('date', tzinfo=tzinfo)
+    if params['category'] != 'all':
+        rows = rows.filter(category=params['category'])
+    return rows, totals, bucket
+
+
+def report_queries(project_id, params, first_day, last_day):
+    """Build the independent, still unevaluated querysets behind a report.
+
+    ``series`` groups the window into time buckets (and the ``group_by``
+    dimension, when given), ``categories`` totals it per category and
+    ``previous`` totals the window of equal length before it. Each returns
+    only grouped rows.
+    """
+    rows, totals, bucket = _window_rows(project_id, params, first_day, last_day)
+    span = last_day - first_day + timedelta(days=1)
+    previous, _, _ = _window_rows(
+        project_id, params, first_day - span, first_day - timedelta(days=1)
+    )
+    dimensions = ['bucket'] + ([params['group_by']] if params['group_by'] else [])
+    return {
+        'series': (
+            rows.annotate(bucket=bucket).values(*dimensions).annotate(**totals)
+            .order_by()
+        ),
+        'categories': rows.values('category').annotate(**totals).order_by('category'),
+        'previous': previous.values('project_id').annotate(**totals).order_by(),
+    }
+
+
+def run_queries(queries):
+    """Evaluate a dict of querysets one after the other."""
+    return {name: list(queryset) for name, queryset in queries.items()}
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+
+async def arun_queries(queries):
+    """Evaluate a dict of querysets concurrently with the async ORM."""
+    results = await asyncio.gather(*(_alist(queryset) for queryset in queries.values()))
+    return dict(zip(queries, results))
+
+
+def _local_day(value, tzinfo):
+    if isinstance(value, datetime):
+        return timezone.localtime(value, tzinfo).date()
+    return value
+
+
+def _group_label(group_by, key):
+    if key == OTHER_KEY:
+        return 'Other'
+    if group_by == 'category':
+        return dict(Transaction.CATEGORY_CHOICES).get(key, key)
+    return key or '(blank)'
+
+
+def breakdown_series(rows, buckets, group_by, top, tzinfo):
+    """Split grouped ``(bucket, group)`` rows into aligned per-group series.
+
+    The ``top`` groups by window total get their own series and every other
+    group is folded into an "Other" series, all indexed like ``buckets``.
+    """
+    index = {bucket: position for position, bucket in enumerate(buckets)}
+    values = {}
+    for row in rows:
+        series = values.setdefault(row[group_by], [0.0] * len(buckets))
+        position = index[_local_day(row['bucket'], tzinfo)]
+        series[position] += float(row['bucket_total'] or 0)
+    ranked = sorted(values, key=lambda key: (-sum(values[key]), key))
+    keys = ranked[:top]
+    if len(ranked) > top:
+        rest = [values[key] for key in ranked[top:]]
+        values[OTHER_KEY] = [sum(column) for column in zip(*rest)]
+        keys.append(OTHER_KEY)
+    return [
+        {
+            'key': key, 'label': _group_label(group_by, key),
+            'values': values[key], 'total': sum(values[key]),
+        }
+        for key in keys
+    ]
+
+
+def revenue_series(results, first_day, last_day, params):
+    """Build the chart payload from evaluated :func:`report_queries` rows.
+
+    Empty buckets are filled with zeros so the labels are contiguous.
+    """
+    granularity, tzinfo = params['granularity'], params['tzinfo']
+    totals = {}
+    for row in results['series']:
+        bucket = _local_day(row['bucket'], tzinfo)
+        total, count = totals.get(bucket, (0, 0))
+        total += row['bucket_total'] or 0
+        totals[bucket] = (total, count + row['bucket_count'])
+    buckets = bucket_starts(first_day, last_day, granularity)
+    labels, values, counts = [], [], []
+    for bucket in buckets:
+        total, count = totals.get(bucket, (0, 0))
+        labels.append(bucket.isoformat())
+        values.append(float(total))
+        counts.append(count)
+    previous = results['previous'][0]['bucket_total'] if results['previous'] else 0
+    payload = {
+        'labels': labels,
+        'values': values,
+        'counts': counts,
+        'total': sum(values),
+        'previous_total': float(previous or 0),
+        'categories': {
+            row['category']: float(row['bucket_total'] or 0)
+            for row in results['categories']
+        },
+        'granularity': granularity,
+        'timezone': str(tzinfo),
+    }
+    if params['group_by']:
+        payload['group_by'] = params['group_by']
+        payload['series'] = breakdown_series(
+            results['series'], buckets, params['group_by'], params['top'], tzinfo
+        )
+    return payload
+
+
+def project_report(project_id, params, now=None):
+    """Compute the reporting payload for a project and validated filters."""
+    first_day, last_day = reporting_window(params['days'], params['tzinfo'], now)
+    results = run_queries(report_queries(project_id, params, first_day, last_day))
+    return revenue_series(results, first_day, last_day, params)
+
+
+async def aproject_report(project_id, params, now=None):
+    """Async :func:`project_report`, running the report queries concurrently."""
+    first_day, last_day = reporting_window(params['days'], params['tzinfo'], now)
+    queries = report_queries(project_id, params, first_day, last_day)
+    results = await arun_queries(queries)
+    return revenue_series(results, first_day, last_day, params)
+
+
+def report_fingerprint(project, params, now=None):
+    """Identify a report by project data version, filters and current date.
+
+    Any transaction write bumps ``project.data_version``, and the date
+    component rolls the window over at local midnight.
+    """
+    tzinfo = params['tzinfo']
+    today = timezone.localtime(now or timezone.now(), tzinfo).date()
+    raw = '|'.join([
+        str(project.id), project.created_at.isoformat(), str(project.data_version),
+        today.isoformat(), str(params['days']), params['category'],
+        params['granularity'], str(tzinfo), params['group_by'] or '',
+        str(params['top']),
+    ])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def report_last_modified(project, params, now=None):
+    """Return when a report last changed: a data write or the local midnight."""
+    tzinfo = params['tzinfo']
+    today = timezone.localtime(now or timezone.now(), tzinfo).date()
+    return max(project.data_updated_at or project.created_at, day_start(today, tzinfo))
+
+
+def cached_project_report(project, params, now=None):
+    """Return the report for ``project``, computing it at most once per version."""
+    cache = caches[CACHE_ALIAS]
+    key = f'report:{report_fingerprint(project, params, now)}'
+    payload = cache.get(key)
+    if payload is None:
+        payload = project_report(project.id, params, now)
+        cache.set(key, payload)
+    return payload
+
+
+async def acached_project_report(project, params, now=None):
+    """Async :func:`cached_project_report`."""
+    cache = caches[CACHE_ALIAS]
+    key = f'report:{report_fingerprint(project, params, now)}'
+    payload = await cache.aget(key)
+    if payload is None:
+        payload = await aproject_report(project.id, params, now)
+        await cache.aset(key, payload)
+    return payload
+
+
+def summary_queries(project_id):
+    """Build the unevaluated rollup querysets behind the project summary."""
+    rollups = ProjectDailyRollup.objects.filter(project_id=project_id)
+    return {
+        'stats': rollups.values('project_id').annotate(
+            count=Sum('count'),
+            total=Sum('total'),
+            smallest=Min('min_amount'),
+            largest=Max('max_amount'),
+            first_day=Min('day'),
+            last_day=Max('day'),
+        ).order_by(),
+        'categories': (
+            rollups.values('category')
+            .annotate(count=Sum('count'), total=Sum('total'))
+            .order_by('-total')
+        ),
+    }
+
+
+def summary_payload(results):
+    """Shape evaluated :func:`summary_queries` rows into summary stats."""
+    if results['stats']:
+        stats = dict(results['stats'][0])
+        del stats['project_id']
+    else:
+        stats = dict.fromkeys(
+            ['count', 'total', 'smallest', 'largest', 'first_day', 'last_day']
+        )
+    if stats['count']:
+        stats['average'] = stats['total'] / stats['count']
+    category_labels = dict(Transaction.CATEGORY_CHOICES)
+    category_mix = [
+        {**row, 'label': category_labels.get(row['category'], row['category'])}
+        for row in results['categories']
+    ]
+    return {'stats': stats, 'category_mix': category_mix}
@@ -0,0 +1,185 @@
+"""Maintenance of the per-day ``ProjectDailyRollup`` table.
+
+Rollups are keyed on the local day in the default timezone (``TIME_ZONE``).
+Callers must already be inside ``transaction.atomic`` so the rollup change
+commits or rolls back together with the transaction write.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Max, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest, Least, TruncDate
+from django.utils import timezone
+
+from . import summaries
+from .models import Project, ProjectDailyRollup, Transaction
+
+
+def rollup_timezone():
+    """Return the timezone rollup days are cut in."""
+    return timezone.get_default_timezone()
+
+
+def covers_timezone(tzinfo):
+    """Whether rollups can answer day-aligned questions asked in ``tzinfo``."""
+    return str(tzinfo) == str(rollup_timezone())
+
+
+def rollup_day(value):
+    """Return the rollup day a transaction timestamp falls on."""
+    return timezone.localtime(value, rollup_timezone()).date()
+
+
+def day_bounds(day):
+    """Return the ``[start, end)`` datetimes of a rollup day."""
+    start = datetime.combine(day, time.min, tzinfo=rollup_timezone())
+    return start, start + timedelta(days=1)
+
+
+def _group(rows):
+    """Group transactions by rollup key, collecting their amounts."""
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row.project_id, rollup_day(row.date), row.category)].append(row.amount)
+    return groups
+
+
+def add_to_rollups(rows):
+    """Fold newly written transactions into their rollups."""
+    for (project_id, day, category), amounts in _group(rows).items():
+        key = {'project_id': project_id, 'day': day, 'category': category}
+        changes = {
+            'count': F('count') + len(amounts),
+            'total': F('total') + sum(amounts),
+            'min_amount': Least('min_amount', min(amounts)),
+            'max_amount': Greatest('max_amount', max(amounts)),
+        }
+        if ProjectDailyRollup.objects.filter(**key).update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                ProjectDailyRollup.objects.create(
+                    count=len(amounts), total=sum(amounts),
+                    min_amount=min(amounts), max_amount=max(amounts), **key
+                )
+        except IntegrityError:
+            # Another writer created the row first; fold into theirs.
+            ProjectDailyRollup.objects.filter(**key).update(**changes)
+
+
+def refresh_rollups(rows):
+    """Re-aggregate the rollups touched by deleted or edited transactions.
+
+    ``min``/``max`` cannot be decremented, so each touched group is
+    recomputed from its own day of transactions.
+    """
+    for project_id, day, category in _group(rows):
+        refresh_rollup(project_id, day, category)
+
+
+def refresh_rollup(project_id, day, category):
+    """Recompute a single rollup row from ``Transaction``."""
+    key = {'project_id': project_id, 'day': day, 'category': category}
+    start, end = day_bounds(day)
+    stats = (
+        _day_rows(project_id)
+        .filter(date__gte=start, date__lt=end, category=category)
+        .first()
+    )
+    if not stats:
+        ProjectDailyRollup.objects.filter(**key).delete()
+        return
+    ProjectDailyRollup.objects.update_or_create(defaults=_rollup_fields(stats), **key)
+
+
+def project_totals(project_id):
+    """Return a project's transaction count, total and average from one query."""
+    stats = ProjectDailyRollup.objects.filter(project_id=project_id).aggregate(
+        count=Sum('count'), total=Sum('total'),
+    )
+    count = stats['count'] or 0
+    total = stats['total'] or Decimal('0')
+    return {
+        'count': count,
+        'total': total,
+        'average': total / count if count else Decimal('0'),
+    }
+
+
+def annotate_activity(projects):
+    """Annotate projects with their transaction count, total and last activity.
+
+    Each value is a correlated subquery over the project's rollups, so a
+    list of projects and their stats come back in a single query.
+    """
+    rollups = ProjectDailyRollup.objects.filter(project=OuterRef('pk'))
+    rollups = rollups.order_by().values('project')
+    return projects.annotate(
+        transaction_count=Coalesce(
+            Subquery(rollups.annotate(n=Sum('count')).values('n')), 0,
+        ),
+        total_amount=Coalesce(
+            Subquery(rollups.annotate(s=Sum('total')).values('s')), Decimal('0'),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+        last_activity=Subquery(rollups.annotate(d=Max('day')).values('d')),
+    )
+
+
+def _day_rows(project_id):
+    """Aggregate a project's transactions into rollup-shaped rows in SQL."""
+    return (
+        Transaction.objects.filter(project_id=project_id)
+        .annotate(day=TruncDate('date', tzinfo=rollup_timezone()))
+        .values('day', 'category')
+        .annotate(
+            count=Count('id'), total=Sum('amount'),
+            min_amount=Min('amount'), max_amount=Max('amount'),
+        )
+        .order_by('day', 'category')
+    )
+
+
+def _rollup_fields(stats):
+    return {
+        'count': stats['count'],
+        'total': stats['total'],
+        'min_amount': stats['min_amount'],
+        'max_amount': stats['max_amount'],
+    }
+
+
+def rebuild_project_rollups(project_id):
+    """Replace every rollup of a project, and its summary totals, with fresh rows."""
+    with transaction.atomic():
+        ProjectDailyRollup.objects.filter(project_id=project_id).delete()
+        rollups = [
+            ProjectDailyRollup(
+                project_id=project_id, day=stats['day'], category=stats['category'],
+                **_rollup_fields(stats)
+            )
+            for stats in _day_rows(project_id).iterator()
+        ]
+        ProjectDailyRollup.objects.bulk_create(rollups, batch_size=1000)
+        summaries.rebuild_project_totals(project_id)
+        # Repaired rollups can change reports, so invalidate cached ones.
+        Project.bump_data_version([project_id])
+    return len(rollups)
+
+
+def verify_project_rollups(project_id):
+    """Compare stored rollups with ``Transaction`` and list the drifted keys."""
+    expected = {
+        (stats['day'], stats['category']): _rollup_fields(stats)
+        for stats in _day_rows(project_id).iterator()
+    }
+    stored = {
+        (r.day, r.category): _rollup_fields(r.__dict__)
+        for r in ProjectDailyRollup.objects.filter(project_id=project_id).iterator()
+    }
+    return sorted(
+        key for key in expected.keys() | stored.keys()
+        if expected.get(key) != stored.get(key)
+    )
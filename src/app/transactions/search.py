@@ -0,0 +1,147 @@
+"""Full-text search over transaction item and customer names.
+
+On SQLite, an FTS5 table indexes ``item_name``, ``customer_name`` and
+``project_id`` of every ``Transaction``. It reads the text from the
+transaction table itself (external content), so nothing is stored twice,
+and triggers keep it in step with every write, including bulk inserts,
+raw SQL and cascading deletes. Every word of a query matches as a prefix,
+within one project, and results are ranked by BM25 with item names
+weighing more than customer names.
+
+Django's SQLite backend rebuilds a table for some schema changes, which
+drops its triggers, so they are re-created after every ``migrate``. Other
+databases fall back to ``icontains`` filters.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+from .models import Transaction
+
+FTS_TABLE = 'transactions_transaction_fts'
+SEARCH_LIMIT = 50
+# Words beyond this are ignored, to bound the cost of one query.
+MAX_TERMS = 8
+# BM25 weights of item_name, customer_name and project_id.
+RANK = f'bm25({FTS_TABLE}, 2.0, 1.0, 0.0)'
+
+_WORD = re.compile(r'\w+')
+
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON transactions_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, item_name, customer_name, project_id)
+        VALUES (new.id, new.item_name, new.customer_name, new.project_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON transactions_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(
+            {FTS_TABLE}, rowid, item_name, customer_name, project_id
+        ) VALUES ('delete', old.id, old.item_name, old.customer_name, old.project_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF item_name, customer_name, project_id
+    ON transactions_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(
+            {FTS_TABLE}, rowid, item_name, customer_name, project_id
+        ) VALUES ('delete', old.id, old.item_name, old.customer_name, old.project_id);
+        INSERT INTO {FTS_TABLE}(rowid, item_name, customer_name, project_id)
+        VALUES (new.id, new.item_name, new.customer_name, new.project_id);
+    END
+    """,
+]
+
+
+def enabled(using='default'):
+    """Whether searches on ``using`` go through the FTS index."""
+    return connections[using].vendor == 'sqlite'
+
+
+def match_expression(query, project_id=None):
+    """Translate free text into an FTS5 query, or ``None`` if it has no words.
+
+    Each word becomes a quoted prefix term, so user input can never form
+    FTS5 operators or column filters.
+    """
+    words = _WORD.findall(query)[:MAX_TERMS]
+    if not words:
+        return None
+    terms = ' AND '.join(f'{{item_name customer_name}}: "{word}"*' for word in words)
+    if project_id is not None:
+        terms = f'project_id: "{int(project_id)}" AND {terms}'
+    return terms
+
+
+def _fallback(query):
+    condition = Q()
+    for word in _WORD.findall(query)[:MAX_TERMS]:
+        condition &= Q(item_name__icontains=word) | Q(customer_name__icontains=word)
+    return condition
+
+
+def search_ids(query, project_id=None, limit=SEARCH_LIMIT, using='default'):
+    """Ids of the transactions best matching ``query``, best first."""
+    expression = match_expression(query, project_id)
+    if expression is None:
+        return []
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY {RANK}, rowid DESC LIMIT %s',
+            [expression, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_transactions(project, query, limit=SEARCH_LIMIT, using='default'):
+    """A project's transactions best matching ``query``, best first."""
+    rows = Transaction.objects.using(using).filter(project=project)
+    if not enabled(using):
+        return list(rows.filter(_fallback(query)).order_by('-date', '-id')[:limit])
+    ids = search_ids(query, project.id, limit, using)
+    found = rows.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
+
+
+def matching(query, using='default'):
+    """A ``Q`` selecting every transaction that matches ``query``, for any queryset."""
+    if not enabled(using):
+        return _fallback(query)
+    expression = match_expression(query)
+    if expression is None:
+        return Q()
+    sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+    return Q(id__in=RawSQL(sql, [expression]))
+
+
+def install_triggers(using='default'):
+    with connections[using].cursor() as cursor:
+        for statement in TRIGGERS:
+            cursor.execute(statement)
+
+
+def rebuild_index(using='default'):
+    """Re-create the triggers and re-index every transaction; return the row count."""
+    install_triggers(using)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+@receiver(post_migrate)
+def _reinstall_triggers(sender, using='default', **kwargs):
+    if sender.name != 'transactions' or not enabled(using):
+        return
+    if FTS_TABLE in connections[using].introspection.table_names():
+        install_triggers(using)
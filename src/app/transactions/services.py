@@ -0,0 +1,59 @@
+"""Write paths for the transaction ledger.
+
+Every change to ``Transaction`` rows goes through these helpers so the
+derived tables stay in step with the ledger inside one database transaction.
+"""
+from django.db import transaction
+
+from . import anomalies, emissions, rollups, sketches, summaries
+from .models import Project, Transaction
+
+BULK_BATCH_SIZE = 1000
+
+
+def record_transactions(rows):
+    """Insert unsaved transactions and fold them into the derived data."""
+    rows = list(rows)
+    if not rows:
+        return rows
+    emissions.apply_emissions(rows)
+    with transaction.atomic():
+        if len(rows) == 1:
+            rows[0].save()
+        else:
+            Transaction.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+        rollups.add_to_rollups(rows)
+        summaries.add_to_totals(rows)
+        sketches.add_to_sketches(rows)
+        anomalies.observe(rows)
+        Project.bump_data_version(row.project_id for row in rows)
+    return rows
+
+
+def save_transaction(row):
+    """Create or update a single transaction."""
+    if row._state.adding:
+        return record_transactions([row])[0]
+    emissions.apply_emissions([row])
+    with transaction.atomic():
+        previous = Transaction.objects.select_for_update().get(pk=row.pk)
+        row.save()
+        rollups.refresh_rollups([previous, row])
+        summaries.remove_from_totals([previous])
+        summaries.add_to_totals([row])
+        sketches.refresh_sketches([previous, row])
+        Project.bump_data_version([previous.project_id, row.project_id])
+    return row
+
+
+def delete_transactions(rows):
+    """Delete transactions and take them out of the derived data."""
+    rows = list(rows)
+    if not rows:
+        return
+    with transaction.atomic():
+        Transaction.objects.filter(pk__in=[row.pk for row in rows]).delete()
+        rollups.refresh_rollups(rows)
+        summaries.remove_from_totals(rows)
+        sketches.refresh_sketches(rows)
+        Project.bump_data_version(row.project_id for row in rows)
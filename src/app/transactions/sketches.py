@@ -0,0 +1,299 @@
+"""Approximate item and customer analytics from per-day sketches.
+
+Each ``ProjectDailySketch`` row holds, for one project and rollup day:
+
+* a Space-Saving summary of item names and one of customer names, with at
+  most ``CAPACITY`` counters each, for the heaviest hitters, and
+* a HyperLogLog of customer names with ``2 ** PRECISION`` registers, for
+  the number of distinct customers.
+
+Both kinds are mergeable, so any range of days is answered by merging
+its daily sketches in memory, without grouping ``Transaction`` rows.
+
+Error bounds, for a range of ``N`` counted transactions:
+
+* Every reported count is an upper bound, and the true count lies in
+  ``[count - error, count]``. The ``error`` of every name is at most
+  ``max_error``, which is at most ``N / CAPACITY``. Any name with a true
+  count above ``max_error`` is always reported as a candidate. Days with
+  fewer distinct names than ``CAPACITY`` are exact, and so add no error.
+* Distinct customer counts have a relative standard error of
+  ``1.04 / sqrt(2 ** PRECISION)``, about 1.6%. Small counts are exact
+  in practice.
+
+New transactions are folded into their day's sketch as they are written.
+Sketches cannot forget, so days touched by edits or deletes are rebuilt
+from that day's transactions. Set ``SKETCHES_EXACT``, or pass
+``exact=True``, to answer with exact ``GROUP BY`` queries instead.
+"""
+import hashlib
+import math
+import zlib
+from collections import Counter, defaultdict
+from itertools import groupby
+
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+
+from .models import ProjectDailySketch, Transaction
+from .rollups import day_bounds, rollup_day
+
+CAPACITY = 64
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+RELATIVE_ERROR = 1.04 / math.sqrt(REGISTERS)
+
+_HASH_BITS = 64
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters: ``{key: [count, error]}`` with bounded size."""
+
+    def __init__(self, counters=None, capacity=CAPACITY):
+        self.counters = {key: list(value) for key, value in (counters or {}).items()}
+        self.capacity = capacity
+
+    @property
+    def floor(self):
+        """Most a key missing from a full summary can have been seen."""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def add(self, key, count=1):
+        if key in self.counters:
+            self.counters[key][0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[key] = [count, 0]
+        else:
+            # Replace the smallest counter; its count bounds the newcomer's past.
+            smallest = min(self.counters, key=lambda name: self.counters[name][0])
+            floor = self.counters.pop(smallest)[0]
+            self.counters[key] = [floor + count, floor]
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over ``REGISTERS`` one-byte registers."""
+
+    def __init__(self, registers=None):
+        if registers is None:
+            registers = np.zeros(REGISTERS, dtype=np.uint8)
+        self.registers = registers
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data:
+            return cls()
+        return cls(np.frombuffer(zlib.decompress(bytes(data)), dtype=np.uint8).copy())
+
+    def to_bytes(self):
+        if not self.registers.any():
+            return b''
+        return zlib.compress(self.registers.tobytes())
+
+    def add(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        value = int.from_bytes(digest, 'big')
+        index = value >> (_HASH_BITS - PRECISION)
+        rest = value & ((1 << (_HASH_BITS - PRECISION)) - 1)
+        rank = _HASH_BITS - PRECISION - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        harmonic = np.ldexp(1.0, -self.registers.astype(np.int32)).sum()
+        estimate = _ALPHA * REGISTERS * REGISTERS / harmonic
+        zeros = int((self.registers == 0).sum())
+        if estimate <= 2.5 * REGISTERS and zeros:
+            # Linear counting is more accurate for small cardinalities.
+            estimate = REGISTERS * math.log(REGISTERS / zeros)
+        return round(estimate)
+
+
+def _fold(sketch, rows):
+    """Add ``(item_name, customer_name)`` pairs to a sketch row in memory."""
+    items = SpaceSaving(sketch.items)
+    customers = SpaceSaving(sketch.customers)
+    registers = HyperLogLog.from_bytes(sketch.customer_registers)
+    for name, count in Counter(item for item, _ in rows).items():
+        items.add(name, count)
+    for name, count in Counter(customer for _, customer in rows if customer).items():
+        customers.add(name, count)
+        registers.add(name)
+    sketch.count += len(rows)
+    sketch.items = items.counters
+    sketch.customers = customers.counters
+    sketch.customer_registers = registers.to_bytes()
+
+
+def _group(rows):
+    groups = defaultdict(list)
+    for row in rows:
+        key = (row.project_id, rollup_day(row.date))
+        groups[key].append((row.item_name, row.customer_name))
+    return groups
+
+
+def add_to_sketches(rows):
+    """Fold newly written transactions into their days' sketches.
+
+    Must run inside the caller's ``transaction.atomic``, so each sketch is
+    read and written back under the row lock.
+    """
+    for (project_id, day), pairs in _group(rows).items():
+        key = {'project_id': project_id, 'day': day}
+        sketch = ProjectDailySketch.objects.select_for_update().filter(**key).first()
+        if sketch is None:
+            sketch = ProjectDailySketch(**key)
+            _fold(sketch, pairs)
+            try:
+                with transaction.atomic():
+                    sketch.save(force_insert=True)
+                continue
+            except IntegrityError:
+                # Another writer created the day first; fold into theirs.
+                sketch = ProjectDailySketch.objects.select_for_update().get(**key)
+        _fold(sketch, pairs)
+        sketch.save()
+
+
+def refresh_sketches(rows):
+    """Rebuild the day sketches touched by deleted or edited transactions."""
+    for project_id, day in _group(rows):
+        refresh_sketch(project_id, day)
+
+
+def _day_pairs(project_id, day):
+    start, end = day_bounds(day)
+    return list(
+        Transaction.objects.filter(project_id=project_id, date__gte=start, date__lt=end)
+        .values_list('item_name', 'customer_name')
+    )
+
+
+def refresh_sketch(project_id, day):
+    """Recompute one day's sketch from ``Transaction``."""
+    pairs = _day_pairs(project_id, day)
+    ProjectDailySketch.objects.filter(project_id=project_id, day=day).delete()
+    if pairs:
+        sketch = ProjectDailySketch(project_id=project_id, day=day)
+        _fold(sketch, pairs)
+        sketch.save()
+
+
+def rebuild_project_sketches(project_id):
+    """Replace every sketch of a project with ones built from its transactions."""
+    rows = (
+        Transaction.objects.filter(project_id=project_id)
+        .order_by('date')
+        .values_list('date', 'item_name', 'customer_name')
+        .iterator(chunk_size=5000)
+    )
+    sketches = []
+    # Rows come in date order, so only one day is held in memory at a time.
+    for day, day_rows in groupby(rows, key=lambda row: rollup_day(row[0])):
+        sketch = ProjectDailySketch(project_id=project_id, day=day)
+        _fold(sketch, [(item, customer) for _, item, customer in day_rows])
+        sketches.append(sketch)
+    with transaction.atomic():
+        ProjectDailySketch.objects.filter(project_id=project_id).delete()
+        ProjectDailySketch.objects.bulk_create(sketches, batch_size=500)
+    return len(sketches)
+
+
+def merge_heavy_hitters(summaries, capacity=CAPACITY):
+    """Merge Space-Saving counter dicts; return ``(candidates, max_error)``.
+
+    A name missing from a full summary may have been seen up to that
+    summary's floor times, so the floor is added to its count and error.
+    """
+    summaries = [SpaceSaving(counters, capacity) for counters in summaries]
+    floors = sum(summary.floor for summary in summaries)
+    merged = defaultdict(lambda: [0, 0, 0])
+    for summary in summaries:
+        floor = summary.floor
+        for name, (count, error) in summary.counters.items():
+            entry = merged[name]
+            entry[0] += count
+            entry[1] += error
+            entry[2] += floor
+    candidates = {
+        name: (count + floors - present, error + floors - present)
+        for name, (count, error, present) in merged.items()
+    }
+    return candidates, floors
+
+
+def _ranked(candidates, top):
+    ranked = sorted(candidates.items(), key=lambda pair: (-pair[1][0], pair[0]))[:top]
+    return [
+        {'name': name, 'count': count, 'error': error}
+        for name, (count, error) in ranked
+    ]
+
+
+def exact_mode():
+    return getattr(settings, 'SKETCHES_EXACT', False)
+
+
+def audience(project_id, first_day, last_day, top=5, exact=None):
+    """Top items, top and distinct customers over ``[first_day, last_day]``."""
+    if exact is None:
+        exact = exact_mode()
+    if exact:
+        return _exact_audience(project_id, first_day, last_day, top)
+    days = ProjectDailySketch.objects.filter(
+        project_id=project_id, day__gte=first_day, day__lte=last_day
+    )
+    sketches = list(
+        days.values_list('count', 'items', 'customers', 'customer_registers')
+    )
+    items, item_error = merge_heavy_hitters(sketch[1] for sketch in sketches)
+    customers, customer_error = merge_heavy_hitters(sketch[2] for sketch in sketches)
+    registers = HyperLogLog()
+    for sketch in sketches:
+        if sketch[3]:
+            registers.merge(HyperLogLog.from_bytes(sketch[3]))
+    return {
+        'exact': False,
+        'transactions': sum(sketch[0] for sketch in sketches),
+        'top_items': _ranked(items, top),
+        'top_items_max_error': item_error,
+        'top_customers': _ranked(customers, top),
+        'top_customers_max_error': customer_error,
+        'unique_customers': registers.estimate(),
+        'unique_customers_relative_error': round(RELATIVE_ERROR, 4),
+    }
+
+
+def _exact_audience(project_id, first_day, last_day, top):
+    start, _ = day_bounds(first_day)
+    _, end = day_bounds(last_day)
+    rows = Transaction.objects.filter(
+        project_id=project_id, date__gte=start, date__lt=end
+    ).order_by()
+    named = rows.exclude(customer_name='')
+
+    def ranked(values, field):
+        counts = values.values(field).annotate(count=Count('id'))
+        return [
+            {'name': row[field], 'count': row['count'], 'error': 0}
+            for row in counts.order_by('-count', field)[:top]
+        ]
+
+    return {
+        'exact': True,
+        'transactions': rows.aggregate(count=Count('id'))['count'],
+        'top_items': ranked(rows, 'item_name'),
+        'top_items_max_error': 0,
+        'top_customers': ranked(named, 'customer_name'),
+        'top_customers_max_error': 0,
+        'unique_customers': named.values('customer_name').distinct().count(),
+        'unique_customers_relative_error': 0.0,
+    }
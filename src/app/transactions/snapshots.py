@@ -0,0 +1,93 @@
+"""Columnar snapshots of each project's transactions for the engine.
+
+``export_project`` appends whole rollup days to a project's snapshot (see
+``engine.snapshots``), reading only the days the snapshot does not cover
+yet. Days already in a snapshot are never rewritten, so before appending,
+the snapshot's row count and total are checked against the daily rollups
+of the days it covers. Any difference, from an edit, a delete or a
+backdated insert, rebuilds the snapshot from scratch. An edit that leaves
+both unchanged, such as renaming an item, is only picked up by
+``rebuild=True``.
+"""
+import shutil
+from datetime import UTC, datetime
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from engine.snapshots import Snapshot, SnapshotWriter, read_manifest
+
+from .models import ProjectDailyRollup, Transaction
+from .rollups import day_bounds, rollup_timezone
+
+CHUNK_SIZE = 20000
+
+
+def snapshot_path(project_id, root=None):
+    return Path(root or settings.SNAPSHOTS_DIR) / f'project-{project_id}'
+
+
+def open_snapshot(project_id, root=None):
+    """Memory-map a project's snapshot; raises ``SnapshotError`` if there is none."""
+    return Snapshot(snapshot_path(project_id, root))
+
+
+def _epoch(value):
+    return int(value.timestamp())
+
+
+def _covered(project_id, end_day):
+    """Count and total in cents of the rollup days before ``end_day``."""
+    days = ProjectDailyRollup.objects.filter(project_id=project_id, day__lt=end_day)
+    totals = days.aggregate(count=Sum('count'), total=Sum('total'))
+    return totals['count'] or 0, int((totals['total'] or 0) * 100)
+
+
+def _is_current(project_id, manifest):
+    end_day = datetime.fromtimestamp(manifest['end'], rollup_timezone()).date()
+    return (manifest['rows'], manifest['total_cents']) == _covered(project_id, end_day)
+
+
+def export_project(project_id, until=None, rebuild=False, root=None):
+    """Append the days of a project before ``until`` (default: today) to its snapshot.
+
+    Returns ``(rows, rebuilt)``: the number of rows appended, and whether
+    the snapshot was written from scratch.
+    """
+    path = snapshot_path(project_id, root)
+    until = until or timezone.localdate(timezone=rollup_timezone())
+    end = _epoch(day_bounds(until)[0])
+    manifest = read_manifest(path)
+    if manifest is not None and (rebuild or not _is_current(project_id, manifest)):
+        shutil.rmtree(path)
+        manifest = None
+    start = manifest['end'] if manifest else 0
+    if end <= start:
+        return 0, False
+
+    rows = (
+        Transaction.objects.filter(
+            project_id=project_id,
+            date__gte=datetime.fromtimestamp(start, UTC),
+            date__lt=datetime.fromtimestamp(end, UTC),
+        )
+        .order_by('date', 'id')
+        .values_list('id', 'date', 'amount', 'category', 'item_name', 'customer_name')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    known = [value for value, _ in Transaction.CATEGORY_CHOICES]
+    with SnapshotWriter(path, start, end, known) as writer:
+        while chunk := list(islice(rows, CHUNK_SIZE)):
+            ids, dates, amounts, categories, items, customers = zip(*chunk)
+            writer.write(
+                ids=ids,
+                epochs=[_epoch(date) for date in dates],
+                cents=[int(amount * 100) for amount in amounts],
+                categories=categories,
+                items=items,
+                customers=customers,
+            )
+    return writer.rows, manifest is None
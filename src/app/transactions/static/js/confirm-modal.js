@@ -112,8 +112,8 @@ async function confirmRemoveMember(username) {
 }
 
 // Handle form submissions with confirmation
-function setupConfirmableForms() {
-    document.querySelectorAll('[data-confirm]').forEach(form => {
+function setupConfirmableForms(root = document) {
+    root.querySelectorAll('[data-confirm]').forEach(form => {
         form.addEventListener('submit', async (e) => {
             e.preventDefault();
 
@@ -147,7 +147,7 @@ function setupConfirmableForms() {
 
 // Initialize on page load
 if (document.readyState === 'loading') {
-    document.addEventListener('DOMContentLoaded', setupConfirmableForms);
+    document.addEventListener('DOMContentLoaded', () => setupConfirmableForms());
 } else {
     setupConfirmableForms();
 }
@@ -0,0 +1,216 @@
+"""Precomputed project summaries for the Summary tab.
+
+The write path keeps two small tables in step with the ledger, next to the
+daily rollups: ``ProjectNameTotal`` counts sales per item and customer, and
+``ProjectAmountCount`` counts transactions per amount, which is enough for
+an exact median. A ``ProjectSummary`` row caches the figures derived from
+these tables and the rollups. It is recomputed lazily, on the first read
+after ``Project.data_version`` moves, and never reads ``Transaction``
+itself, so its cost depends on the number of distinct names, amounts and
+days rather than on the size of the history.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import Greatest
+
+from .models import (
+    ProjectAmountCount,
+    ProjectDailyRollup,
+    ProjectNameTotal,
+    ProjectSummary,
+    Transaction,
+)
+
+TOP_N = 5
+
+# Upserts of many keys in one executemany; ON CONFLICT works on SQLite and PostgreSQL.
+_NAMES = ProjectNameTotal._meta.db_table
+_AMOUNTS = ProjectAmountCount._meta.db_table
+_ADD_NAME_TOTALS = f"""
+    INSERT INTO {_NAMES} (project_id, kind, name, count, total)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (project_id, kind, name) DO UPDATE
+    SET count = {_NAMES}.count + excluded.count, total = {_NAMES}.total + excluded.total
+"""
+_ADD_AMOUNT_COUNTS = f"""
+    INSERT INTO {_AMOUNTS} (project_id, amount, count) VALUES (%s, %s, %s)
+    ON CONFLICT (project_id, amount) DO UPDATE
+    SET count = {_AMOUNTS}.count + excluded.count
+"""
+
+
+def _names(rows):
+    """Count and total the rows per ``(project_id, kind, name)``."""
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for row in rows:
+        keys = [(row.project_id, 'item', row.item_name)]
+        if row.customer_name:
+            keys.append((row.project_id, 'customer', row.customer_name))
+        for key in keys:
+            totals[key][0] += 1
+            totals[key][1] += row.amount
+    return totals
+
+
+def _amounts(rows):
+    return Counter((row.project_id, row.amount) for row in rows)
+
+
+def add_to_totals(rows):
+    """Fold newly written transactions into the name and amount tables.
+
+    Like the rollups, this must run inside the caller's ``transaction.atomic``.
+    """
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(_ADD_NAME_TOTALS, [
+            (project_id, kind, name, count, total)
+            for (project_id, kind, name), (count, total) in _names(rows).items()
+        ])
+        cursor.executemany(_ADD_AMOUNT_COUNTS, [
+            (project_id, amount, count)
+            for (project_id, amount), count in _amounts(rows).items()
+        ])
+
+
+def remove_from_totals(rows):
+    """Take deleted or edited transactions out of the name and amount tables."""
+    if not rows:
+        return
+    for (project_id, kind, name), (count, total) in _names(rows).items():
+        totals = ProjectNameTotal.objects.filter(project_id=project_id, kind=kind,
+                                                 name=name)
+        totals.update(count=Greatest(F('count') - count, 0), total=F('total') - total)
+    for (project_id, amount), count in _amounts(rows).items():
+        ProjectAmountCount.objects.filter(project_id=project_id, amount=amount).update(
+            count=Greatest(F('count') - count, 0),
+        )
+    project_ids = {row.project_id for row in rows}
+    ProjectNameTotal.objects.filter(project_id__in=project_ids, count=0).delete()
+    ProjectAmountCount.objects.filter(project_id__in=project_ids, count=0).delete()
+
+
+def rebuild_project_totals(project_id):
+    """Replace a project's name and amount tables with freshly aggregated rows."""
+    rows = Transaction.objects.filter(project_id=project_id).order_by()
+    with transaction.atomic():
+        ProjectNameTotal.objects.filter(project_id=project_id).delete()
+        ProjectAmountCount.objects.filter(project_id=project_id).delete()
+        customers = rows.exclude(customer_name='')
+        names = [
+            ProjectNameTotal(project_id=project_id, kind=kind, name=name, count=count,
+                             total=total)
+            for kind, matching, field in [
+                ('item', rows, 'item_name'), ('customer', customers, 'customer_name'),
+            ]
+            for name, count, total in (
+                matching.values_list(field).annotate(Count('id'), Sum('amount'))
+            )
+        ]
+        ProjectNameTotal.objects.bulk_create(names, batch_size=1000)
+        ProjectAmountCount.objects.bulk_create(
+            [
+                ProjectAmountCount(project_id=project_id, amount=amount, count=count)
+                for amount, count in rows.values_list('amount').annotate(Count('id'))
+            ],
+            batch_size=1000,
+        )
+    return len(names)
+
+
+def _median(amount_counts):
+    """Median of a sorted ``[(amount, count)]`` histogram."""
+    size = sum(count for _, count in amount_counts)
+    if not size:
+        return None
+    wanted = {(size - 1) // 2, size // 2}
+    picked = []
+    seen = 0
+    for amount, count in amount_counts:
+        for position in sorted(wanted):
+            if seen <= position < seen + count:
+                picked.append(amount)
+                wanted.discard(position)
+        seen += count
+        if not wanted:
+            break
+    return (sum(picked) / len(picked)).quantize(Decimal('0.01'))
+
+
+def _top(project_id, kind):
+    rows = (
+        ProjectNameTotal.objects.using(DEFAULT_DB_ALIAS)
+        .filter(project_id=project_id, kind=kind)
+        .order_by('-total', 'name')
+        .values('name', 'count', 'total')[:TOP_N]
+    )
+    return [{**row, 'total': str(row['total'])} for row in rows]
+
+
+def refresh_summary(project):
+    """Recompute and store the summary of ``project`` at its current data version."""
+    # Everything is read from the primary: a lagging replica would store old
+    # figures under the new version.
+    rollups = ProjectDailyRollup.objects.using(DEFAULT_DB_ALIAS)
+    rollups = rollups.filter(project_id=project.id)
+    stats = rollups.aggregate(
+        count=Sum('count'), total=Sum('total'),
+        smallest=Min('min_amount'), largest=Max('max_amount'),
+        first_day=Min('day'), last_day=Max('day'),
+    )
+    days = rollups.values('day').annotate(day_total=Sum('total'))
+    best = days.order_by('-day_total', 'day').first()
+    category_labels = dict(Transaction.CATEGORY_CHOICES)
+    categories = rollups.values('category').annotate(
+        count=Sum('count'), total=Sum('total'),
+    )
+    category_mix = [
+        {
+            'category': row['category'],
+            'label': category_labels.get(row['category'], row['category']),
+            'count': row['count'],
+            'total': str(row['total']),
+        }
+        for row in categories.order_by('-total')
+    ]
+    amounts = list(
+        ProjectAmountCount.objects.using(DEFAULT_DB_ALIAS)
+        .filter(project_id=project.id)
+        .order_by('amount')
+        .values_list('amount', 'count')
+    )
+    # Keyed by id: assigning the instance would ask the router for a write
+    # database, and that marks the request as a user write (see replicas).
+    summary, _ = ProjectSummary.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        project_id=project.id,
+        defaults={
+            'data_version': project.data_version,
+            'count': stats['count'] or 0,
+            'total': stats['total'] or Decimal('0'),
+            'smallest': stats['smallest'],
+            'largest': stats['largest'],
+            'median': _median(amounts),
+            'first_day': stats['first_day'],
+            'last_day': stats['last_day'],
+            'best_day': best['day'] if best else None,
+            'best_day_total': best['day_total'] if best else None,
+            'category_mix': category_mix,
+            'top_items': _top(project.id, 'item'),
+            'top_customers': _top(project.id, 'customer'),
+        },
+    )
+    return summary
+
+
+def project_summary(project):
+    """The stored summary of ``project``, recomputed first if it is stale."""
+    summaries = ProjectSummary.objects.using(DEFAULT_DB_ALIAS)
+    summary = summaries.filter(project=project).first()
+    if summary is None or summary.data_version != project.data_version:
+        summary = refresh_summary(project)
+    return summary
+
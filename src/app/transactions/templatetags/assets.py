@@ -0,0 +1,18 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from ..assets import CSS_BUNDLES, bundle_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def css_bundle(name):
+    """Link a page's minified stylesheet bundle, or its sources when ``DEBUG``."""
+    if name not in CSS_BUNDLES:
+        raise template.TemplateSyntaxError(f'Unknown CSS bundle "{name}".')
+    paths = CSS_BUNDLES[name] if settings.DEBUG else [bundle_name(name)]
+    links = ((static(path),) for path in paths)
+    return format_html_join('\n    ', '<link rel="stylesheet" href="{}">', links)
@@ -4,14 +4,38 @@ from . import views
 
 urlpatterns = [
     path('', views.projects_view, name='projects'),
+    path('projects/api/', views.projects_api, name='projects_api'),
     path('project/<int:project_id>/', views.home, name='home'),
+    path('project/<int:project_id>/transactions/', views.transaction_list_api,
+         name='transaction_list_api'),
     path('project/<int:project_id>/reporting/', views.project_reporting, name='project_reporting'),
     path('project/<int:project_id>/reporting/api/', views.project_reporting_api, name='project_reporting_api'),
+    path('project/<int:project_id>/audience/api/', views.project_audience_api,
+         name='project_audience_api'),
+    path('project/<int:project_id>/forecast/api/', views.project_forecast_api,
+         name='project_forecast_api'),
     path('project/<int:project_id>/configuration/', views.project_configuration, name='project_configuration'),
     path('project/<int:project_id>/summary/', views.project_summary, name='project_summary'),
+    path('project/<int:project_id>/summary/api/', views.project_summary_api,
+         name='project_summary_api'),
     path('project/<int:project_id>/team/', views.project_team, name='project_team'),
     path('project/<int:project_id>/add/', views.add_transaction, name='add_transaction'),
+    path('project/<int:project_id>/export/', views.export_transactions,
+         name='export_transactions'),
+    path('project/<int:project_id>/import/', views.import_transactions,
+         name='import_transactions'),
     path('project/<int:project_id>/delete/<int:pk>/', views.delete_transaction, name='delete_transaction'),
+    path('project/<int:project_id>/alerts/<int:pk>/dismiss/', views.dismiss_anomaly,
+         name='dismiss_anomaly'),
+    path('project/<int:project_id>/ingest/', views.ingest_transactions,
+         name='ingest_transactions'),
+    path('project/<int:project_id>/jobs/', views.start_job, name='start_job'),
+    path('project/<int:project_id>/jobs/api/', views.project_jobs_api,
+         name='project_jobs_api'),
+    path('project/<int:project_id>/jobs/<int:pk>/api/', views.job_status_api,
+         name='job_status_api'),
+    path('project/<int:project_id>/jobs/<int:pk>/download/', views.job_download,
+         name='job_download'),
     path('project/create/', views.create_project, name='create_project'),
     path('project/<int:project_id>/delete-project/', views.delete_project, name='delete_project'),
     path('login/', views.login_view, name='login'),
@@ -1,45 +1,128 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.core.exceptions import RequestDataTooBig
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.http import Http404, JsonResponse
+from django.urls import reverse
 from django.utils import timezone
-from datetime import timedelta
-
-from django.db.models import Q
+from django.utils.formats import date_format
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
+
+from . import (
+    anomalies,
+    assets,
+    exports,
+    forecasts,
+    importers,
+    ingest,
+    jobs,
+    search,
+    services,
+    sketches,
+    summaries,
+)
+from .access import accessible_projects, project_access_required
 from .forms import TransactionForm
-from .models import Project, ProjectMember, Transaction, UserProfile
+from .models import (
+    Job,
+    Project,
+    ProjectMember,
+    Transaction,
+    TransactionAnomaly,
+    UserProfile,
+)
+from .pagination import page_size, transaction_page
+from .replicas import read_alias, replica_reads
+from .reporting import (
+    ReportingError,
+    acached_project_report,
+    arun_queries,
+    report_fingerprint,
+    report_last_modified,
+    reporting_params,
+    reporting_window,
+    summary_payload,
+    summary_queries,
+)
+from .rollups import annotate_activity, project_totals, rollup_timezone
 
 
 @login_required
-def home(request, project_id):
-    """Display all transactions for a specific project."""
-    project = get_object_or_404(Project, id=project_id)
-    
-    # Check access
-    if project.owner != request.user and not ProjectMember.objects.filter(project=project, user=request.user).exists():
-        raise Http404("Project not found")
-        
-    transactions = Transaction.objects.filter(project=project)
+@project_access_required()
+def home(request, access):
+    """Display the newest transactions for a specific project, or search them."""
+    project = access.project
+
+    query = request.GET.get('q', '').strip()
+    if query:
+        # Best matches first, from the full-text index; no further pages.
+        transactions, next_cursor = search.search_transactions(project, query), None
+    else:
+        # First page only; further pages come from transaction_list_api
+        rows = Transaction.objects.filter(project=project)
+        transactions, next_cursor = transaction_page(rows)
     form = TransactionForm()
     return render(request, 'transactions/home.html', {
         'transactions': transactions,
+        'next_cursor': next_cursor,
+        'query': query,
+        'search_limit': search.SEARCH_LIMIT,
+        'stats': project_totals(project.id),
+        'anomalies': anomalies.open_anomalies(project),
         'form': form,
         'project': project,
     })
 
 
 @login_required
-def add_transaction(request, project_id):
-    """Add a new transaction to a project."""
-    project = get_object_or_404(Project, id=project_id)
+@project_access_required(denied='json')
+def transaction_list_api(request, access):
+    """API returning one keyset-paginated page of a project's transactions."""
+    project = access.project
+    
+    try:
+        limit = page_size(request.GET.get('limit'))
+        transactions, next_cursor = transaction_page(
+            Transaction.objects.filter(project=project),
+            cursor=request.GET.get('cursor'),
+            limit=limit,
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
-    # Check access and permissions
-    is_owner = project.owner == request.user
-    membership = ProjectMember.objects.filter(project=project, user=request.user).first()
+    return JsonResponse({
+        'transactions': [
+            {
+                'id': t.id,
+                'item_name': t.item_name,
+                'category': t.category,
+                'category_display': t.get_category_display(),
+                'customer_name': t.customer_name,
+                'amount': str(t.amount),
+                'date': t.date.isoformat(),
+                'date_display': date_format(timezone.localtime(t.date), 'M d, Y'),
+                'delete_url': reverse('delete_transaction', args=[project.id, t.id]),
+            }
+            for t in transactions
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+@project_access_required()
+def add_transaction(request, access):
+    """Add a new transaction to a project."""
+    project = access.project
     
-    if not is_owner and (not membership or membership.role == 'viewer'):
+    # Check permissions
+    if not access.can_edit:
         messages.error(request, "You do not have permission to add transactions.")
         return redirect('home', project_id=project.id)
 
@@ -48,32 +131,159 @@ def add_transaction(request, project_id):
         if form.is_valid():
             transaction = form.save(commit=False)
             transaction.project = project
-            transaction.save()
+            services.record_transactions([transaction])
             messages.success(request, 'Transaction added successfully!')
+            for anomaly in transaction.detected_anomalies:
+                messages.warning(request, anomaly.description)
             return redirect('home', project_id=project.id)
     return redirect('home', project_id=project.id)
 
 
 @login_required
-def delete_transaction(request, project_id, pk):
-    """Delete a transaction."""
-    project = get_object_or_404(Project, id=project_id)
+@project_access_required()
+def import_transactions(request, access):
+    """Bulk import transactions into a project from an uploaded file."""
+    project = access.project
     
-    # Check access and permissions
-    is_owner = project.owner == request.user
-    membership = ProjectMember.objects.filter(project=project, user=request.user).first()
+    # Check permissions
+    if not access.can_edit:
+        messages.error(request, "You do not have permission to import transactions.")
+        return redirect('home', project_id=project.id)
+
+    upload = request.FILES.get('file')
+    if request.method == 'POST' and upload:
+        fmt = request.POST.get('format') or importers.detect_format(upload.name)
+        if upload.size > settings.JOBS_INLINE_IMPORT_BYTES:
+            if fmt not in importers.FORMATS:
+                messages.error(
+                    request, f'Import failed: Unsupported import format "{fmt}".'
+                )
+                return redirect('home', project_id=project.id)
+            upload_name = jobs.save_upload(upload)
+            jobs.enqueue('import', project, request.user, file=upload_name, format=fmt)
+            messages.info(
+                request,
+                'Large file queued for import; '
+                'follow its progress on the Configuration tab.',
+            )
+            return redirect('home', project_id=project.id)
+        try:
+            # Uploads over FILE_UPLOAD_MAX_MEMORY_SIZE are already spooled to
+            # disk, so the file is read in a single streaming pass.
+            rows = importers.iter_rows(upload.file, fmt)
+            result = importers.import_transactions(project, rows)
+        except importers.ImportFormatError as e:
+            messages.error(request, f'Import failed: {e}')
+            return redirect('home', project_id=project.id)
+        if result.imported:
+            messages.success(request, f'Imported {result.imported} transactions.')
+        if result.flagged:
+            messages.warning(
+                request,
+                f'{result.flagged} imported transactions look unusual; see Alerts.',
+            )
+        if result.failed:
+            details = '; '.join(
+                f'line {line}: {error}' for line, error in result.errors[:5]
+            )
+            messages.warning(request, f'{result.failed} rows were skipped ({details}).')
+    elif request.method == 'POST':
+        messages.error(request, 'Choose a file to import.')
+    return redirect('home', project_id=project.id)
+
+
+@login_required
+@project_access_required()
+def dismiss_anomaly(request, access, pk):
+    """Mark a flagged transaction as reviewed."""
+    project = access.project
+    if not access.can_edit:
+        messages.error(request, "You do not have permission to dismiss alerts.")
+    elif request.method == 'POST':
+        TransactionAnomaly.objects.filter(pk=pk, project=project).update(dismissed=True)
+    return redirect('home', project_id=project.id)
+
+
+@csrf_exempt
+def ingest_transactions(request, project_id):
+    """API for POS terminals: store a batch of transactions posted as JSON.
+
+    Authenticated by the project's ingest token rather than a session, so
+    there is no login, CSRF token or redirect per sale.
+    """
+    if request.method != 'POST':
+        response = JsonResponse({'error': 'Use POST.'}, status=405)
+        response['Allow'] = 'POST'
+        return response
+    token = ingest.authenticate(request.headers.get('Authorization', ''))
+    if token is None or token.project_id != project_id:
+        response = JsonResponse({'error': 'Invalid or missing API token.'}, status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    try:
+        result = ingest.ingest(token.project, ingest.parse_batch(request.body))
+    except RequestDataTooBig:
+        return JsonResponse(
+            {'error': 'Request body is too large; send smaller batches.'}, status=413
+        )
+    except ingest.IngestError as e:
+        return JsonResponse({'error': str(e), 'errors': e.errors}, status=400)
+    return JsonResponse(result.payload(), status=201 if result.created else 200)
+
+
+@login_required
+@project_access_required()
+def delete_transaction(request, access, pk):
+    """Delete a transaction."""
+    project = access.project
     
-    if not is_owner and (not membership or membership.role == 'viewer'):
+    # Check permissions
+    if not access.can_edit:
         messages.error(request, "You do not have permission to delete transactions.")
         return redirect('home', project_id=project.id)
 
     transaction = get_object_or_404(Transaction, pk=pk, project=project)
     if request.method == 'POST':
-        transaction.delete()
+        services.delete_transactions([transaction])
         messages.success(request, 'Transaction deleted successfully!')
     return redirect('home', project_id=project.id)
 
 
+@login_required
+@project_access_required()
+@replica_reads
+def export_transactions(request, access):
+    """Stream a project's transactions as CSV or NDJSON."""
+    project = access.project
+    
+    fmt = request.GET.get('format', 'csv')
+    requested = request.GET.get('category', '').split(',')
+    categories = [c for c in requested if c and c != 'all']
+    try:
+        if fmt not in exports.FORMATS:
+            raise exports.ExportError(f'Unsupported export format "{fmt}".')
+        start = exports.parse_bound(request.GET.get('start'))
+        end = exports.parse_bound(request.GET.get('end'), end=True)
+    except exports.ExportError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    # Bind the alias now: the rows are read while streaming, after the view returns.
+    rows = Transaction.objects.using(read_alias()).filter(project=project)
+    transactions = exports.filter_transactions(rows, start, end, categories)
+    accepted = assets.accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    compress = 'gzip' in accepted
+    blocks = exports.export_stream(transactions, fmt, compress=compress)
+    if isinstance(request, ASGIRequest):
+        blocks = exports.async_blocks(blocks)
+    response = StreamingHttpResponse(blocks, content_type=exports.FORMATS[fmt])
+    filename = f'project-{project.id}-transactions.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Vary'] = 'Accept-Encoding'
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    return response
+
+
 def login_view(request):
     """User login."""
     if request.user.is_authenticated:
@@ -160,12 +370,27 @@ def account_view(request):
 @login_required
 def projects_view(request):
     """List all projects for the user."""
-    projects = Project.objects.filter(
-        Q(owner=request.user) | Q(members__user=request.user)
-    ).distinct()
+    projects = annotate_activity(accessible_projects(request.user))
+    projects = projects.order_by('-created_at')
     return render(request, 'transactions/projects.html', {'projects': projects})
 
 
+@login_required
+async def projects_api(request):
+    """API listing the user's projects with their activity totals."""
+    user = await request.auser()
+    projects = annotate_activity(accessible_projects(user)).order_by('-created_at')
+    projects = projects.values(
+        'id', 'name', 'description', 'owner_id', 'created_at',
+        count=F('transaction_count'), total=F('total_amount'),
+        last_day=F('last_activity'),
+    )
+    return JsonResponse({'projects': [
+        {**project, 'is_owner': project['owner_id'] == user.pk}
+        async for project in projects
+    ]})
+
+
 @login_required
 def create_project(request):
     """Create a new project."""
@@ -200,96 +425,207 @@ def delete_project(request, project_id):
 
 
 @login_required
-def project_reporting(request, project_id):
+@project_access_required()
+def project_reporting(request, access):
     """Project reporting page."""
-    project = get_object_or_404(Project, id=project_id)
-    if project.owner != request.user and not ProjectMember.objects.filter(project=project, user=request.user).exists():
-        raise Http404("Project not found")
+    project = access.project
     return render(request, 'transactions/project_reporting.html', {'project': project})
 
 
+def _reporting_etag(request, access):
+    try:
+        params = reporting_params(request.GET)
+    except ReportingError:
+        return None
+    return report_fingerprint(access.project, params)
+
+
+def _reporting_last_modified(request, access):
+    try:
+        params = reporting_params(request.GET)
+    except ReportingError:
+        return None
+    return report_last_modified(access.project, params)
+
+
 @login_required
-def project_reporting_api(request, project_id):
+@project_access_required(denied='json')
+@condition(etag_func=_reporting_etag, last_modified_func=_reporting_last_modified)
+@replica_reads
+async def project_reporting_api(request, access):
     """API for project reporting data."""
-    project = get_object_or_404(Project, id=project_id)
-    
-    # Check access
-    if project.owner != request.user and not ProjectMember.objects.filter(project=project, user=request.user).exists():
-        return JsonResponse({'error': 'Permission denied'}, status=403)
+    project = access.project
         
     # Filters
-    days = int(request.GET.get('days', 30))
-    category = request.GET.get('category', 'all')
+    try:
+        params = reporting_params(request.GET)
+    except ReportingError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
-    end_date = timezone.now()
-    start_date = end_date - timedelta(days=days)
-    
-    transactions = Transaction.objects.filter(
-        project=project,
-        date__gte=start_date,
-        date__lte=end_date
+    # Cached per project data version; unchanged data answers 304 above
+    return JsonResponse(await acached_project_report(project, params))
+
+
+@login_required
+@project_access_required(denied='json')
+@replica_reads
+def project_audience_api(request, access):
+    """API for top items, top customers and distinct customers over recent days.
+
+    Answered from mergeable daily sketches with error bounds, or exactly
+    with ``?exact=1`` (or the ``SKETCHES_EXACT`` setting).
+    """
+    try:
+        params = reporting_params(request.GET)
+    except ReportingError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    first_day, last_day = reporting_window(params['days'], rollup_timezone())
+    exact = request.GET.get('exact') in ('1', 'true') or None
+    payload = sketches.audience(
+        access.project.id, first_day, last_day, top=params['top'], exact=exact
     )
-    
-    if category != 'all':
-        transactions = transactions.filter(category=category)
-        
-    # Process data
-    data = {}
-    for t in transactions:
-        date_str = t.date.strftime('%Y-%m-%d')
-        if date_str not in data:
-            data[date_str] = 0
-        data[date_str] += float(t.amount)
-        
-    # Sort by date
-    sorted_dates = sorted(data.keys())
-    values = [data[d] for d in sorted_dates]
-    
-    return JsonResponse({
-        'labels': sorted_dates,
-        'values': values,
-        'total': sum(values)
+    return JsonResponse({'first_day': first_day, 'last_day': last_day, **payload})
+
+
+@login_required
+@project_access_required(denied='json')
+@replica_reads
+def project_forecast_api(request, access):
+    """API for the stored daily amount and emissions forecast."""
+    try:
+        horizon = forecasts.horizon_param(request.GET.get('days'))
+    except forecasts.ForecastError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    try:
+        payload = forecasts.project_forecast(access.project, horizon)
+    except forecasts.ForecastError as e:
+        # Not enough history yet to forecast from
+        return JsonResponse({'error': str(e)}, status=404)
+    if payload is None:
+        return JsonResponse(
+            {'error': 'No forecast has been trained for this project yet.'}, status=404
+        )
+    return JsonResponse(payload)
+
+
+@login_required
+@project_access_required()
+def project_configuration(request, access):
+    """Project configuration page, with the project's background jobs."""
+    project = access.project
+    return render(request, 'transactions/project_configuration.html', {
+        'project': project,
+        'jobs': jobs.recent_jobs(project),
+        'can_edit': access.can_edit,
     })
 
 
 @login_required
-def project_configuration(request, project_id):
-    """Project configuration page."""
-    project = get_object_or_404(Project, id=project_id)
-    if project.owner != request.user and not ProjectMember.objects.filter(project=project, user=request.user).exists():
-        raise Http404("Project not found")
-    return render(request, 'transactions/project_configuration.html', {'project': project})
+@project_access_required()
+def start_job(request, access):
+    """Queue a background export, emission recompute or rollup rebuild."""
+    project = access.project
+    if not access.can_edit:
+        messages.error(request, "You do not have permission to start jobs.")
+        return redirect('project_configuration', project_id=project.id)
+
+    if request.method == 'POST':
+        kind = request.POST.get('kind')
+        params = {}
+        if kind == 'export':
+            params = {
+                'format': request.POST.get('format', 'csv'),
+                'start': request.POST.get('start') or None,
+                'end': request.POST.get('end') or None,
+            }
+            try:
+                if params['format'] not in exports.FORMATS:
+                    raise exports.ExportError(
+                        f'Unsupported export format "{params["format"]}".'
+                    )
+                exports.parse_bound(params['start'])
+                exports.parse_bound(params['end'], end=True)
+            except exports.ExportError as e:
+                messages.error(request, str(e))
+                return redirect('project_configuration', project_id=project.id)
+        elif kind not in ('recompute_emissions', 'rebuild_rollups'):
+            messages.error(request, 'Unknown job.')
+            return redirect('project_configuration', project_id=project.id)
+        job = jobs.enqueue(kind, project, request.user, **params)
+        messages.success(request, f'{job.get_kind_display()} queued.')
+    return redirect('project_configuration', project_id=project.id)
 
 
 @login_required
-def project_summary(request, project_id):
-    """Project summary/notes page."""
-    project = get_object_or_404(Project, id=project_id)
-    if project.owner != request.user and not ProjectMember.objects.filter(project=project, user=request.user).exists():
-        raise Http404("Project not found")
-    return render(request, 'transactions/project_summary.html', {'project': project})
+@project_access_required(denied='json')
+def project_jobs_api(request, access):
+    """API listing the project's most recent background jobs."""
+    return JsonResponse(
+        {'jobs': [jobs.job_payload(job) for job in jobs.recent_jobs(access.project)]}
+    )
 
 
 @login_required
-def project_team(request, project_id):
+@project_access_required(denied='json')
+def job_status_api(request, access, pk):
+    """API returning the status and progress of one background job."""
+    job = Job.objects.filter(pk=pk, project=access.project).first()
+    if job is None:
+        return JsonResponse({'error': 'Job not found.'}, status=404)
+    return JsonResponse(jobs.job_payload(job))
+
+
+@login_required
+@project_access_required()
+def job_download(request, access, pk):
+    """Download the file written by a finished export job."""
+    job = get_object_or_404(
+        Job, pk=pk, project=access.project, kind='export', status=Job.SUCCEEDED
+    )
+    path = jobs.job_file(job.result['file'])
+    if not path.exists():
+        raise Http404('The export file has been removed.')
+    return FileResponse(
+        open(path, 'rb'), as_attachment=True, filename=job.result['filename']
+    )
+
+
+@login_required
+@project_access_required()
+def project_summary(request, access):
+    """Project summary/notes page.
+
+    Not on the replica: a stale summary is recomputed and stored on the primary.
+    """
+    project = access.project
+
+    # A stored summary, recomputed from rollups only when the data changed
+    return render(request, 'transactions/project_summary.html', {
+        'project': project,
+        'summary': summaries.project_summary(project),
+    })
+
+
+@login_required
+@project_access_required(denied='json')
+@replica_reads
+async def project_summary_api(request, access):
+    """API for the project summary stats and category mix."""
+    summary = summary_payload(await arun_queries(summary_queries(access.project.id)))
+    return JsonResponse(summary)
+
+
+@login_required
+@project_access_required(denied='redirect')
+def project_team(request, access):
     """Project team members page."""
-    project = get_object_or_404(Project, id=project_id)
-    
-    # Check access
-    is_owner = project.owner == request.user
-    user_membership = ProjectMember.objects.filter(project=project, user=request.user).first()
-    
-    if not is_owner and not user_membership:
-        messages.error(request, "You do not have access to this project.")
-        return redirect('projects')
+    project = access.project
 
     if request.method == 'POST':
         action = request.POST.get('action')
         
         # Only admin/owner can manage members
-        can_manage = is_owner or (user_membership and user_membership.role == 'admin')
-        
-        if can_manage:
+        if access.can_manage:
             if action == 'add_member':
                 username = request.POST.get('username')
                 email = request.POST.get('email', '')
@@ -309,7 +645,7 @@ def project_team(request, project_id):
                     messages.info(request, f'New user {username} created with default password "ChangeMe123!" - they should change it on first login.')
                 
                 # Now add the user to the project
-                if user_to_add == project.owner:
+                if user_to_add.pk == project.owner_id:
                     messages.warning(request, f'{username} is the project owner.')
                 elif ProjectMember.objects.filter(project=project, user=user_to_add).exists():
                     messages.warning(request, f'{username} is already a member.')
@@ -325,7 +661,13 @@ def project_team(request, project_id):
             elif action == 'update_role':
                 member_id = request.POST.get('member_id')
                 new_role = request.POST.get('role')
-                ProjectMember.objects.filter(id=member_id, project=project).update(role=new_role)
+                member = ProjectMember.objects.filter(
+                    id=member_id, project=project
+                ).first()
+                if member:
+                    # save() rather than update() so cached memberships are invalidated
+                    member.role = new_role
+                    member.save(update_fields=['role'])
                 messages.success(request, 'Role updated successfully.')
         else:
             messages.error(request, "You don't have permission to manage members.")
@@ -336,6 +678,6 @@ def project_team(request, project_id):
     return render(request, 'transactions/project_team.html', {
         'project': project, 
         'members': members,
-        'is_owner': is_owner,
-        'current_user_role': 'admin' if is_owner else (user_membership.role if user_membership else None)
+        'is_owner': access.is_owner,
+        'current_user_role': 'admin' if access.is_owner else access.role
     })
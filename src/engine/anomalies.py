@@ -0,0 +1,155 @@
+"""
+Online detection of unusual transactions.
+
+Each series (in the app, one project and category) keeps a constant-size
+``SeriesState``:
+
+* an exponentially weighted mean and variance of ``log(amount)``, so a
+  mistyped amount (450.00 for 4.50) stands out as a large z-score whatever
+  the price level of the category, and
+* the same statistics over completed days' transaction counts, plus the
+  running count of the current day, to catch a sudden spike in volume.
+
+Every observation is scored against the state *before* it is folded in,
+and costs O(1) time. Flagged amounts are clipped to the threshold before
+updating, so one bad row does not inflate the variance that should catch
+the next one. States are plain dataclasses and round-trip through dicts.
+"""
+
+import math
+from dataclasses import asdict, dataclass
+
+DEFAULT_ALPHA = 0.02
+DEFAULT_DAY_ALPHA = 0.1
+DEFAULT_THRESHOLD = 4.0
+DEFAULT_WARMUP = 30
+DEFAULT_SPIKE_WARMUP_DAYS = 7
+DEFAULT_MIN_SPIKE_COUNT = 10
+# Quiet days folded in one at a time before the state is treated as converged.
+_MAX_GAP_DAYS = 366
+# Keeps z-scores finite for series whose amounts never vary.
+_MIN_LOG_STD = 0.05
+_MIN_COUNT_STD = 1.0
+
+AMOUNT = "amount"
+SPIKE = "spike"
+
+
+@dataclass
+class SeriesState:
+    """Running statistics of one series."""
+
+    count: int = 0
+    mean: float = 0.0
+    var: float = 0.0
+    day: int | None = None
+    day_count: int = 0
+    days: int = 0
+    day_mean: float = 0.0
+    day_var: float = 0.0
+    spike_day: int | None = None
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+@dataclass(frozen=True)
+class Anomaly:
+    """One flagged observation: its kind, z-score and the expected value."""
+
+    kind: str
+    score: float
+    expected: float
+
+
+def _ewma(mean, var, value, alpha):
+    # West's incremental update of an exponentially weighted mean and variance.
+    diff = value - mean
+    increment = alpha * diff
+    return mean + increment, (1 - alpha) * (var + diff * increment)
+
+
+class AnomalyDetector:
+    """Scores observations against a ``SeriesState`` and folds them in."""
+
+    def __init__(
+        self,
+        alpha=DEFAULT_ALPHA,
+        day_alpha=DEFAULT_DAY_ALPHA,
+        threshold=DEFAULT_THRESHOLD,
+        warmup=DEFAULT_WARMUP,
+        spike_warmup_days=DEFAULT_SPIKE_WARMUP_DAYS,
+        min_spike_count=DEFAULT_MIN_SPIKE_COUNT,
+    ):
+        self.alpha = alpha
+        self.day_alpha = day_alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.spike_warmup_days = spike_warmup_days
+        self.min_spike_count = min_spike_count
+
+    def observe(self, state, day, amount):
+        """Fold one transaction (epoch ``day``, positive ``amount``) into ``state``.
+
+        Returns the anomalies it raised, usually none.
+        """
+        anomalies = []
+        amount_anomaly = self._observe_amount(state, amount)
+        if amount_anomaly:
+            anomalies.append(amount_anomaly)
+        spike = self._observe_day(state, day)
+        if spike:
+            anomalies.append(spike)
+        return anomalies
+
+    def _observe_amount(self, state, amount):
+        value = math.log(max(amount, 0.01))
+        anomaly = None
+        if state.count >= self.warmup:
+            std = max(math.sqrt(state.var), _MIN_LOG_STD)
+            score = (value - state.mean) / std
+            if abs(score) > self.threshold:
+                anomaly = Anomaly(AMOUNT, score, math.exp(state.mean))
+                value = state.mean + math.copysign(self.threshold * std, score)
+        state.count += 1
+        # Plain running statistics until warmed up, then a fixed decay.
+        alpha = max(self.alpha, 1.0 / state.count)
+        state.mean, state.var = _ewma(state.mean, state.var, value, alpha)
+        return anomaly
+
+    def _observe_day(self, state, day):
+        if state.day is None:
+            state.day, state.day_count = day, 1
+            return None
+        if day < state.day:
+            # Backdated rows still count towards amounts, not towards today's volume.
+            return None
+        if day > state.day:
+            self._close_days(state, day)
+        state.day_count += 1
+
+        if state.days < self.spike_warmup_days or state.spike_day == day:
+            return None
+        if state.day_count < self.min_spike_count:
+            return None
+        std = max(math.sqrt(state.day_var), _MIN_COUNT_STD)
+        score = (state.day_count - state.day_mean) / std
+        if score <= self.threshold:
+            return None
+        state.spike_day = day
+        return Anomaly(SPIKE, score, state.day_mean)
+
+    def _close_days(self, state, day):
+        # Fold the finished day, then one zero per quiet day in between.
+        counts = [state.day_count] + [0] * min(day - state.day - 1, _MAX_GAP_DAYS)
+        for count in counts:
+            state.days += 1
+            alpha = max(self.day_alpha, 1.0 / state.days)
+            state.day_mean, state.day_var = _ewma(
+                state.day_mean, state.day_var, count, alpha
+            )
+        state.day, state.day_count = day, 0
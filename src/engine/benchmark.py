@@ -0,0 +1,67 @@
+"""
+Throughput benchmark for the vectorised emission engine.
+
+Usage: ``python -m engine.benchmark --rows 10000000`` (from ``src``).
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from engine.emissions import load_factor_table, to_days
+
+
+def synthetic_batch(table, rows, seed=0):
+    """Generate encoded transactions spread over 2020-2026."""
+    rng = np.random.default_rng(seed)
+    first, last = to_days(["2020-01-01", "2026-12-31"])
+    category_codes = rng.integers(0, len(table.categories), rows)
+    # Roughly half the rows are items with their own factor.
+    item_codes = rng.integers(-len(table.items), len(table.items), rows)
+    item_codes[item_codes < 0] = -1
+    days = rng.integers(first, last + 1, rows)
+    amounts = rng.gamma(2.0, 6.0, rows).round(2)
+    return amounts, category_codes, days, item_codes
+
+
+def per_row_reference(table, amounts, category_codes, days, item_codes):
+    """Price rows one at a time, as a plain Python loop would."""
+    results = []
+    for amount, category, day, item in zip(amounts, category_codes, days, item_codes):
+        factor = table.factors([category], [day], [item])[0]
+        results.append(amount * factor)
+    return np.array(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reference-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    table = load_factor_table()
+    batch = synthetic_batch(table, args.rows)
+    print(f"Pricing {args.rows:,} synthetic transactions")
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        emissions = table.emissions(*batch)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    rate = args.rows / best
+    print(f"  vectorised: {best:.3f}s best of {args.repeat} ({rate:,.0f} rows/s)")
+    print(f"  total: {np.nansum(emissions):,.0f} kg CO2e")
+
+    sample = min(args.reference_rows, args.rows)
+    start = time.perf_counter()
+    expected = per_row_reference(table, *(column[:sample] for column in batch))
+    elapsed = time.perf_counter() - start
+    assert np.allclose(expected, emissions[:sample], equal_nan=True)
+    print(f"  per-row reference: {sample / elapsed:,.0f} rows/s on {sample:,} rows")
+
+
+if __name__ == "__main__":
+    main()
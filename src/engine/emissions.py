@@ -0,0 +1,199 @@
+"""
+Vectorised spend-based carbon emission calculation.
+
+Emission factors (kg CO2e per unit of currency spent) are loaded per
+category and per item name, each valid over a date range. A batch of
+transactions is priced with a handful of NumPy operations: names are
+encoded to integer codes once per distinct value, and factors are found
+with a single ``searchsorted`` over ``(code, valid_from)`` keys.
+"""
+
+import csv
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_FACTORS_PATH = Path(__file__).parent / "data" / "emission_factors.csv"
+
+# Days are shifted into the low 32 bits of a composite (code, day) key.
+_DAY_OFFSET = 2**31
+_CODE_SHIFT = 2**32
+_OPEN_END = np.iinfo(np.int64).max
+
+
+class FactorTableError(ValueError):
+    """Raised when an emission factor table is inconsistent."""
+
+
+@dataclass(frozen=True)
+class EmissionFactor:
+    """One factor, valid from ``valid_from`` up to (excluding) ``valid_to``.
+
+    Category factors leave ``item_name`` empty; item factors leave
+    ``category`` empty and override the category factor for that item.
+    """
+
+    category: str
+    item_name: str
+    valid_from: date
+    valid_to: date | None
+    kg_co2e_per_unit: float
+
+
+def to_days(dates):
+    """Convert dates (``date`` objects, ISO strings or datetime64) to epoch days."""
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def normalise_item(name):
+    """Return the key item factors are matched on."""
+    return " ".join(name.split()).casefold()
+
+
+class _RangeIndex:
+    """Sorted ``(code, valid_from)`` keys with their end days and values."""
+
+    def __init__(self, codes, starts, ends, values):
+        codes = np.asarray(codes, dtype=np.int64)
+        starts = np.asarray(starts, dtype=np.int64)
+        order = np.lexsort((starts, codes))
+        self.codes = codes[order]
+        self.starts = starts[order]
+        self.ends = np.asarray(ends, dtype=np.int64)[order]
+        self.values = np.asarray(values, dtype=np.float64)[order]
+        self.keys = self.codes * _CODE_SHIFT + (self.starts + _DAY_OFFSET)
+
+        same_code = self.codes[1:] == self.codes[:-1]
+        if np.any(same_code & (self.ends[:-1] > self.starts[1:])):
+            raise FactorTableError("Emission factor date ranges overlap.")
+        if np.any(self.ends <= self.starts):
+            raise FactorTableError("Emission factor ranges must end after they start.")
+
+    def lookup(self, codes, days):
+        """Return the value valid for each ``(code, day)``, or NaN."""
+        codes = np.asarray(codes, dtype=np.int64)
+        days = np.asarray(days, dtype=np.int64)
+        if not len(self.keys):
+            return np.full(codes.shape, np.nan)
+        lookup = codes * _CODE_SHIFT + (days + _DAY_OFFSET)
+        position = np.searchsorted(self.keys, lookup, side="right") - 1
+        clipped = np.maximum(position, 0)
+        found = (
+            (position >= 0)
+            & (codes >= 0)
+            & (self.codes[clipped] == codes)
+            & (days < self.ends[clipped])
+        )
+        return np.where(found, self.values[clipped], np.nan)
+
+
+def _encode(values, vocabulary, normalise=None):
+    """Map names to vocabulary codes (-1 when unknown), once per distinct name."""
+    values = np.asarray(values)
+    if values.size == 0:
+        return np.empty(values.shape, dtype=np.int64)
+    distinct, inverse = np.unique(values, return_inverse=True)
+    codes = np.array(
+        [
+            vocabulary.get(normalise(str(v)) if normalise else str(v), -1)
+            for v in distinct
+        ],
+        dtype=np.int64,
+    )
+    return codes[inverse].reshape(values.shape)
+
+
+class FactorTable:
+    """Emission factors by category and by item, indexed for batch lookup."""
+
+    def __init__(self, factors):
+        factors = list(factors)
+        category_rows = [f for f in factors if not f.item_name]
+        item_rows = [f for f in factors if f.item_name]
+        if any(not f.category for f in category_rows):
+            raise FactorTableError("Every factor needs a category or an item name.")
+
+        self.categories = sorted({f.category for f in category_rows})
+        self.items = sorted({normalise_item(f.item_name) for f in item_rows})
+        self.category_vocabulary = {
+            name: code for code, name in enumerate(self.categories)
+        }
+        self.item_vocabulary = {name: code for code, name in enumerate(self.items)}
+        self._by_category = self._index(
+            category_rows, lambda f: self.category_vocabulary[f.category]
+        )
+        self._by_item = self._index(
+            item_rows, lambda f: self.item_vocabulary[normalise_item(f.item_name)]
+        )
+
+    @staticmethod
+    def _index(rows, code_of):
+        return _RangeIndex(
+            [code_of(f) for f in rows],
+            to_days([f.valid_from for f in rows]),
+            [_OPEN_END if f.valid_to is None else to_days(f.valid_to) for f in rows],
+            [f.kg_co2e_per_unit for f in rows],
+        )
+
+    def category_codes(self, categories):
+        """Encode category names to codes (-1 for unknown categories)."""
+        return _encode(categories, self.category_vocabulary)
+
+    def item_codes(self, item_names):
+        """Encode item names to codes (-1 when the item has no own factor)."""
+        return _encode(item_names, self.item_vocabulary, normalise_item)
+
+    def factors(self, category_codes, days, item_codes=None):
+        """Return the factor for each row, preferring item over category factors.
+
+        Rows without any valid factor get NaN.
+        """
+        factors = self._by_category.lookup(category_codes, days)
+        if item_codes is not None:
+            item_factors = self._by_item.lookup(item_codes, days)
+            factors = np.where(np.isnan(item_factors), factors, item_factors)
+        return factors
+
+    def emissions(self, amounts, category_codes, days, item_codes=None):
+        """Return kg CO2e for already encoded rows."""
+        factors = self.factors(category_codes, days, item_codes)
+        return np.asarray(amounts, dtype=np.float64) * factors
+
+
+def load_factors(path=DEFAULT_FACTORS_PATH):
+    """Read factors from a CSV file.
+
+    Columns are ``category, item_name, valid_from, valid_to,
+    kg_co2e_per_unit``; an empty ``valid_to`` never ends.
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            EmissionFactor(
+                category=row["category"].strip(),
+                item_name=row["item_name"].strip(),
+                valid_from=date.fromisoformat(row["valid_from"]),
+                valid_to=(
+                    date.fromisoformat(row["valid_to"]) if row["valid_to"] else None
+                ),
+                kg_co2e_per_unit=float(row["kg_co2e_per_unit"]),
+            )
+            for row in csv.DictReader(handle)
+        ]
+
+
+def load_factor_table(path=DEFAULT_FACTORS_PATH):
+    """Build a :class:`FactorTable` from a factor CSV file."""
+    return FactorTable(load_factors(path))
+
+
+def compute_emissions(table, categories, dates, amounts, item_names=None):
+    """Batch API: kg CO2e for parallel sequences of transaction fields.
+
+    ``dates`` are local calendar dates. Rows with no valid factor get NaN.
+    """
+    item_codes = None if item_names is None else table.item_codes(item_names)
+    return table.emissions(
+        amounts, table.category_codes(categories), to_days(dates), item_codes
+    )
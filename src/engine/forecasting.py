@@ -0,0 +1,207 @@
+"""
+Short-horizon forecasts of daily totals from daily aggregates.
+
+The model is a linear trend plus day-of-week effects, fitted by weighted
+least squares where older days are discounted with a half-life. It keeps
+only the sufficient statistics (``X'X``, ``X'y`` and ``y'y``), so new days
+are folded in incrementally without revisiting earlier history, and the
+whole state is a few small arrays that serialise to JSON.
+
+Several targets (e.g. amount and emissions) share one design matrix and are
+fitted together as the columns of ``y``.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from engine.emissions import to_days
+
+MIN_HORIZON = 7
+MAX_HORIZON = 90
+MIN_HISTORY_DAYS = 14
+DEFAULT_HALFLIFE_DAYS = 120.0
+# Ridge penalties, relative to the effective number of observations.
+# The trend is damped harder so a short-lived swing is not extrapolated.
+_RIDGE = 1e-3
+_TREND_RIDGE = 5e-2
+# Two-sided 80% interval of a normal distribution.
+_INTERVAL_Z = 1.2816
+# Epoch day 0 (1970-01-01) was a Thursday.
+_EPOCH_WEEKDAY = 3
+_FEATURES = 8
+
+
+class ForecastError(ValueError):
+    """Raised when a forecast cannot be trained or produced."""
+
+
+def design_matrix(days, origin):
+    """Features of each epoch day: intercept, trend in years, Monday..Saturday."""
+    days = np.asarray(days, dtype=np.int64)
+    matrix = np.zeros((len(days), _FEATURES))
+    matrix[:, 0] = 1.0
+    matrix[:, 1] = (days - origin) / 365.0
+    weekdays = (days + _EPOCH_WEEKDAY) % 7
+    rows = np.flatnonzero(weekdays < 6)
+    matrix[rows, 2 + weekdays[rows]] = 1.0
+    return matrix
+
+
+@dataclass
+class Forecast:
+    """Predicted daily values with an 80% interval, one column per target."""
+
+    days: np.ndarray
+    mean: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+
+    def column(self, index):
+        """Return ``(mean, lower, upper)`` of one target."""
+        return self.mean[:, index], self.lower[:, index], self.upper[:, index]
+
+
+@dataclass
+class ForecastModel:
+    """Discounted least-squares state over consecutive days."""
+
+    origin: int
+    last_day: int
+    days_seen: int
+    halflife_days: float
+    weight: float
+    xtx: np.ndarray
+    xty: np.ndarray
+    yty: np.ndarray
+
+    @classmethod
+    def empty(cls, origin, targets, halflife_days=DEFAULT_HALFLIFE_DAYS):
+        """A model with no days yet; ``origin`` (an epoch day) anchors the trend."""
+        return cls(
+            origin=int(origin),
+            last_day=origin - 1,
+            days_seen=0,
+            halflife_days=float(halflife_days),
+            weight=0.0,
+            xtx=np.zeros((_FEATURES, _FEATURES)),
+            xty=np.zeros((_FEATURES, targets)),
+            yty=np.zeros(targets),
+        )
+
+    @property
+    def targets(self):
+        return self.xty.shape[1]
+
+    def update(self, days, values, through=None):
+        """Fold in complete days after ``last_day``; return how many were added.
+
+        ``values`` has one row per day and one column per target. Days
+        missing up to the newest day (or ``through``, an epoch day, when
+        later) are treated as zero: a day without transactions has zero
+        amount and emissions.
+        """
+        days = to_days(days)
+        values = np.asarray(values, dtype=np.float64).reshape(len(days), self.targets)
+        if len(days) and days.min() <= self.last_day:
+            raise ForecastError("Days must come after the model's last trained day.")
+        last = max(days.max(initial=self.last_day), through or self.last_day)
+        last = int(last)
+        if last <= self.last_day:
+            return 0
+
+        first = self.last_day + 1
+        span = np.arange(first, last + 1)
+        filled = np.zeros((len(span), self.targets))
+        np.add.at(filled, days - first, values)
+
+        decay = 0.5 ** (1.0 / self.halflife_days)
+        weights = decay ** (last - span).astype(np.float64)
+        matrix = design_matrix(span, self.origin)
+        weighted = matrix * weights[:, None]
+        carry = decay ** len(span)
+
+        self.xtx = carry * self.xtx + weighted.T @ matrix
+        self.xty = carry * self.xty + weighted.T @ filled
+        self.yty = carry * self.yty + weights @ (filled * filled)
+        self.weight = carry * self.weight + weights.sum()
+        self.days_seen += len(span)
+        self.last_day = last
+        return len(span)
+
+    def coefficients(self):
+        """Solve the penalised normal equations; one coefficient column per target."""
+        if self.days_seen < MIN_HISTORY_DAYS:
+            raise ForecastError(
+                f"At least {MIN_HISTORY_DAYS} days of history are needed to forecast."
+            )
+        penalty = np.full(_FEATURES, _RIDGE)
+        penalty[0] = 0.0
+        penalty[1] = _TREND_RIDGE
+        return np.linalg.solve(self.xtx + np.diag(penalty * self.weight), self.xty)
+
+    def residual_std(self, beta=None):
+        """Standard deviation of the weighted residuals, per target."""
+        beta = self.coefficients() if beta is None else beta
+        explained = np.einsum("ft,ft->t", beta, self.xty)
+        fitted = np.einsum("ft,fg,gt->t", beta, self.xtx, beta)
+        sse = self.yty - 2 * explained + fitted
+        dof = max(self.weight - _FEATURES, 1.0)
+        return np.sqrt(np.maximum(sse, 0.0) / dof)
+
+    def forecast(self, horizon):
+        """Predict the ``horizon`` days after ``last_day``, floored at zero."""
+        if not MIN_HORIZON <= horizon <= MAX_HORIZON:
+            raise ForecastError(
+                f"Horizon must be between {MIN_HORIZON} and {MAX_HORIZON} days."
+            )
+        beta = self.coefficients()
+        spread = _INTERVAL_Z * self.residual_std(beta)
+        days = np.arange(self.last_day + 1, self.last_day + 1 + horizon)
+        mean = design_matrix(days, self.origin) @ beta
+        return Forecast(
+            days=days.astype("datetime64[D]"),
+            mean=np.maximum(mean, 0.0),
+            lower=np.maximum(mean - spread, 0.0),
+            upper=np.maximum(mean + spread, 0.0),
+        )
+
+    def to_state(self):
+        """A JSON-serialisable copy of the model."""
+        return {
+            "origin": self.origin,
+            "last_day": self.last_day,
+            "days_seen": self.days_seen,
+            "halflife_days": self.halflife_days,
+            "weight": self.weight,
+            "xtx": self.xtx.tolist(),
+            "xty": self.xty.tolist(),
+            "yty": self.yty.tolist(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a model from :meth:`to_state` output."""
+        return cls(
+            origin=int(state["origin"]),
+            last_day=int(state["last_day"]),
+            days_seen=int(state["days_seen"]),
+            halflife_days=float(state["halflife_days"]),
+            weight=float(state["weight"]),
+            xtx=np.asarray(state["xtx"], dtype=np.float64),
+            xty=np.asarray(state["xty"], dtype=np.float64),
+            yty=np.asarray(state["yty"], dtype=np.float64),
+        )
+
+
+def fit(days, values, halflife_days=DEFAULT_HALFLIFE_DAYS):
+    """Train a model on daily ``values`` (one row per day, one column per target)."""
+    days = to_days(days)
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    if not len(days):
+        raise ForecastError("No history to train on.")
+    model = ForecastModel.empty(int(days.min()), values.shape[1], halflife_days)
+    model.update(days, values)
+    return model
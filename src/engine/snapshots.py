@@ -0,0 +1,259 @@
+"""
+Columnar, memory-mapped snapshots of transactions.
+
+A snapshot is a directory with one raw little-endian file per column, two
+JSON dictionaries for the encoded names and a small ``manifest.json``:
+
+========== ======= ==================================================
+column     dtype   meaning
+========== ======= ==================================================
+``id``     int64   transaction id
+``epoch``  int64   timestamp, whole seconds since 1970-01-01 UTC
+``cents``  int64   amount in integer cents
+``category`` int8  index into ``manifest["categories"]``
+``item``   int32   index into ``items.json``
+``customer`` int32 index into ``customers.json``; -1 when anonymous
+========== ======= ==================================================
+
+Rows are sorted by ``epoch`` and cover ``[manifest["start"],
+manifest["end"])``. A ``SnapshotWriter`` appends the rows of the next
+range, so a snapshot grows incrementally instead of being rewritten.
+The manifest is replaced atomically once a range is complete, and its
+row count is what readers trust. Bytes of an interrupted append are
+never read, and they are truncated by the next writer.
+
+``Snapshot`` maps the columns with ``numpy.memmap``, so opening one costs
+the same at any size, and slices by time are zero-copy views.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+COLUMNS = {
+    "id": np.dtype("<i8"),
+    "epoch": np.dtype("<i8"),
+    "cents": np.dtype("<i8"),
+    "category": np.dtype("<i1"),
+    "item": np.dtype("<i4"),
+    "customer": np.dtype("<i4"),
+}
+# Dictionary-encoded columns and the file holding their names.
+DICTIONARIES = {"item": "items.json", "customer": "customers.json"}
+ANONYMOUS = -1
+_MAX_CATEGORIES = np.iinfo(np.int8).max
+
+
+class SnapshotError(ValueError):
+    """Raised for a missing or inconsistent snapshot, or an out-of-order append."""
+
+
+def _column_file(name):
+    return f"{name}.bin"
+
+
+def read_manifest(path):
+    """Return the manifest of the snapshot at ``path``, or ``None`` if absent."""
+    try:
+        manifest = json.loads((Path(path) / MANIFEST).read_text())
+    except FileNotFoundError:
+        return None
+    if manifest.get("version") != FORMAT_VERSION:
+        version = manifest.get("version")
+        raise SnapshotError(f"Unsupported snapshot version {version}.")
+    return manifest
+
+
+def _write_json(path, data):
+    """Write JSON to ``path`` atomically."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot directory."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.manifest = read_manifest(self.path)
+        if self.manifest is None:
+            raise SnapshotError(f"No snapshot at {self.path}.")
+        self.rows = self.manifest["rows"]
+        self.columns = {name: self._map(name, dtype) for name, dtype in COLUMNS.items()}
+        self.categories = self.manifest["categories"]
+        self._names = {}
+
+    def _map(self, name, dtype):
+        if not self.rows:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(
+            self.path / _column_file(name), dtype=dtype, mode="r", shape=(self.rows,)
+        )
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def names(self, column):
+        """Names behind the codes of a dictionary-encoded column."""
+        if column not in self._names:
+            self._names[column] = json.loads(
+                (self.path / DICTIONARIES[column]).read_text()
+            )
+        return self._names[column]
+
+    @property
+    def start(self):
+        return self.manifest["start"]
+
+    @property
+    def end(self):
+        return self.manifest["end"]
+
+    def between(self, start, end):
+        """Columns of the rows with ``start <= epoch < end``, as zero-copy views."""
+        epoch = self.columns["epoch"]
+        first, last = np.searchsorted(epoch, [start, end], side="left")
+        return {name: column[first:last] for name, column in self.columns.items()}
+
+    def days(self, utc_offset_seconds=0):
+        """Epoch day of every row, shifted by a fixed UTC offset."""
+        return (self.columns["epoch"] + utc_offset_seconds) // 86400
+
+
+def _encode(values, vocabulary, codes, anonymous=False):
+    """Map names to stable codes, extending ``vocabulary`` with new ones."""
+    unique, inverse = np.unique(np.asarray(values, dtype=object), return_inverse=True)
+    mapped = np.empty(len(unique), dtype=np.int64)
+    for position, name in enumerate(unique.tolist()):
+        if anonymous and not name:
+            mapped[position] = ANONYMOUS
+            continue
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(vocabulary)
+            vocabulary.append(name)
+        mapped[position] = code
+    return mapped[inverse.reshape(-1)]
+
+
+class SnapshotWriter:
+    """Append the rows of ``[start, end)`` to a snapshot, creating it if needed.
+
+    ``start`` must be where the snapshot currently ends (any value for a
+    new snapshot). Rows are written with :meth:`write`, in epoch order, in
+    as many chunks as needed. Leaving the ``with`` block without an error
+    commits the range. After an error, the snapshot stays as it was.
+    ``category_names`` fixes the first category codes of a new snapshot.
+    """
+
+    def __init__(self, path, start, end, category_names=()):
+        self.path = Path(path)
+        self.start = int(start)
+        self.end = int(end)
+        if self.end < self.start:
+            raise SnapshotError("A snapshot range cannot end before it starts.")
+        self.manifest = read_manifest(self.path) or {
+            "version": FORMAT_VERSION,
+            "rows": 0,
+            "start": self.start,
+            "end": self.start,
+            "total_cents": 0,
+            "categories": list(category_names),
+            "columns": {
+                name: {"file": _column_file(name), "dtype": dtype.str}
+                for name, dtype in COLUMNS.items()
+            },
+        }
+        if self.manifest["end"] != self.start:
+            raise SnapshotError(
+                f"Snapshot ends at {self.manifest['end']}; "
+                f"the next range must start there, not at {self.start}."
+            )
+        self.vocabularies = {}
+        self.codes = {}
+        self.rows = 0
+        self.total_cents = 0
+        self.last_epoch = self.start
+        self._files = {}
+
+    def __enter__(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        committed = self.manifest["rows"]
+        for name, dtype in COLUMNS.items():
+            file = self.path / _column_file(name)
+            file.touch()
+            # Drop the bytes of an append that never committed.
+            os.truncate(file, committed * dtype.itemsize)
+            self._files[name] = open(file, "ab")
+        for column, filename in DICTIONARIES.items():
+            file = self.path / filename
+            names = json.loads(file.read_text()) if file.exists() else []
+            self.vocabularies[column] = names
+            self.codes[column] = {name: code for code, name in enumerate(names)}
+        category_names = self.manifest["categories"]
+        self.vocabularies["category"] = category_names
+        self.codes["category"] = {
+            name: code for code, name in enumerate(category_names)
+        }
+        return self
+
+    def _encode(self, column, values, anonymous=False):
+        return _encode(values, self.vocabularies[column], self.codes[column], anonymous)
+
+    def write(self, ids, epochs, cents, categories, items, customers):
+        """Append one chunk of rows; names are encoded against the dictionaries."""
+        epochs = np.asarray(epochs, dtype=np.int64)
+        if len(epochs):
+            if epochs[0] < self.last_epoch or np.any(np.diff(epochs) < 0):
+                raise SnapshotError("Rows must be appended in epoch order.")
+            if epochs[-1] >= self.end:
+                raise SnapshotError("Rows must fall inside the appended range.")
+            self.last_epoch = int(epochs[-1])
+        cents = np.asarray(cents, dtype=np.int64)
+        category_codes = self._encode("category", categories)
+        if len(self.vocabularies["category"]) > _MAX_CATEGORIES:
+            raise SnapshotError(
+                f"At most {_MAX_CATEGORIES} categories fit in int8 codes."
+            )
+        columns = {
+            "id": ids,
+            "epoch": epochs,
+            "cents": cents,
+            "category": category_codes,
+            "item": self._encode("item", items),
+            "customer": self._encode("customer", customers, anonymous=True),
+        }
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) != 1:
+            raise SnapshotError("Every column of a chunk must have the same length.")
+        for name, values in columns.items():
+            self._files[name].write(np.asarray(values, dtype=COLUMNS[name]).tobytes())
+        self.rows += len(epochs)
+        self.total_cents += int(cents.sum())
+
+    def __exit__(self, exc_type, exc, traceback):
+        for handle in self._files.values():
+            handle.close()
+        if exc_type is not None:
+            return False
+        for column, filename in DICTIONARIES.items():
+            _write_json(self.path / filename, self.vocabularies[column])
+        self.manifest.update(
+            rows=self.manifest["rows"] + self.rows,
+            end=self.end,
+            total_cents=self.manifest["total_cents"] + self.total_cents,
+        )
+        _write_json(self.path / MANIFEST, self.manifest)
+        return False
+
+
+def append(path, start, end, category_names=(), **columns):
+    """Append one chunk covering ``[start, end)``; see :class:`SnapshotWriter`."""
+    with SnapshotWriter(path, start, end, category_names) as writer:
+        writer.write(**columns)
+    return writer.rows
@@ -0,0 +1,39 @@
+import pytest
+from django.core.cache import caches
+from transactions.models import Project
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    yield
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def job_files(settings, tmp_path):
+    settings.JOBS_FILES_DIR = tmp_path / 'job_files'
+    return settings.JOBS_FILES_DIR
+
+
+@pytest.fixture(autouse=True)
+def static_storage(settings):
+    # Tests run without collectstatic, so there is no manifest to look names up in.
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'staticfiles': {
+            'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+        },
+    }
+
+
+@pytest.fixture
+def project(django_user_model):
+    owner = django_user_model.objects.create_user(username='owner', password='pw')
+    return Project.objects.create(name='Cafe', owner=owner)
+
+
+@pytest.fixture
+def owner_client(client, project):
+    client.force_login(project.owner)
+    return client
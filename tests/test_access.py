@@ -0,0 +1,114 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from transactions.access import get_project_access
+from transactions.models import Project, ProjectMember, Transaction
+from transactions.services import record_transactions
+
+
+@pytest.fixture
+def viewer(django_user_model, project):
+    user = django_user_model.objects.create_user(username='viewer', password='pw')
+    ProjectMember.objects.create(project=project, user=user, role='viewer')
+    return user
+
+
+def _access_queries(rf, user, project_id):
+    request = rf.get('/')
+    request.user = user
+    with CaptureQueriesContext(connection) as ctx:
+        first = get_project_access(request, project_id)
+        second = get_project_access(request, project_id)
+    assert first is second
+    return first, len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_access_is_resolved_in_one_query_and_memoised(rf, project, viewer):
+    """
+    Test that project, owner and role come from a single memoised query.
+    """
+    access, queries = _access_queries(rf, viewer, project.id)
+
+    assert queries == 1
+    assert (access.role, access.can_view, access.can_edit) == ('viewer', True, False)
+    with CaptureQueriesContext(connection) as ctx:
+        assert access.project.owner.username == 'owner'
+    assert not ctx.captured_queries
+
+
+@pytest.mark.django_db
+def test_views_enforce_roles(client, project, viewer, django_user_model):
+    """
+    Test that viewers cannot write and outsiders cannot see the project.
+    """
+    client.force_login(viewer)
+    assert client.get(reverse('home', args=[project.id])).status_code == 200
+    add_url = reverse('add_transaction', args=[project.id])
+    client.post(add_url, {'item_name': 'x', 'amount': '1'})
+    assert not Transaction.objects.exists()
+
+    outsider = django_user_model.objects.create_user(username='outsider', password='pw')
+    client.force_login(outsider)
+    assert client.get(reverse('home', args=[project.id])).status_code == 404
+    reporting_url = reverse('project_reporting_api', args=[project.id])
+    assert client.get(reporting_url).status_code == 403
+    assert client.get(reverse('project_team', args=[project.id])).status_code == 302
+
+
+@pytest.mark.django_db
+def test_cached_memberships_are_invalidated(rf, settings, project, viewer):
+    """
+    Test the optional membership cache and its invalidation on role changes.
+    """
+    settings.PROJECT_ACCESS_CACHE_TIMEOUT = 60
+    cache.clear()
+    _access_queries(rf, viewer, project.id)
+    access, queries = _access_queries(rf, viewer, project.id)
+    assert (access.role, queries) == ('viewer', 1)
+
+    membership = ProjectMember.objects.get(user=viewer)
+    membership.role = 'admin'
+    membership.save()
+
+    access, _ = _access_queries(rf, viewer, project.id)
+    assert access.can_manage
+
+
+@pytest.mark.django_db
+def test_project_list_query_count_is_constant(client, project, viewer,
+                                               django_user_model):
+    """
+    Test that listing projects with their stats does not grow with the project count.
+    """
+    record_transactions([
+        Transaction(project=project, item_name='Latte', amount=Decimal('4.00')),
+        Transaction(project=project, item_name='Bagel', amount=Decimal('6.00'),
+                    category='food'),
+    ])
+    client.force_login(viewer)
+
+    def list_projects():
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(reverse('projects'))
+        assert response.status_code == 200
+        return response, len(ctx.captured_queries)
+
+    response, queries = list_projects()
+    assert 'Shared by owner' in response.content.decode()
+    assert '2 transactions' in response.content.decode()
+
+    others = django_user_model.objects.create_user(username='other', password='pw')
+    for i in range(5):
+        shared = Project.objects.create(name=f'Shared {i}', owner=others)
+        ProjectMember.objects.create(project=shared, user=viewer, role='viewer')
+        Project.objects.create(name=f'Own {i}', owner=viewer)
+    Project.objects.create(name='Hidden', owner=others)
+
+    response, more_queries = list_projects()
+    assert more_queries == queries
+    assert len(response.context['projects']) == 11
@@ -0,0 +1,49 @@
+import numpy as np
+
+from engine.anomalies import AMOUNT, SPIKE, AnomalyDetector, SeriesState
+
+
+def _steady_sales(detector, state, days=40, seed=0):
+    """About 20 coffees a day at a few price points; returns the flags raised."""
+    rng = np.random.default_rng(seed)
+    flags = []
+    for day in range(days):
+        for _ in range(rng.poisson(20)):
+            price = rng.choice([3.2, 4.6, 4.8, 5.2]) * rng.lognormal(0, 0.05)
+            flags += detector.observe(state, 19000 + day, round(float(price), 2))
+    return flags
+
+
+def test_mistyped_amount_is_flagged_and_clipped():
+    """
+    Test that a hundredfold amount is flagged without dragging the running mean.
+    """
+    detector = AnomalyDetector()
+    state = SeriesState()
+    assert _steady_sales(detector, state) == []
+    mean = state.mean
+
+    [anomaly] = detector.observe(state, 19040, 480.0)
+
+    assert anomaly.kind == AMOUNT
+    assert anomaly.score > 10
+    assert 3 < anomaly.expected < 6
+    assert abs(state.mean - mean) < 0.05
+    restored = SeriesState.from_dict(state.to_dict())
+    assert detector.observe(restored, 19040, 4.6) == []
+
+
+def test_category_spike_is_flagged_once_per_day():
+    """
+    Test that a day with far more sales than usual raises one spike flag.
+    """
+    detector = AnomalyDetector()
+    state = SeriesState()
+    _steady_sales(detector, state)
+
+    flags = [flag for _ in range(100) for flag in detector.observe(state, 19041, 4.6)]
+
+    assert [flag.kind for flag in flags] == [SPIKE]
+    assert 15 < flags[0].expected < 25
+    # Backdated rows do not count towards the current day.
+    assert detector.observe(state, 19000, 4.6) == []
@@ -0,0 +1,64 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from transactions.anomalies import replay_project
+from transactions.models import AnomalyState, Transaction, TransactionAnomaly
+from transactions.services import record_transactions
+
+
+def _history(project, days=40, per_day=5):
+    now = timezone.now()
+    return [
+        Transaction(
+            project=project, item_name='Latte', category='beverage',
+            amount=Decimal('4.50') + Decimal(i % 3) / 10,
+            date=now - timedelta(days=days - day) + timedelta(minutes=i),
+        )
+        for day in range(days)
+        for i in range(per_day)
+    ]
+
+
+@pytest.mark.django_db
+def test_writes_update_persisted_state_and_flag_outliers(owner_client, project):
+    """
+    Test that imports and single adds feed the stored detector and surface alerts.
+    """
+    record_transactions(_history(project))
+    state = AnomalyState.objects.get(project=project, category='beverage')
+    assert state.state['count'] == 200
+    assert not TransactionAnomaly.objects.exists()
+
+    response = owner_client.post(reverse('add_transaction', args=[project.id]), {
+        'item_name': 'Latte', 'amount': '450.00', 'customer_name': '',
+        'category': 'beverage',
+        'date': timezone.localtime().strftime('%Y-%m-%dT%H:%M'),
+    }, follow=True)
+
+    anomaly = TransactionAnomaly.objects.get()
+    assert anomaly.kind == 'amount'
+    assert 'Latte for $450.00 is unusual' in response.content.decode()
+    assert AnomalyState.objects.get(pk=state.pk).state['count'] == 201
+
+    owner_client.post(reverse('dismiss_anomaly', args=[project.id, anomaly.id]))
+    assert TransactionAnomaly.objects.get().dismissed
+    response = owner_client.get(reverse('home', args=[project.id]))
+    assert 'Alerts' not in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_replay_rebuilds_state_without_alerts(project):
+    """
+    Test that replaying history reproduces the live state and raises nothing.
+    """
+    rows = _history(project)
+    record_transactions(rows)
+    live = AnomalyState.objects.get(project=project).state
+
+    assert replay_project(project.id, batch_size=7) == len(rows)
+
+    assert AnomalyState.objects.get(project=project).state == pytest.approx(live)
+    assert not TransactionAnomaly.objects.exists()
@@ -0,0 +1,46 @@
+import pytest
+from django.core.management import call_command
+from transactions import benchmarks
+from transactions.models import Project, ProjectMember, Transaction
+from transactions.rollups import verify_project_rollups
+
+
+@pytest.mark.django_db
+def test_generate_load_data_keeps_derived_data_consistent():
+    """
+    Test that generated transactions are priced and their rollups match.
+    """
+    call_command(
+        'generate_load_data', users=4, projects=3, members=2, transactions=900, days=30
+    )
+
+    assert Transaction.objects.count() == 900
+    assert ProjectMember.objects.count() == 6
+    assert not Transaction.objects.filter(factor_version__isnull=True).exists()
+    for project_id in Project.objects.values_list('id', flat=True):
+        assert verify_project_rollups(project_id) == []
+
+
+@pytest.mark.django_db
+def test_every_url_is_benchmarked_without_changing_data(job_files):
+    """
+    Test that each app URL has a request recipe that runs and is rolled back.
+    """
+    call_command(
+        'generate_load_data', users=2, projects=1, members=1, transactions=200, days=30
+    )
+    project = benchmarks.default_project()
+
+    results = benchmarks.run_benchmarks(project, repeat=1, host='testserver')
+
+    assert set(results) == set(benchmarks.url_names())
+    assert all(result['status'] < 400 for result in results.values()), results
+    assert Transaction.objects.count() == 200
+    assert Project.objects.count() == 1
+    assert not job_files.exists() or not any(job_files.iterdir())
+
+    slower = {
+        name: dict(result, queries=result['queries'] - 1)
+        for name, result in results.items()
+    }
+    assert len(benchmarks.compare(results, slower)) == len(results)
@@ -0,0 +1,82 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from engine.emissions import (
+    EmissionFactor,
+    FactorTable,
+    FactorTableError,
+    compute_emissions,
+    load_factor_table,
+)
+
+
+@pytest.fixture
+def table():
+    return FactorTable([
+        EmissionFactor("food", "", date(2020, 1, 1), date(2025, 1, 1), 0.5),
+        EmissionFactor("food", "", date(2025, 1, 1), None, 0.4),
+        EmissionFactor("beverage", "", date(2020, 1, 1), None, 0.3),
+        EmissionFactor("", "Latte", date(2024, 1, 1), None, 0.6),
+    ])
+
+
+def test_factors_follow_validity_ranges_and_item_overrides(table):
+    """
+    Test that factors are picked by date range, with item factors preferred.
+    """
+    kg = compute_emissions(
+        table,
+        categories=["food", "food", "beverage", "beverage", "beverage", "toys", "food"],
+        dates=[
+            "2024-12-31", "2025-01-01", "2024-06-01", "2023-06-01",
+            "2024-06-01", "2024-06-01", "2019-12-31",
+        ],
+        amounts=[10, 10, 10, 10, 10, 10, 10],
+        item_names=["Bagel", "Bagel", " latte ", "Latte", "Tea", "Latte", "Bagel"],
+    )
+
+    np.testing.assert_allclose(kg, [5.0, 4.0, 6.0, 3.0, 3.0, 6.0, np.nan])
+
+
+def test_vectorised_lookup_matches_row_by_row(table):
+    """
+    Test that a large random batch prices the same as one row at a time.
+    """
+    rng = np.random.default_rng(1)
+    rows = 500
+    categories = rng.choice(["food", "beverage", "unknown"], rows)
+    items = rng.choice(["Latte", "Bagel"], rows)
+    dates = np.datetime64("2019-06-01") + rng.integers(0, 2500, rows)
+    amounts = rng.uniform(1, 20, rows)
+
+    batch = compute_emissions(table, categories, dates, amounts, items)
+    single = [
+        compute_emissions(table, [c], [d], [a], [i])[0]
+        for c, d, a, i in zip(categories, dates, amounts, items)
+    ]
+
+    np.testing.assert_allclose(batch, single)
+
+
+def test_overlapping_ranges_are_rejected():
+    """
+    Test that two factors for the same category cannot overlap.
+    """
+    with pytest.raises(FactorTableError):
+        FactorTable([
+            EmissionFactor("food", "", date(2020, 1, 1), date(2023, 1, 1), 0.5),
+            EmissionFactor("food", "", date(2022, 1, 1), None, 0.4),
+        ])
+
+
+def test_default_table_covers_every_category():
+    """
+    Test that the shipped factor file prices every transaction category today.
+    """
+    table = load_factor_table()
+    categories = ["beverage", "food", "merchandise", "other"]
+    kg = compute_emissions(table, categories, [date.today()] * 4, [1.0] * 4)
+
+    assert not np.isnan(kg).any()
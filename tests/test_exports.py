@@ -0,0 +1,106 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from transactions.models import Transaction
+from transactions.services import record_transactions
+
+
+@pytest.fixture
+def ledger(project):
+    return record_transactions(
+        Transaction(
+            project=project, item_name=f'Item {day}', amount=Decimal('3.10'),
+            category='food' if day % 2 else 'beverage',
+            date=datetime(2025, 11, day, 9, tzinfo=dt_timezone.utc),
+        )
+        for day in range(1, 11)
+    )
+
+
+def _body(response):
+    return b''.join(response.streaming_content)
+
+
+@pytest.mark.django_db
+def test_csv_export_applies_filters_in_date_order(owner_client, project, ledger):
+    """
+    Test that date-range and category filters apply and rows come oldest first.
+    """
+    url = reverse('export_transactions', args=[project.id])
+    params = {'start': '2025-11-03', 'end': '2025-11-07', 'category': 'food'}
+    response = owner_client.get(url, params)
+
+    rows = list(csv.DictReader(io.StringIO(_body(response).decode())))
+    assert response['Content-Type'] == 'text/csv'
+    assert [r['item_name'] for r in rows] == ['Item 3', 'Item 5', 'Item 7']
+    assert rows[0]['amount'] == '3.10'
+
+
+@pytest.mark.django_db
+def test_ndjson_export_is_gzipped_when_accepted(owner_client, project, ledger):
+    """
+    Test on-the-fly gzip compression of an NDJSON export.
+    """
+    url = reverse('export_transactions', args=[project.id])
+    response = owner_client.get(
+        url, {'format': 'ndjson'}, HTTP_ACCEPT_ENCODING='gzip, br'
+    )
+
+    assert response['Content-Encoding'] == 'gzip'
+    lines = gzip.decompress(_body(response)).decode().splitlines()
+    assert len(lines) == 10
+    assert json.loads(lines[0])['item_name'] == 'Item 1'
+
+
+@pytest.mark.django_db
+def test_gzip_refused_with_zero_quality(owner_client, project, ledger):
+    """
+    Test that ``gzip;q=0`` is honoured as a refusal.
+    """
+    url = reverse('export_transactions', args=[project.id])
+    response = owner_client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+
+    assert not response.has_header('Content-Encoding')
+    assert _body(response).decode().startswith('id,date,')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_asgi_exports_stream_from_an_async_iterator(project, ledger):
+    """
+    Test that under ASGI the export is served from an async iterator, so it is
+    not buffered whole.
+    """
+    client = AsyncClient()
+    url = reverse('export_transactions', args=[project.id])
+
+    async def export():
+        await client.aforce_login(project.owner)
+        response = await client.get(url, {'format': 'ndjson'})
+        return response, [block async for block in response.streaming_content]
+
+    response, blocks = async_to_sync(export)()
+    assert response.is_async
+    assert len(b''.join(blocks).decode().splitlines()) == 10
+
+
+@pytest.mark.django_db
+def test_export_respects_project_access(client, django_user_model, project, ledger):
+    """
+    Test that non-members cannot export and bad filters are rejected.
+    """
+    stranger = django_user_model.objects.create_user(username='stranger', password='pw')
+    client.force_login(stranger)
+    url = reverse('export_transactions', args=[project.id])
+    assert client.get(url).status_code == 404
+
+    client.force_login(project.owner)
+    assert client.get(url, {'start': 'yesterday'}).status_code == 400
@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import pytest
+
+from engine.forecasting import ForecastError, ForecastModel, fit
+
+
+def _history(days=120, seed=0):
+    """Daily amount and emissions with a weekend peak and mild growth."""
+    rng = np.random.default_rng(seed)
+    day_numbers = np.arange(19000, 19000 + days)
+    weekly = np.array([1.0, 1.0, 1.0, 1.0, 1.2, 1.6, 1.4])[(day_numbers + 3) % 7]
+    amount = 200 * weekly * (1 + 0.002 * (day_numbers - 19000)) + rng.normal(0, 5, days)
+    return day_numbers.astype("datetime64[D]"), np.c_[amount, amount * 0.45]
+
+
+def test_incremental_update_matches_full_fit():
+    """
+    Test that folding in new days gives the same model as refitting everything.
+    """
+    days, values = _history()
+    incremental = fit(days[:90], values[:90])
+    # Days 100..119 only: the gap of quiet days is trained as zero sales.
+    incremental.update(days[100:], values[100:])
+    gapped = values.copy()
+    gapped[90:100] = 0
+
+    full = fit(days, gapped)
+    restored = ForecastModel.from_state(json.loads(json.dumps(incremental.to_state())))
+
+    np.testing.assert_allclose(restored.xtx, full.xtx)
+    np.testing.assert_allclose(restored.coefficients(), full.coefficients())
+    with pytest.raises(ForecastError):
+        restored.update(days[-1:], values[-1:])
+
+
+def test_forecast_follows_weekly_pattern_and_bounds():
+    """
+    Test that forecasts keep the weekly shape, stay ordered and respect the
+    horizon limits.
+    """
+    days, values = _history()
+    model = fit(days, values)
+    forecast = model.forecast(14)
+
+    assert forecast.days[0] == days[-1] + 1
+    mean, lower, upper = forecast.column(0)
+    weekdays = (forecast.days.astype(np.int64) + 3) % 7
+    assert mean[weekdays >= 5].min() > mean[weekdays <= 3].max() * 1.2
+    assert np.all((lower <= mean) & (mean <= upper))
+    np.testing.assert_allclose(forecast.column(1)[0], mean * 0.45, rtol=1e-6)
+
+    for horizon in (6, 91):
+        with pytest.raises(ForecastError):
+            model.forecast(horizon)
+    with pytest.raises(ForecastError):
+        fit(days[:10], values[:10]).forecast(7)
@@ -0,0 +1,70 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from transactions.forecasts import refresh_forecast
+from transactions.models import ProjectForecast, Transaction
+from transactions.services import record_transactions
+
+
+def _sell(project, days_ago, amount='10.00'):
+    record_transactions([Transaction(
+        project=project, item_name='Latte', amount=Decimal(amount),
+        date=timezone.now() - timedelta(days=days_ago),
+    )])
+
+
+@pytest.mark.django_db
+def test_refresh_fits_then_updates_incrementally(project):
+    """
+    Test that new days are folded in and edited history triggers a full refit.
+    """
+    assert refresh_forecast(project.id) == 'empty'
+    record_transactions(
+        Transaction(
+            project=project, item_name='Latte', amount=Decimal('10.00'),
+            date=timezone.now() - timedelta(days=days_ago),
+        )
+        for days_ago in range(1, 31)
+    )
+
+    assert refresh_forecast(project.id) == 'fitted'
+    assert refresh_forecast(project.id) == 'fresh'
+
+    _sell(project, 0)
+    assert refresh_forecast(project.id) == 'updated'
+
+    _sell(project, 10)
+    assert refresh_forecast(project.id) == 'fitted'
+    stored = ProjectForecast.objects.get(project=project)
+    assert stored.history_count == 31
+    assert stored.trained_through == (timezone.now() - timedelta(days=1)).date()
+
+
+@pytest.mark.django_db
+def test_forecast_api_serves_stored_models_only(owner_client, project):
+    """
+    Test that the API never trains inline and flags forecasts older than the data.
+    """
+    url = reverse('project_forecast_api', args=[project.id])
+    assert owner_client.get(url).status_code == 404
+
+    record_transactions(
+        Transaction(
+            project=project, item_name='Latte', amount=Decimal('10.00'),
+            date=timezone.now() - timedelta(days=days_ago),
+        )
+        for days_ago in range(1, 31)
+    )
+    refresh_forecast(project.id)
+
+    data = owner_client.get(url, {'days': 14}).json()
+    assert len(data['days']) == len(data['amount']['mean']) == 14
+    assert data['amount']['mean'][0] == pytest.approx(10.0, abs=0.5)
+    assert data['stale'] is False
+
+    _sell(project, 0)
+    assert owner_client.get(url, {'days': 14}).json()['stale'] is True
+    assert owner_client.get(url, {'days': 120}).status_code == 400
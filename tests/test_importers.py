@@ -0,0 +1,128 @@
+import io
+import json
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from transactions import importers
+from transactions.models import ProjectDailyRollup, Transaction
+
+CSV = (
+    'item_name,amount,category,customer_name,date\n'
+    'Latte,4.50,beverage,Ann,2025-11-30T10:30:00Z\n'
+    'Scone,not-a-number,food,,2025-11-30T11:00:00Z\n'
+    'Mug,12.00,merchandise,,2025-11-30 12:00\n'
+    ',3.00,food,,\n'
+    'Tea,2.00,,,\n'
+)
+
+
+def _import(project, data, fmt, **kwargs):
+    rows = importers.iter_rows(io.BytesIO(data.encode()), fmt)
+    return importers.import_transactions(project, rows, **kwargs)
+
+
+@pytest.mark.django_db
+def test_csv_import_keeps_going_past_bad_rows(project):
+    """
+    Test that invalid rows are reported with their line and the rest is inserted.
+    """
+    result = _import(project, CSV, 'csv', chunk_size=2)
+
+    assert (result.imported, result.failed) == (3, 2)
+    assert [line for line, _ in result.errors] == [3, 5]
+    assert 'amount' in result.errors[0][1]
+    assert Transaction.objects.get(item_name='Tea').category == 'beverage'
+    assert sum(r.count for r in ProjectDailyRollup.objects.filter(project=project)) == 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fmt', ['json', 'ndjson'])
+def test_json_imports_stream_objects(project, fmt, monkeypatch):
+    """
+    Test JSON arrays (split across read chunks) and NDJSON files.
+    """
+    monkeypatch.setattr(importers, '_JSON_READ_SIZE', 16)
+    rows = [
+        {'item_name': f'Item {i}', 'amount': '1.25', 'category': 'food'}
+        for i in range(25)
+    ]
+    rows.append({'item_name': 'Broken', 'amount': '1.25', 'category': 'unknown'})
+    if fmt == 'json':
+        data = json.dumps(rows, indent=2)
+    else:
+        data = '\n'.join(json.dumps(row) for row in rows)
+
+    result = _import(project, data, fmt, chunk_size=10)
+
+    assert (result.imported, result.failed) == (25, 1)
+    assert 'category' in result.errors[0][1]
+
+
+def test_json_import_rejects_non_array():
+    """
+    Test that a JSON document that is not an array fails the whole import.
+    """
+    with pytest.raises(importers.ImportFormatError):
+        list(importers.iter_rows(io.BytesIO(b'{"item_name": "x"}'), 'json'))
+
+
+@pytest.mark.django_db
+def test_import_endpoint_and_command(owner_client, project, tmp_path):
+    """
+    Test the upload endpoint and the management command end to end.
+    """
+    upload = SimpleUploadedFile('pos.csv', CSV.encode(), content_type='text/csv')
+    url = reverse('import_transactions', args=[project.id])
+    response = owner_client.post(url, {'file': upload})
+    assert response.status_code == 302
+    assert Transaction.objects.filter(project=project).count() == 3
+
+    path = tmp_path / 'shift.ndjson'
+    path.write_text(json.dumps({'item_name': 'Mocha', 'amount': 5}) + '\n')
+    call_command('import_transactions', str(project.id), str(path))
+    assert Transaction.objects.filter(project=project).count() == 4
+
+
+@pytest.mark.django_db
+def test_non_string_json_values_are_row_errors(project):
+    """
+    Test that numbers, objects and lists where text is expected fail only their own row.
+    """
+    rows = [
+        {'item_name': 'Latte', 'amount': 4.5, 'date': 123},
+        {'item_name': {'name': 'Latte'}, 'amount': [4.5]},
+        {'item_name': 'Tea', 'amount': 2, 'customer_name': 7},
+    ]
+    result = _import(project, json.dumps(rows), 'json')
+
+    assert (result.imported, result.failed) == (1, 2)
+    assert result.errors[0] == (
+        1,
+        'date: “123” value has an invalid format. '
+        'It must be in YYYY-MM-DD HH:MM[:ss[.uuuuuu]][TZ] format.',
+    )
+    assert result.errors[1][1].startswith(
+        'item_name: Expected a text or number value.; amount:'
+    )
+    assert Transaction.objects.get().customer_name == '7'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('data', [
+    b'item_name,amount\nCaf\xe9,1.00\n',
+    b'item_name,amount\n"' + b'x' * 200_000 + b'",1.00\n',
+])
+def test_undecodable_or_malformed_csv_fails_cleanly(owner_client, project, data):
+    """
+    Test that a non-UTF-8 or malformed CSV upload is reported as an import error,
+    not a server error.
+    """
+    upload = SimpleUploadedFile('sales.csv', data)
+    url = reverse('import_transactions', args=[project.id])
+    response = owner_client.post(url, {'file': upload}, follow=True)
+
+    assert response.status_code == 200
+    (message,) = [str(m) for m in response.context['messages']]
+    assert message.startswith('Import failed: ')
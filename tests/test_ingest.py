@@ -0,0 +1,138 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from transactions import ingest
+from transactions.models import (
+    IdempotencyKey,
+    IngestToken,
+    Project,
+    ProjectDailyRollup,
+    Transaction,
+)
+
+
+def _post(client, project, rows, secret):
+    return client.post(
+        reverse('ingest_transactions', args=[project.id]),
+        json.dumps({'transactions': rows}),
+        content_type='application/json',
+        headers={'Authorization': f'Bearer {secret}'},
+    )
+
+
+@pytest.mark.django_db
+def test_tokens_authenticate_one_project(client, project):
+    """
+    Test that only an active token of the URL's project may post, without a
+    session or CSRF token.
+    """
+    out = io.StringIO()
+    call_command('create_ingest_token', project.id, '--name', 'Till 1', stdout=out)
+    secret = out.getvalue().split()[-1]
+    token = IngestToken.objects.get()
+    assert token.token_hash == ingest.hash_token(secret)
+    assert secret.startswith(token.prefix)
+
+    rows = [{'item_name': 'Latte', 'amount': '4.50'}]
+    client.enforce_csrf_checks = True
+    assert _post(client, project, rows, secret).status_code == 201
+    assert _post(client, project, rows, 'wrong').status_code == 401
+
+    other = Project.objects.create(name='Other', owner=project.owner)
+    assert _post(client, other, rows, secret).status_code == 401
+    url = reverse('ingest_transactions', args=[project.id])
+    assert client.get(url).status_code == 405
+
+    token.revoked = True
+    token.save()
+    assert _post(client, project, rows, secret).status_code == 401
+    assert Transaction.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_batches_are_deduplicated_by_idempotency_key(client, project):
+    """
+    Test that keyed rows are stored once across retries and within a batch, and
+    reported per row.
+    """
+    _, secret = ingest.create_token(project, 'Till')
+    sale = {'item_name': 'Latte', 'amount': '4.50', 'date': '2024-03-01T09:00:00',
+            'idempotency_key': 'sale-1'}
+    rows = [
+        sale,
+        dict(sale),
+        {'item_name': 'Bagel', 'amount': '3.90', 'date': '2024-03-01T09:05:00',
+         'category': 'food'},
+    ]
+
+    first = _post(client, project, rows, secret)
+    assert first.status_code == 201
+    body = first.json()
+    assert (body['created'], body['duplicates']) == (2, 1)
+    sale_id = body['results'][0]['id']
+    assert body['results'][1] == {'index': 1, 'status': 'duplicate', 'id': sale_id}
+
+    # A retry of the keyed sale is answered from the key table.
+    retry = _post(client, project, rows[:1], secret)
+    assert retry.status_code == 200
+    assert retry.json()['results'] == [
+        {'index': 0, 'status': 'duplicate', 'id': sale_id},
+    ]
+
+    assert Transaction.objects.filter(project=project).count() == 2
+    key = IdempotencyKey.objects.get(project=project, key='sale-1')
+    assert key.transaction_id == sale_id
+    rollups = ProjectDailyRollup.objects.filter(project=project)
+    assert sum(rollup.count for rollup in rollups) == 2
+
+
+@pytest.mark.django_db
+def test_invalid_batches_are_rejected_whole(client, project, settings):
+    """
+    Test that one invalid row, a bad body or an oversized batch stores nothing.
+    """
+    _, secret = ingest.create_token(project, 'Till')
+    rows = [
+        {'item_name': 'Latte', 'amount': '4.50'},
+        {'item_name': 'Bagel', 'amount': 'lots'},
+    ]
+
+    response = _post(client, project, rows, secret)
+    assert response.status_code == 400
+    assert [error['index'] for error in response.json()['errors']] == [1]
+    assert 'amount' in response.json()['errors'][0]['errors']
+
+    settings.INGEST_MAX_BATCH = 1
+    assert _post(client, project, rows[:1] * 2, secret).status_code == 400
+    bad_json = client.post(
+        reverse('ingest_transactions', args=[project.id]), 'not json',
+        content_type='application/json', headers={'Authorization': f'Bearer {secret}'},
+    )
+    assert bad_json.status_code == 400
+    assert not Transaction.objects.exists()
+
+
+@pytest.mark.django_db
+def test_non_string_values_are_row_errors(client, project):
+    """
+    Test that numbers, objects and lists where text is expected give a 400
+    listing each row.
+    """
+    _, secret = ingest.create_token(project, 'Till')
+    rows = [
+        {'item_name': 'Latte', 'amount': 4.5, 'date': 123},
+        {'item_name': ['Bagel'], 'amount': 3},
+        {'item_name': 'Tea', 'amount': {'value': 2}},
+        {'item_name': 'Mug', 'amount': 12, 'idempotency_key': 7},
+    ]
+
+    response = _post(client, project, rows, secret)
+    assert response.status_code == 400
+    errors = response.json()['errors']
+    assert [(error['index'], list(error['errors'])) for error in errors] == [
+        (0, ['date']), (1, ['item_name']), (2, ['amount']), (3, ['idempotency_key']),
+    ]
+    assert not Transaction.objects.exists()
@@ -0,0 +1,106 @@
+import json
+import logging
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from transactions.instrumentation import RequestMetrics
+
+
+@pytest.fixture
+def request_logs(caplog):
+    logger = logging.getLogger('transactions.requests')
+    logger.addHandler(caplog.handler)
+    yield caplog
+    logger.removeHandler(caplog.handler)
+
+
+def _records(caplog, name):
+    return [json.loads(r.getMessage()) for r in caplog.records if r.name == name]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url_name', ['home', 'project_reporting_api'])
+def test_sampled_requests_report_server_timing_and_log(
+    settings, owner_client, project, request_logs, url_name
+):
+    """
+    Test that sync and async views get a Server-Timing header and a log line.
+    """
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1.0
+    settings.REQUEST_TIMING_SLOW_MS = None
+
+    response = owner_client.get(reverse(url_name, args=[project.id]))
+
+    metrics = dict(
+        part.split(';', 1)[0:2] for part in response['Server-Timing'].split(', ')
+    )
+    assert set(metrics) == {'sql', 'template', 'view', 'total'}
+    (record,) = _records(request_logs, 'transactions.requests')
+    assert record['view'] == url_name
+    assert record['status'] == 200
+    assert record['sql_queries'] > 0
+
+
+@pytest.mark.django_db
+def test_unsampled_requests_only_log_when_slow(
+    settings, owner_client, project, request_logs
+):
+    """
+    Test that with sampling off there is no header, but slow requests are logged.
+    """
+    settings.REQUEST_TIMING_SAMPLE_RATE = 0
+    settings.REQUEST_TIMING_SLOW_MS = 0
+
+    response = owner_client.get(reverse('home', args=[project.id]))
+
+    assert not response.has_header('Server-Timing')
+    assert _records(request_logs, 'transactions.requests') == []
+    (slow,) = _records(request_logs, 'transactions.requests.slow')
+    assert slow['path'] == reverse('home', args=[project.id])
+
+
+def test_repeated_statements_are_flagged_as_duplicates():
+    """
+    Test that a statement run once per row (N+1) is reported with its count.
+    """
+    def execute(sql, params, many, context):
+        return None
+
+    metrics = RequestMetrics()
+    for pk in range(6):
+        metrics(
+            execute, 'SELECT COUNT(*) FROM t WHERE project_id = %s', (pk,), False, {}
+        )
+    metrics(execute, 'SELECT 1', (), False, {})
+
+    assert metrics.queries == 7
+    assert metrics.duplicates(5) == [
+        {'sql': 'SELECT COUNT(*) FROM t WHERE project_id = %s', 'count': 6}
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_asgi_requests_count_queries_run_in_worker_threads(
+    settings, project, request_logs
+):
+    """
+    Test that under ASGI the queries the ORM runs in sync_to_async threads are counted.
+    """
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1.0
+    settings.REQUEST_TIMING_SLOW_MS = None
+    client = AsyncClient()
+
+    async def get(url_name):
+        await client.aforce_login(project.owner)
+        return await client.get(reverse(url_name, args=[project.id]))
+
+    for url_name in ['home', 'project_reporting_api']:
+        response = async_to_sync(get)(url_name)
+        assert response.status_code == 200
+        assert '"0 queries"' not in response['Server-Timing']
+    assert all(
+        record['sql_queries'] > 0
+        for record in _records(request_logs, 'transactions.requests')
+    )
@@ -0,0 +1,151 @@
+import gzip
+import io
+import time
+from datetime import timedelta
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from transactions import jobs
+from transactions.models import Job, Transaction
+
+
+@pytest.mark.django_db
+def test_large_import_is_queued_and_reported(
+    owner_client, project, settings, job_files
+):
+    """
+    Test that an upload over the inline limit is imported by a worker with progress.
+    """
+    settings.JOBS_INLINE_IMPORT_BYTES = 10
+    upload = SimpleUploadedFile(
+        'big.csv', b'item_name,amount,category\nLatte,4.50,beverage\nBagel,x,food\n'
+    )
+    owner_client.post(
+        reverse('import_transactions', args=[project.id]), {'file': upload}
+    )
+
+    job = Job.objects.get()
+    assert (job.kind, job.status) == ('import', Job.QUEUED)
+    assert job.created_by == project.owner
+    assert not Transaction.objects.exists()
+    status_url = reverse('job_status_api', args=[project.id, job.pk])
+    assert owner_client.get(status_url).json()['status'] == 'queued'
+
+    assert jobs.run_pending() == 1
+    payload = owner_client.get(status_url).json()
+    assert payload['status'] == 'succeeded'
+    assert payload['progress']['percent'] == 100
+    assert payload['result']['imported'] == 1
+    assert payload['result']['failed'] == 1
+    assert Transaction.objects.get().item_name == 'Latte'
+    assert not list(job_files.iterdir())
+
+    listing = owner_client.get(reverse('project_jobs_api', args=[project.id])).json()
+    assert [item['id'] for item in listing['jobs']] == [job.pk]
+
+
+@pytest.mark.django_db
+def test_retries_backoff_and_per_project_limit(project, monkeypatch):
+    """
+    Test that failures are retried after a backoff, one project job at a time.
+    """
+    calls = []
+
+    def flaky(job, progress):
+        calls.append(job.attempts)
+        progress.update(1, 2, force=True)
+        if len(calls) == 1:
+            raise RuntimeError('transient')
+        return {'ok': True}
+
+    def broken(job, progress):
+        raise jobs.JobError('bad input')
+
+    monkeypatch.setitem(jobs.handlers, 'flaky', (flaky, 3))
+    monkeypatch.setitem(jobs.handlers, 'broken', (broken, 3))
+    first = jobs.enqueue('flaky', project)
+    second = jobs.enqueue('broken', project)
+
+    # Both are due, but the project may only run one job at a time.
+    assert jobs.claim('w1', limit=2) == [first.pk]
+    assert jobs.claim('w2', limit=2) == []
+
+    assert jobs.run_job(first.pk, 'w1') == Job.QUEUED
+    first.refresh_from_db()
+    assert first.attempts == 1
+    assert first.run_after > timezone.now() + timedelta(seconds=20)
+    assert 'transient' in first.error
+
+    # The retry waits for its backoff, so the other job goes next and fails for good.
+    assert jobs.run_pending('w1') == 1
+    second.refresh_from_db()
+    assert (second.status, second.attempts) == (Job.FAILED, 1)
+    assert second.message == 'bad input'
+
+    Job.objects.filter(pk=first.pk).update(run_after=timezone.now())
+    assert jobs.run_pending('w1') == 1
+    first.refresh_from_db()
+    assert (first.status, first.result, calls) == (Job.SUCCEEDED, {'ok': True}, [1, 2])
+    assert first.percent == 100
+
+    # A running job whose heartbeat stopped is handed back to the queue.
+    stale = jobs.enqueue('flaky', project)
+    jobs.claim('w3')
+    Job.objects.filter(pk=stale.pk).update(
+        heartbeat_at=timezone.now() - timedelta(hours=1)
+    )
+    assert jobs.requeue_stale() == 1
+    assert Job.objects.get(pk=stale.pk).status == Job.QUEUED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_command_runs_export_for_download(owner_client, project):
+    """
+    Test that a queued export runs on the worker pool and can then be downloaded.
+    """
+    Transaction.objects.create(project=project, item_name='Latte', amount='4.50')
+    owner_client.post(
+        reverse('start_job', args=[project.id]), {'kind': 'export', 'format': 'ndjson'}
+    )
+    job = Job.objects.get()
+
+    call_command(
+        'run_jobs', '--once', '--workers', '2', '--poll', '0.1', stdout=io.StringIO()
+    )
+
+    job.refresh_from_db()
+    assert job.status == Job.SUCCEEDED
+    assert job.result['rows'] == 1
+    configuration = reverse('project_configuration', args=[project.id])
+    page = owner_client.get(configuration).content.decode()
+    assert 'Download (1 rows)' in page
+
+    response = owner_client.get(reverse('job_download', args=[project.id, job.pk]))
+    filename = f'project-{project.id}-transactions.ndjson.gz'
+    assert response['Content-Disposition'] == f'attachment; filename="{filename}"'
+    body = gzip.decompress(b''.join(response.streaming_content)).decode()
+    assert '"item_name": "Latte"' in body
+
+
+@pytest.mark.django_db(transaction=True)
+def test_jobs_that_keep_running_are_not_requeued(project, settings, monkeypatch):
+    """
+    Test that a job busy in one step past the stale window keeps its heartbeat.
+    """
+    settings.JOBS_STALE_SECONDS = 0.4
+    requeued = []
+
+    def slow(job, progress):
+        time.sleep(1)
+        requeued.append(jobs.requeue_stale())
+        return {'ok': True}
+
+    monkeypatch.setitem(jobs.handlers, 'slow', (slow, 1))
+    job = jobs.enqueue('slow', project)
+    assert jobs.run_pending('w1') == 1
+
+    job.refresh_from_db()
+    assert (job.status, job.attempts, requeued) == (Job.SUCCEEDED, 1, [0])
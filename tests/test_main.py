@@ -1,4 +1,4 @@
-from ml_project.main import greet_ml_world
+from engine.main import greet_ml_world
 
 
 def test_greet_ml_world():
@@ -0,0 +1,67 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from transactions.models import Transaction
+from transactions.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from transactions.services import record_transactions
+
+
+@pytest.fixture
+def history(project):
+    """Seed transactions where several share the same timestamp."""
+    now = timezone.now().replace(microsecond=0)
+    return record_transactions(
+        Transaction(
+            project=project, item_name=f'Item {i}', amount=Decimal('2.00'),
+            date=now - timedelta(minutes=i // 3),
+        )
+        for i in range(120)
+    )
+
+
+@pytest.mark.django_db
+def test_home_renders_first_page_and_aggregate_stats(owner_client, project, history):
+    """
+    Test that the home page caps the rows it renders but counts all of them.
+    """
+    response = owner_client.get(reverse('home', args=[project.id]))
+
+    assert len(response.context['transactions']) == DEFAULT_PAGE_SIZE
+    assert response.context['next_cursor']
+    assert response.context['stats']['count'] == 120
+    assert response.context['stats']['total'] == Decimal('240.00')
+
+
+@pytest.mark.django_db
+def test_transaction_list_api_walks_every_row_once(owner_client, project, history):
+    """
+    Test that following cursors returns each transaction exactly once, newest first.
+    """
+    url = reverse('transaction_list_api', args=[project.id])
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 7, **({'cursor': cursor} if cursor else {})}
+        data = owner_client.get(url, params).json()
+        seen.extend(t['id'] for t in data['transactions'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    expected = Transaction.objects.filter(project=project).order_by('-date', '-id')
+    assert seen == list(expected.values_list('id', flat=True))
+
+
+@pytest.mark.django_db
+def test_transaction_list_api_validates_parameters(owner_client, project, history):
+    """
+    Test that page sizes are capped and bad cursors are rejected.
+    """
+    url = reverse('transaction_list_api', args=[project.id])
+
+    assert len(owner_client.get(url, {'limit': 10_000}).json()['transactions']) == min(
+        120, MAX_PAGE_SIZE
+    )
+    assert owner_client.get(url, {'cursor': 'not-a-cursor'}).status_code == 400
@@ -0,0 +1,137 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from transactions.models import Project, ProjectMember, Transaction
+from transactions.rollups import rebuild_project_rollups
+
+PROJECTS = 400
+TRANSACTIONS_PER_PROJECT = 50
+
+
+@pytest.fixture
+def large_dataset(project, django_user_model):
+    """Seed many projects so the planner sees realistic selectivity."""
+    rng = random.Random(42)
+    now = timezone.now()
+    categories = [code for code, _ in Transaction.CATEGORY_CHOICES]
+    owners = django_user_model.objects.bulk_create(
+        django_user_model(username=f'seed{i}') for i in range(PROJECTS // 4)
+    )
+    projects = [project] + Project.objects.bulk_create(
+        Project(name=f'Shop {i}', owner=owners[i % len(owners)])
+        for i in range(PROJECTS - 1)
+    )
+    ProjectMember.objects.bulk_create(
+        ProjectMember(project=p, user=owners[(i + 1) % len(owners)])
+        for i, p in enumerate(projects[1:])
+    )
+    Transaction.objects.bulk_create(
+        (
+            Transaction(
+                project=p, item_name=f'Item {rng.randrange(50)}',
+                amount=Decimal(rng.randrange(100, 2000)) / 100,
+                category=rng.choice(categories),
+                date=now - timedelta(minutes=rng.randrange(60 * 24 * 365)),
+            )
+            for p in projects
+            for _ in range(TRANSACTIONS_PER_PROJECT)
+        ),
+        batch_size=1000,
+    )
+    # Give the target project a long history, like the busiest real shops.
+    Transaction.objects.bulk_create(
+        (
+            Transaction(
+                project=project, item_name='Latte', amount=Decimal('4.50'),
+                category=rng.choice(categories),
+                date=now - timedelta(minutes=rng.randrange(60 * 24 * 365)),
+            )
+            for _ in range(2000)
+        ),
+        batch_size=1000,
+    )
+    for p in projects:
+        rebuild_project_rollups(p.id)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return projects
+
+
+def _assert_indexed(plans, allow_sort=False):
+    """Fail on full table scans and, unless allowed, temp B-tree sorts."""
+    for sql, plan in plans.items():
+        for step in plan:
+            assert not step.startswith('SCAN '), f'Full scan "{step}" in: {sql}'
+            if not allow_sort:
+                sort = f'Sort "{step}" in: {sql}'
+                assert 'TEMP B-TREE FOR ORDER BY' not in step, sort
+                assert 'TEMP B-TREE FOR DISTINCT' not in step, sort
+
+
+def _plans(client, url, params=None):
+    """Run a view and EXPLAIN every query it issued against app tables."""
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url, params or {})
+    assert response.status_code == 200
+    plans = {}
+    with connection.cursor() as cursor:
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or 'transactions_' not in sql:
+                continue
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plans[sql] = [row[-1] for row in cursor.fetchall()]
+    return plans
+
+
+@pytest.mark.django_db
+def test_home_queries_use_indexes(owner_client, large_dataset):
+    """
+    Test that the transaction list and its later pages are read in index order.
+    """
+    url = reverse('home', args=[large_dataset[0].id])
+    _assert_indexed(_plans(owner_client, url))
+
+    api = reverse('transaction_list_api', args=[large_dataset[0].id])
+    cursor = owner_client.get(api).json()['next_cursor']
+    _assert_indexed(_plans(owner_client, api, {'cursor': cursor}))
+
+
+@pytest.mark.django_db
+def test_reporting_api_queries_use_indexes(owner_client, large_dataset):
+    """
+    Test that both the rollup and the transaction-scan paths search indexes.
+
+    Grouping by a computed bucket still needs a temp B-tree for GROUP BY, but
+    only over the rows selected through the index.
+    """
+    url = reverse('project_reporting_api', args=[large_dataset[0].id])
+    for params in [
+        {'days': 90, 'tz': 'UTC'},
+        {'days': 90, 'tz': 'UTC', 'category': 'food', 'granularity': 'month'},
+        {'days': 90, 'tz': 'Europe/London'},
+        {'days': 90, 'tz': 'UTC', 'group_by': 'category'},
+        {'days': 90, 'tz': 'UTC', 'group_by': 'customer_name', 'top': 3},
+        {'days': 365, 'tz': 'Europe/London', 'category': 'food', 'granularity': 'week'},
+    ]:
+        plans = _plans(owner_client, url, params)
+        assert plans, params
+        _assert_indexed(plans)
+
+
+@pytest.mark.django_db
+def test_projects_view_queries_use_indexes(owner_client, large_dataset):
+    """
+    Test that the project list avoids scanning every project.
+
+    Ordering by ``created_at`` is allowed to sort, because the sorted set is
+    only the caller's own and member projects.
+    """
+    plans = _plans(owner_client, reverse('projects'))
+    _assert_indexed(plans, allow_sort=True)
@@ -0,0 +1,105 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from transactions import replicas
+from transactions.models import Transaction
+from transactions.services import record_transactions
+
+
+@pytest.fixture
+def replica(transactional_db, tmp_path):
+    """A second SQLite file registered as the ``replica`` alias."""
+    connections.databases[replicas.REPLICA_ALIAS] = {
+        **connections['default'].settings_dict,
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    # Connect up front: Django's test guard only refuses opening new connections
+    # to aliases the test case did not declare.
+    connections[replicas.REPLICA_ALIAS].connect()
+    yield connections[replicas.REPLICA_ALIAS]
+    connections[replicas.REPLICA_ALIAS].close()
+    del connections[replicas.REPLICA_ALIAS]
+    del connections.databases[replicas.REPLICA_ALIAS]
+
+
+def _summary_count(client, project):
+    response = client.get(reverse('project_summary_api', args=[project.id]))
+    assert response.status_code == 200
+    return response.json()['stats']['count']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reporting_reads_use_replica_until_the_user_writes(
+    owner_client, project, replica
+):
+    """
+    Test that summary reads hit the replica, and the primary after a write.
+    """
+    record_transactions(
+        [Transaction(project=project, item_name='Latte', amount=Decimal('4.00'))]
+    )
+    replicas.sync_replica()
+    # Written to the primary only, so the lagging replica still has one row.
+    record_transactions(
+        [Transaction(project=project, item_name='Bagel', amount=Decimal('3.00'))]
+    )
+
+    with CaptureQueriesContext(replica) as on_replica:
+        assert _summary_count(owner_client, project) == 1
+    assert on_replica.captured_queries
+    # Pages that did not opt in keep reading from the primary.
+    assert '2 transactions' in owner_client.get(reverse('projects')).content.decode()
+
+    response = owner_client.post(
+        reverse('add_transaction', args=[project.id]),
+        {
+            'item_name': 'Tea',
+            'amount': '2.50',
+            'customer_name': '',
+            'category': 'beverage',
+            'date': '2025-06-01T09:00',
+        },
+    )
+    assert response.status_code == 302
+    assert replicas.PIN_COOKIE in response.cookies
+    with CaptureQueriesContext(replica) as on_replica:
+        assert _summary_count(owner_client, project) == 3
+    assert not on_replica.captured_queries
+
+    owner_client.cookies.pop(replicas.PIN_COOKIE)
+    assert _summary_count(owner_client, project) == 1
+
+
+@pytest.mark.django_db
+def test_router_without_replica_uses_primary(owner_client, project):
+    """
+    Test that opted-in views read from the primary when no replica is configured.
+    """
+    router = replicas.ReplicaRouter()
+    assert router.db_for_read(Transaction) == 'default'
+    assert router.db_for_write(Transaction) == 'default'
+    assert not router.allow_migrate(replicas.REPLICA_ALIAS, 'transactions')
+
+    response = owner_client.get(reverse('project_summary_api', args=[project.id]))
+    assert response.status_code == 200
+    assert replicas.PIN_COOKIE not in response.cookies
+
+
+@pytest.mark.django_db(transaction=True)
+def test_summary_page_stays_on_the_primary(owner_client, project, replica):
+    """
+    Test that viewing the summary page, which may store a fresh summary, neither
+    reads the replica nor pins the browser to the primary.
+    """
+    record_transactions(
+        [Transaction(project=project, item_name='Latte', amount=Decimal('4.00'))]
+    )
+
+    with CaptureQueriesContext(replica) as on_replica:
+        response = owner_client.get(reverse('project_summary', args=[project.id]))
+    assert response.status_code == 200
+    assert not on_replica.captured_queries
+    assert replicas.PIN_COOKIE not in response.cookies
@@ -0,0 +1,203 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from transactions import reporting
+from transactions.models import Transaction
+from transactions.services import record_transactions
+
+
+def _reporting(client, project, **params):
+    url = reverse('project_reporting_api', args=[project.id])
+    return client.get(url, params)
+
+
+@pytest.mark.django_db
+def test_reporting_api_sums_per_day_and_fills_gaps(owner_client, project):
+    """
+    Test that daily buckets are summed in SQL and empty days are zero-filled.
+    """
+    now = timezone.now()
+    record_transactions(
+        Transaction(
+            project=project, item_name='Latte', amount=Decimal(amount),
+            date=now - timedelta(days=days_ago),
+        )
+        for days_ago, amount in [(0, '4.50'), (0, '3.00'), (2, '10.00')]
+    )
+
+    data = _reporting(owner_client, project, days=3, tz='UTC').json()
+
+    assert data['granularity'] == 'day'
+    assert len(data['labels']) == 4
+    assert data['values'] == [0.0, 10.0, 0.0, 7.5]
+    assert data['counts'] == [0, 1, 0, 2]
+    assert data['total'] == 17.5
+
+
+@pytest.mark.django_db
+def test_reporting_api_month_buckets_follow_timezone(owner_client, project):
+    """
+    Test that month edges are computed in the requested timezone.
+    """
+    # 23:30 UTC on the last day of a month is already next month in Auckland.
+    now = timezone.now()
+    edge = (now.replace(day=1, hour=23, minute=30) - timedelta(days=1))
+    record_transactions([
+        Transaction(project=project, item_name='Mug', amount=Decimal(5), date=edge)
+    ])
+
+    utc = _reporting(owner_client, project, days=60, granularity='month', tz='UTC')
+    nz = _reporting(
+        owner_client, project, days=60, granularity='month', tz='Pacific/Auckland'
+    )
+
+    utc_label = edge.date().replace(day=1).isoformat()
+    assert utc.json()['values'][utc.json()['labels'].index(utc_label)] == 5.0
+    nz_label = now.date().replace(day=1).isoformat()
+    assert nz.json()['values'][nz.json()['labels'].index(nz_label)] == 5.0
+
+
+@pytest.mark.django_db
+def test_reporting_api_rejects_unknown_granularity(owner_client, project):
+    """
+    Test that invalid parameters are reported as a 400.
+    """
+    response = _reporting(owner_client, project, granularity='hour')
+
+    assert response.status_code == 400
+    assert 'error' in response.json()
+
+
+@pytest.mark.django_db
+def test_reporting_api_bounds_the_window(owner_client, project):
+    """
+    Test that ``days`` is accepted up to MAX_REPORT_DAYS and rejected beyond it.
+    """
+    longest = _reporting(owner_client, project, days=reporting.MAX_REPORT_DAYS)
+    assert longest.status_code == 200
+    assert len(longest.json()['labels']) == reporting.MAX_REPORT_DAYS + 1
+
+    for days in [reporting.MAX_REPORT_DAYS + 1, 3_000_000, 10 ** 30, -1]:
+        response = _reporting(owner_client, project, days=days)
+        assert response.status_code == 400
+        assert 'days' in response.json()['error']
+
+
+@pytest.mark.django_db
+def test_reporting_api_answers_repeat_polls_from_cache(owner_client, project):
+    """
+    Test ETag/304 handling and that writes invalidate the cached report.
+    """
+    tea = Transaction(project=project, item_name='Tea', amount=Decimal(2))
+    record_transactions([tea])
+    first = _reporting(owner_client, project, days=7)
+    etag = first['ETag']
+    assert first.has_header('Last-Modified')
+
+    url = reverse('project_reporting_api', args=[project.id])
+    with CaptureQueriesContext(connection) as ctx:
+        repeat = owner_client.get(url, {'days': 7}, HTTP_IF_NONE_MATCH=etag)
+    assert repeat.status_code == 304
+    queries = [q['sql'] for q in ctx.captured_queries]
+    assert not any('transactions_projectdailyrollup' in sql for sql in queries)
+
+    tea = Transaction(project=project, item_name='Tea', amount=Decimal(3))
+    record_transactions([tea])
+    changed = owner_client.get(url, {'days': 7}, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200
+    assert changed['ETag'] != etag
+    assert changed.json()['total'] == 5.0
+
+
+@pytest.mark.django_db
+def test_reporting_api_compares_previous_window_and_categories(owner_client, project):
+    """
+    Test that the report totals each category and the preceding window.
+    """
+    now = timezone.now()
+    record_transactions([
+        Transaction(project=project, item_name='Latte', amount=Decimal('4.00'),
+                    category='beverage', date=now),
+        Transaction(project=project, item_name='Bagel', amount=Decimal('6.00'),
+                    category='food', date=now),
+        Transaction(project=project, item_name='Latte', amount=Decimal('9.00'),
+                    category='beverage', date=now - timedelta(days=10)),
+    ])
+
+    data = _reporting(owner_client, project, days=6, tz='UTC').json()
+
+    assert data['total'] == 10.0
+    assert data['categories'] == {'beverage': 4.0, 'food': 6.0}
+    assert data['previous_total'] == 9.0
+
+
+@pytest.mark.django_db
+def test_async_summary_and_project_list_apis(
+    owner_client, client, project, django_user_model
+):
+    """
+    Test that the async summary and project list APIs report rollup totals.
+    """
+    record_transactions([
+        Transaction(project=project, item_name='Latte', amount=Decimal('4.00'),
+                    category='beverage'),
+        Transaction(project=project, item_name='Bagel', amount=Decimal('6.00'),
+                    category='food'),
+    ])
+
+    summary = owner_client.get(reverse('project_summary_api', args=[project.id])).json()
+    assert summary['stats']['count'] == 2
+    assert [row['category'] for row in summary['category_mix']] == ['food', 'beverage']
+
+    projects = owner_client.get(reverse('projects_api')).json()['projects']
+    rows = [(p['id'], p['count'], p['is_owner']) for p in projects]
+    assert rows == [(project.id, 2, True)]
+
+    client.force_login(django_user_model.objects.create_user('stranger', password='pw'))
+    denied = client.get(reverse('project_summary_api', args=[project.id]))
+    assert denied.status_code == 403
+    assert client.get(reverse('projects_api')).json() == {'projects': []}
+
+
+@pytest.mark.django_db
+def test_reporting_api_breaks_down_top_groups_in_one_query(owner_client, project):
+    """
+    Test that group_by returns aligned top-N series plus an "Other" series.
+    """
+    now = timezone.now()
+    record_transactions([
+        Transaction(project=project, item_name=item, amount=Decimal(amount),
+                    date=now - timedelta(days=days_ago))
+        for item, amount, days_ago in [
+            ('Latte', '8.00', 0), ('Latte', '2.00', 1), ('Bagel', '6.00', 0),
+            ('Mug', '3.00', 1), ('Tea', '1.00', 0),
+        ]
+    ])
+
+    url = reverse('project_reporting_api', args=[project.id])
+    with CaptureQueriesContext(connection) as ctx:
+        params = {'days': 1, 'tz': 'UTC', 'group_by': 'item_name', 'top': 2}
+        data = owner_client.get(url, params).json()
+    series_queries = [
+        q for q in ctx.captured_queries
+        if 'GROUP BY' in q['sql'] and '"item_name"' in q['sql']
+    ]
+    assert len(series_queries) == 1
+
+    assert data['group_by'] == 'item_name'
+    assert [(s['label'], s['values']) for s in data['series']] == [
+        ('Latte', [2.0, 8.0]), ('Bagel', [0.0, 6.0]), ('Other', [3.0, 1.0]),
+    ]
+    assert data['values'] == [5.0, 15.0]
+
+    by_category = _reporting(
+        owner_client, project, days=1, tz='UTC', group_by='category'
+    ).json()
+    totals = [(s['key'], s['total']) for s in by_category['series']]
+    assert totals == [('beverage', 20.0)]
+    assert _reporting(owner_client, project, group_by='colour').status_code == 400
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from django.utils import timezone
+from transactions.management.commands import rebuild_rollups
+from transactions.models import Project, ProjectDailyRollup, Transaction
+from transactions.services import delete_transactions, record_transactions
+
+
+def _add(project, amount, category='beverage', date=None):
+    return Transaction(
+        project=project, item_name='Latte', amount=Decimal(amount),
+        category=category, date=date or timezone.now(),
+    )
+
+
+@pytest.mark.django_db
+def test_rollups_follow_inserts_and_deletes(project):
+    """
+    Test that rollups track count, sum, min and max as rows come and go.
+    """
+    rows = record_transactions([_add(project, '3.00'), _add(project, '5.50')])
+    record_transactions([_add(project, '1.25')])
+
+    rollup = ProjectDailyRollup.objects.get(project=project)
+    assert (rollup.count, rollup.total) == (3, Decimal('9.75'))
+    assert (rollup.min_amount, rollup.max_amount) == (Decimal('1.25'), Decimal('5.50'))
+
+    delete_transactions([rows[1]])
+
+    rollup.refresh_from_db()
+    assert (rollup.count, rollup.total) == (2, Decimal('4.25'))
+    assert rollup.max_amount == Decimal('3.00')
+
+
+@pytest.mark.django_db
+def test_add_and_delete_views_maintain_rollups(owner_client, project):
+    """
+    Test that the form views go through the rollup-aware write path.
+    """
+    owner_client.post(reverse('add_transaction', args=[project.id]), {
+        'item_name': 'Scone', 'amount': '2.50', 'category': 'food',
+        'date': timezone.localtime().strftime('%Y-%m-%dT%H:%M'),
+    })
+    assert ProjectDailyRollup.objects.get(project=project, category='food').count == 1
+    summary = owner_client.get(reverse('project_summary', args=[project.id]))
+    assert b'$2.50' in summary.content
+
+    row = Transaction.objects.get(project=project)
+    owner_client.post(reverse('delete_transaction', args=[project.id, row.id]))
+    assert not ProjectDailyRollup.objects.filter(project=project).exists()
+
+
+@pytest.mark.django_db
+def test_rebuild_rollups_command_repairs_drift(project):
+    """
+    Test that --verify reports drift and a rebuild repairs it.
+    """
+    record_transactions([_add(project, '4.00')])
+    # Writes that bypass the service layer are not rolled up.
+    Transaction.objects.create(
+        project=project, item_name='Cake', amount=Decimal('6.00'), category='food',
+        date=timezone.now() - timedelta(days=1),
+    )
+
+    with pytest.raises(CommandError):
+        call_command('rebuild_rollups', '--verify', '--workers', '1')
+
+    call_command('rebuild_rollups', str(project.id), '--workers', '1')
+    call_command('rebuild_rollups', '--verify', '--workers', '1')
+    assert ProjectDailyRollup.objects.filter(project=project).count() == 2
+
+
+@pytest.mark.django_db
+def test_rebuild_rollups_runs_serially_on_sqlite(project, monkeypatch):
+    """
+    Test that rebuilds on SQLite do not start concurrent writers by default.
+    """
+    def no_pool(*args, **kwargs):
+        raise AssertionError('SQLite rebuilds must not use a thread pool.')
+
+    monkeypatch.setattr(rebuild_rollups, 'ThreadPoolExecutor', no_pool)
+    second = Project.objects.create(name='Second', owner=project.owner)
+    record_transactions([_add(project, '4.00'), _add(second, '2.00')])
+
+    call_command('rebuild_rollups')
+    assert ProjectDailyRollup.objects.count() == 2
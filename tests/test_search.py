@@ -0,0 +1,75 @@
+import io
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from transactions import search
+from transactions.models import Project, Transaction
+from transactions.services import (
+    delete_transactions,
+    record_transactions,
+    save_transaction,
+)
+
+
+def _row(project, item, customer=''):
+    return Transaction(project=project, item_name=item, customer_name=customer,
+                       amount=Decimal('4.50'))
+
+
+@pytest.mark.django_db
+def test_index_follows_writes_and_ranks_within_a_project(project):
+    """
+    Test that inserts, edits and deletes reach the index and results are scoped
+    and ranked.
+    """
+    other = Project.objects.create(name='Other', owner=project.owner)
+    latte, mocha, _, _ = record_transactions([
+        _row(project, 'Latte grande', 'Ann'),
+        _row(project, 'Mocha', 'Latisha'),
+        _row(project, 'Bagel', 'Zoë'),
+        _row(other, 'Latte'),
+    ])
+
+    # Prefix terms; item names outrank customer names; other projects stay out.
+    assert search.search_transactions(project, 'lat') == [latte, mocha]
+    assert search.search_transactions(project, 'LAT gra') == [latte]
+    assert search.search_transactions(project, 'zoe')[0].item_name == 'Bagel'
+    assert search.search_transactions(project, '"*) OR (') == []
+
+    mocha.item_name = 'Flat white'
+    save_transaction(mocha)
+    assert search.search_transactions(project, 'mocha') == []
+    assert search.search_transactions(project, 'flat') == [mocha]
+
+    delete_transactions([latte])
+    assert search.search_transactions(project, 'latte') == []
+    Transaction.objects.filter(project=other).delete()
+    assert search.search_ids('latte') == []
+
+
+@pytest.mark.django_db
+def test_home_admin_and_rebuild_use_the_index(owner_client, admin_client, project):
+    """
+    Test that the home page and admin search through the index and a rebuild
+    restores it.
+    """
+    record_transactions([_row(project, 'Latte', 'Ann'), _row(project, 'Bagel', 'Bob')])
+
+    response = owner_client.get(reverse('home', args=[project.id]), {'q': 'bag'})
+    assert [row.item_name for row in response.context['transactions']] == ['Bagel']
+    assert '1 match for "bag"' in response.content.decode()
+
+    changelist = reverse('admin:transactions_transaction_changelist')
+    assert admin_client.get(changelist, {'q': 'ann'}).context['cl'].result_count == 1
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) '
+                       "VALUES ('delete-all')")
+    assert search.search_ids('latte') == []
+    out = io.StringIO()
+    call_command('rebuild_search_index', stdout=out)
+    assert 'Indexed 2 transactions' in out.getvalue()
+    assert len(search.search_ids('latte')) == 1
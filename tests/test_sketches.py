@@ -0,0 +1,88 @@
+import random
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from transactions import sketches
+from transactions.models import ProjectDailySketch, Transaction
+from transactions.rollups import rollup_day
+from transactions.services import delete_transactions, record_transactions
+
+
+def test_merged_heavy_hitters_and_distinct_counts_stay_within_bounds():
+    """
+    Test that merged Space-Saving counts bracket the truth within N / capacity
+    and HyperLogLog is within 3 sigma.
+    """
+    rng = random.Random(7)
+    truth = Counter()
+    days = []
+    for _ in range(30):
+        day = sketches.SpaceSaving(capacity=16)
+        sales = (f'item-{min(int(rng.paretovariate(1.2)), 200)}' for _ in range(300))
+        for name, count in Counter(sales).items():
+            day.add(name, count)
+            truth[name] += count
+        days.append(day.counters)
+
+    candidates, max_error = sketches.merge_heavy_hitters(days, capacity=16)
+    assert max_error <= sum(truth.values()) / 16
+    for name, (count, error) in candidates.items():
+        assert count - error <= truth[name] <= count
+        assert error <= max_error
+    assert all(name in candidates for name, count in truth.items() if count > max_error)
+
+    first, second = sketches.HyperLogLog(), sketches.HyperLogLog()
+    for i in range(20000):
+        (first if i % 2 else second).add(f'customer-{i}')
+    first.merge(sketches.HyperLogLog.from_bytes(second.to_bytes()))
+    assert abs(first.estimate() - 20000) <= 3 * sketches.RELATIVE_ERROR * 20000
+
+    small = sketches.HyperLogLog()
+    for i in range(40):
+        small.add(f'customer-{i}')
+    assert small.estimate() == 40
+
+
+@pytest.mark.django_db
+def test_sketches_follow_writes_and_match_exact_mode(owner_client, project):
+    """
+    Test that day sketches follow inserts and deletes, and the API matches exact mode.
+    """
+    today = timezone.localtime().replace(hour=12, minute=0)
+    rows = record_transactions([
+        Transaction(
+            project=project, item_name=item, amount=Decimal('3.00'),
+            customer_name=customer, date=today - timedelta(days=offset),
+        )
+        for offset, item, customer in [
+            (0, 'Latte', 'Ann'), (0, 'Latte', 'Bob'), (1, 'Bagel', 'Ann'),
+            (1, 'Latte', ''), (2, 'Mug', 'Cy'),
+        ]
+    ])
+    assert ProjectDailySketch.objects.filter(project=project).count() == 3
+    delete_transactions([rows[-1]])
+    deleted_day = rollup_day(rows[-1].date)
+    deleted = ProjectDailySketch.objects.filter(project=project, day=deleted_day)
+    assert not deleted.exists()
+
+    url = reverse('project_audience_api', args=[project.id])
+    approximate = owner_client.get(url, {'days': 7}).json()
+    exact = owner_client.get(url, {'days': 7, 'exact': 1}).json()
+    assert (approximate['exact'], exact['exact']) == (False, True)
+    assert approximate['top_items'] == exact['top_items'] == [
+        {'name': 'Latte', 'count': 3, 'error': 0},
+        {'name': 'Bagel', 'count': 1, 'error': 0},
+    ]
+    assert approximate['top_customers'] == exact['top_customers']
+    assert approximate['unique_customers'] == exact['unique_customers'] == 2
+    assert approximate['transactions'] == exact['transactions'] == 4
+
+    sketches.rebuild_project_sketches(project.id)
+    week_ago = today.date() - timedelta(days=7)
+    assert sketches.audience(project.id, week_ago, today.date())['transactions'] == 4
+    assert owner_client.get(url, {'top': 0}).status_code == 400
+
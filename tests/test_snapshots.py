@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from django.utils import timezone
+from transactions.models import Transaction
+from transactions.services import delete_transactions, record_transactions
+from transactions.snapshots import export_project, open_snapshot
+
+from engine.snapshots import Snapshot, SnapshotError, SnapshotWriter, append
+
+
+def _chunk(ids, epochs, items, customers):
+    return {
+        'ids': ids, 'epochs': epochs, 'cents': [100 * i for i in ids],
+        'categories': ['food'] * len(ids), 'items': items, 'customers': customers,
+    }
+
+
+def test_snapshot_appends_ranges_and_maps_columns(tmp_path):
+    """
+    Test that appended ranges keep dictionary codes stable, slice by time and
+    survive a torn append.
+    """
+    path = tmp_path / 'project-1'
+    first = _chunk([1, 2], [10, 20], ['Latte', 'Bagel'], ['Ann', ''])
+    append(path, 0, 100, ['beverage', 'food'], **first)
+    with pytest.raises(SnapshotError):
+        append(path, 50, 200, **_chunk([3], [150], ['Latte'], ['Bob']))
+
+    with pytest.raises(RuntimeError):
+        with SnapshotWriter(path, 100, 200) as writer:
+            writer.write(**_chunk([9], [120], ['Torn'], ['Torn']))
+            raise RuntimeError
+    assert Snapshot(path).rows == 2
+
+    with SnapshotWriter(path, 100, 200) as writer:
+        writer.write(**_chunk([3], [150], ['Latte'], ['Bob']))
+        writer.write(**_chunk([4], [150], ['Mug'], ['Ann']))
+        with pytest.raises(SnapshotError):
+            writer.write(**_chunk([5], [140], ['Mug'], ['Ann']))
+
+    snapshot = Snapshot(path)
+    assert isinstance(snapshot['epoch'], np.memmap)
+    assert (snapshot.rows, snapshot.start, snapshot.end) == (4, 0, 200)
+    assert snapshot.manifest['total_cents'] == 1000
+    assert snapshot['id'].tolist() == [1, 2, 3, 4]
+    assert snapshot['item'].tolist() == [1, 0, 1, 2]
+    assert snapshot.names('item') == ['Bagel', 'Latte', 'Mug']
+    assert snapshot['customer'].tolist() == [0, -1, 1, 0]
+    assert snapshot['category'].tolist() == [1, 1, 1, 1]
+    assert snapshot.between(15, 151)['id'].tolist() == [2, 3, 4]
+    assert (tmp_path / 'project-1' / 'id.bin').stat().st_size == 4 * 8
+
+
+@pytest.mark.django_db
+def test_export_appends_new_days_and_rebuilds_after_edits(project, tmp_path):
+    """
+    Test that exports append only new whole days, and rebuild when the rollups no
+    longer match.
+    """
+    today = timezone.localdate()
+    midnight = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+    noon = midnight + timedelta(hours=12)
+    first, _, _ = record_transactions([
+        Transaction(project=project, item_name=item, amount=Decimal(amount),
+                    date=noon - timedelta(days=days))
+        for days, item, amount in [
+            (3, 'Latte', '4.50'), (2, 'Bagel', '3.00'), (0, 'Mug', '12.00'),
+        ]
+    ])
+
+    until = today - timedelta(days=2)
+    assert export_project(project.id, until=until, root=tmp_path) == (1, True)
+    assert export_project(project.id, root=tmp_path) == (1, False)
+    assert export_project(project.id, root=tmp_path) == (0, False)
+    snapshot = open_snapshot(project.id, root=tmp_path)
+    assert snapshot['cents'].tolist() == [450, 300]
+    assert snapshot['epoch'][0] == int(first.date.timestamp())
+
+    delete_transactions([first])
+    tomorrow = today + timedelta(days=1)
+    assert export_project(project.id, until=tomorrow, root=tmp_path) == (2, True)
+    assert open_snapshot(project.id, root=tmp_path)['cents'].tolist() == [300, 1200]
@@ -0,0 +1,81 @@
+import gzip
+import json
+
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+from transactions import assets
+
+
+@pytest.fixture
+def collected(settings, tmp_path):
+    settings.STATIC_ROOT = tmp_path / 'staticfiles'
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'transactions.assets.StaticAssetStorage'},
+    }
+    call_command('collectstatic', interactive=False, verbosity=0)
+    manifest = json.loads((settings.STATIC_ROOT / 'staticfiles.json').read_text())
+    return settings.STATIC_ROOT, manifest['paths']
+
+
+def test_minify_css_keeps_strings_and_calc():
+    """
+    Test that minifying drops comments and whitespace, not strings or calc() spacing.
+    """
+    css = (
+        '/* note */\na  >  b {\n'
+        '  content: "a  ;  b";\n  width: calc(100% - 2px);\n}\n'
+    )
+    assert assets.minify_css(css) == 'a>b{content:"a  ;  b";width:calc(100% - 2px)}'
+
+
+@pytest.mark.django_db
+def test_collectstatic_builds_hashed_compressed_bundles(
+    collected, owner_client, project
+):
+    """
+    Test that collectstatic writes a hashed, minified, gzipped bundle that pages link.
+    """
+    root, paths = collected
+    hashed = paths[assets.bundle_name('project')]
+    assert hashed != assets.bundle_name('project')
+
+    css = (root / hashed).read_text()
+    assert '.project-nav-tabs' in css and '/*' not in css
+    assert gzip.decompress((root / f'{hashed}.gz').read_bytes()).decode() == css
+
+    summary = reverse('project_summary', args=[project.id])
+    page = owner_client.get(summary).content.decode()
+    assert f'/static/{hashed}' in page
+    assert 'css/tabs.css' not in page
+
+
+@pytest.mark.django_db
+def test_middleware_negotiates_and_caches(collected):
+    """
+    Test that collected files are served compressed, cached and revalidated with 304.
+    """
+    _, paths = collected
+    client = Client()
+    url = f'/static/{paths[assets.bundle_name("base")]}'
+
+    response = client.get(url, headers={'Accept-Encoding': 'br;q=0, gzip'})
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Cache-Control'] == assets.IMMUTABLE_CACHE_CONTROL
+    assert response['Vary'] == 'Accept-Encoding'
+    assert response['X-Content-Type-Options'] == 'nosniff'
+    assert int(response['Content-Length']) == len(response.content)
+
+    identity = client.get(url, headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in identity
+    assert b'body' in identity.content
+
+    headers = {'Accept-Encoding': 'gzip', 'If-None-Match': response['ETag']}
+    revalidated = client.get(url, headers=headers)
+    assert revalidated.status_code == 304
+
+    unhashed = client.get('/static/css/base.css')
+    assert unhashed['Cache-Control'] == assets.MUTABLE_CACHE_CONTROL
+    assert client.get('/static/../green_web/settings.py').status_code == 404
@@ -0,0 +1,94 @@
+import json
+from datetime import date, datetime, time
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from transactions.emissions import factor_snapshot, plan_recompute
+from transactions.models import EmissionFactor, EmissionFactorVersion, Transaction
+from transactions.services import record_transactions, save_transaction
+
+
+def _add(project, amount, category, day):
+    return Transaction(
+        project=project, item_name='Latte', amount=Decimal(amount), category=category,
+        date=datetime.combine(day, time(12), tzinfo=dt_timezone.utc),
+    )
+
+
+@pytest.mark.django_db
+def test_writes_store_emissions_with_factor_version(project):
+    """
+    Test that inserts and edits price rows with the dated category factor.
+    """
+    old, new = record_transactions([
+        _add(project, '10.00', 'food', date(2024, 6, 1)),
+        _add(project, '10.00', 'food', date(2025, 6, 1)),
+    ])
+    assert (old.emissions, new.emissions) == (Decimal('6.100'), Decimal('5.500'))
+    food = EmissionFactorVersion.objects.get(category='food')
+    assert new.factor_version == food.version
+
+    new.category = 'merchandise'
+    save_transaction(new)
+    new.refresh_from_db()
+    assert new.emissions == Decimal('7.300')
+
+
+@pytest.mark.django_db
+def test_recompute_only_touches_stale_rows_and_resumes(project, tmp_path):
+    """
+    Test that a factor change reprices that category, skipping checkpointed units.
+    """
+    record_transactions([
+        _add(project, '10.00', 'food', date(2025, 1, 15)),
+        _add(project, '10.00', 'food', date(2025, 2, 15)),
+        _add(project, '10.00', 'beverage', date(2025, 2, 15)),
+    ])
+    factor = EmissionFactor.objects.get(category='food', valid_to=None)
+    factor.kg_co2e_per_unit = Decimal('0.9')
+    factor.save()
+
+    versions = factor_snapshot().versions
+    units = plan_recompute(versions)
+    assert units == [
+        (project.id, '2025-01-01', '2025-02-01'),
+        (project.id, '2025-02-01', '2025-03-01'),
+    ]
+
+    # Pretend an earlier run finished January before being interrupted.
+    checkpoint = tmp_path / 'checkpoint.json'
+    checkpoint.write_text(json.dumps({
+        'versions': versions, 'project_ids': [],
+        'units': [list(u) for u in units], 'done': [list(units[0])],
+    }))
+    call_command('recompute_emissions', workers=1, checkpoint=str(checkpoint))
+
+    food = Transaction.objects.filter(category='food')
+    emissions = dict(food.values_list('date__month', 'emissions'))
+    assert emissions == {1: Decimal('5.500'), 2: Decimal('9.000')}
+    assert Transaction.objects.get(category='beverage').emissions == Decimal('3.800')
+    assert not checkpoint.exists()
+
+    call_command('recompute_emissions', workers=1, checkpoint=str(checkpoint))
+    assert Transaction.objects.get(date__month=1).emissions == Decimal('9.000')
+
+
+@pytest.mark.django_db
+def test_moving_a_factor_marks_both_categories_stale(project):
+    """
+    Test that moving a factor to another category bumps the versions of both categories.
+    """
+    for factor in EmissionFactor.objects.filter(category='merchandise'):
+        factor.delete()
+    factor = EmissionFactor.objects.get(category='food', valid_to=None)
+    versions = factor_snapshot().versions
+
+    factor.category = 'merchandise'
+    factor.save()
+
+    moved = factor_snapshot().versions
+    assert moved['food'] == versions['food'] + 1
+    assert moved['merchandise'] == versions['merchandise'] + 1
+    assert moved['beverage'] == versions['beverage']
@@ -0,0 +1,88 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from transactions import summaries
+from transactions.models import ProjectAmountCount, ProjectNameTotal, Transaction
+from transactions.services import (
+    delete_transactions,
+    record_transactions,
+    save_transaction,
+)
+
+
+def _row(project, item, amount, customer='', day=1):
+    return Transaction(
+        project=project, item_name=item, amount=Decimal(amount), customer_name=customer,
+        date=timezone.make_aware(datetime(2024, 3, day, 12)),
+    )
+
+
+def _tables(project):
+    names = ProjectNameTotal.objects.filter(project=project)
+    amounts = ProjectAmountCount.objects.filter(project=project)
+    names = sorted(names.values_list('kind', 'name', 'count', 'total'))
+    amounts = sorted(amounts.values_list('amount', 'count'))
+    return names, amounts
+
+
+@pytest.mark.django_db
+def test_write_path_keeps_totals_and_summary_current(project):
+    """
+    Test that inserts, edits and deletes update the totals, and the summary
+    refreshes only when stale.
+    """
+    latte, _, bagel, _ = record_transactions([
+        _row(project, 'Latte', '4.50', 'Ann'),
+        _row(project, 'Latte', '4.50', 'Bob'),
+        _row(project, 'Bagel', '3.00', 'Ann', day=2),
+        _row(project, 'Mug', '12.00', day=2),
+    ])
+    project.refresh_from_db()
+    summary = summaries.project_summary(project)
+    assert (summary.count, summary.total) == (4, Decimal('24.00'))
+    assert summary.median == Decimal('4.50')
+    assert (summary.best_day.day, summary.best_day_total) == (2, Decimal('15.00'))
+    assert [row['name'] for row in summary.top_items] == ['Mug', 'Latte', 'Bagel']
+    assert summary.top_customers == [
+        {'name': 'Ann', 'count': 2, 'total': '7.50'},
+        {'name': 'Bob', 'count': 1, 'total': '4.50'},
+    ]
+
+    # A current summary is a single lookup.
+    with CaptureQueriesContext(connection) as queries:
+        summaries.project_summary(project)
+    assert len(queries) == 1
+
+    latte.item_name, latte.amount = 'Flat white', Decimal('3.50')
+    save_transaction(latte)
+    delete_transactions([bagel])
+    project.refresh_from_db()
+    summary = summaries.project_summary(project)
+    assert (summary.count, summary.median) == (3, Decimal('4.50'))
+    assert [row['name'] for row in summary.top_items] == ['Mug', 'Latte', 'Flat white']
+    assert summary.top_customers[0] == {'name': 'Bob', 'count': 1, 'total': '4.50'}
+
+    incremental = _tables(project)
+    summaries.rebuild_project_totals(project.id)
+    assert _tables(project) == incremental
+
+
+@pytest.mark.django_db
+def test_summary_page_shows_figures(owner_client, project):
+    """
+    Test that the summary page renders the median, best day and top lists.
+    """
+    record_transactions([
+        _row(project, 'Latte', '4.50', 'Ann'),
+        _row(project, 'Scone', '2.50', day=5),
+    ])
+    response = owner_client.get(reverse('project_summary', args=[project.id]))
+    page = response.content.decode()
+    assert '$3.50 / $3.50' in page
+    assert 'Mar 01, 2024' in page
+    assert '<td>Scone</td>' in page and '<td>Ann</td>' in page